@@ -0,0 +1,77 @@
+"""
+Ambiente do Alembic - Rifei
+Migrações assíncronas a partir de app.models.models (DATABASE_URL das configurações)
+"""
+import asyncio
+from logging.config import fileConfig
+
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from app.config import settings
+from app.database import Base
+from app.models import models  # noqa: F401 - registra as tabelas no metadata
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Objetos criados só por DDL manual (busca textual no PostgreSQL): fora
+# do metadata, o autogenerate não deve propor removê-los
+UNMANAGED = {("column", "search_vector"), ("index", "ix_rifas_search_vector")}
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    return (type_, name) not in UNMANAGED
+
+
+def database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+def configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        compare_type=True,
+        # SQLite não tem ALTER completo: alterações via recriação da tabela
+        render_as_batch=database_url().startswith("sqlite"),
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL das migrações sem conectar (alembic upgrade --sql)"""
+    configure(url=database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    configure(connection=connection)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    """Aplica as migrações com uma engine própria, sem pool"""
+    connectable = create_async_engine(database_url(), poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_async_migrations())
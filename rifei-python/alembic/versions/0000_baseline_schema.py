@@ -0,0 +1,188 @@
+"""baseline schema
+
+Schema criado pelo create_all antes desta série de mudanças (tabelas de
+app.models.models sem token_version, numbers_bitmap, refresh_tokens,
+number_reservations e a busca textual, que vêm em 0001).
+
+Bancos criados com create_all entram no Alembic com
+`alembic stamp 0000` seguido de `alembic upgrade head`.
+
+Revision ID: 0000
+Revises: 
+Create Date: 2026-10-17 21:30:22.098869
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0000'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENUMS = ["userrole", "rifastatus", "paymentstatus", "paymentmethod"]
+
+
+def upgrade() -> None:
+    op.create_table('categories',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('slug', sa.String(length=100), nullable=False),
+    sa.Column('icon', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('order', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_categories')),
+    sa.UniqueConstraint('name', name=op.f('uq_categories_name'))
+    )
+    op.create_index(op.f('ix_categories_slug'), 'categories', ['slug'], unique=True)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('avatar_url', sa.String(length=500), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('role', sa.Enum('USER', 'CREATOR', 'ADMIN', name='userrole'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('is_verified', sa.Boolean(), nullable=False),
+    sa.Column('verified_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('xp', sa.Integer(), nullable=False),
+    sa.Column('total_wins', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_users'))
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+    op.create_table('rifas',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('slug', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('images', sa.JSON(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_numbers', sa.Integer(), nullable=False),
+    sa.Column('min_numbers', sa.Integer(), nullable=False),
+    sa.Column('max_numbers_per_user', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('DRAFT', 'ACTIVE', 'COMPLETED', 'CANCELLED', name='rifastatus'), nullable=False),
+    sa.Column('start_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('draw_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('winner_number', sa.Integer(), nullable=True),
+    sa.Column('winner_id', sa.Integer(), nullable=True),
+    sa.Column('draw_proof', sa.String(length=500), nullable=True),
+    sa.Column('sold_count', sa.Integer(), nullable=False),
+    sa.Column('view_count', sa.Integer(), nullable=False),
+    sa.Column('is_featured', sa.Boolean(), nullable=False),
+    sa.Column('is_verified', sa.Boolean(), nullable=False),
+    sa.Column('creator_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], name=op.f('fk_rifas_category_id_categories')),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], name=op.f('fk_rifas_creator_id_users')),
+    sa.ForeignKeyConstraint(['winner_id'], ['users.id'], name=op.f('fk_rifas_winner_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_rifas'))
+    )
+    op.create_index('ix_rifas_creator_status', 'rifas', ['creator_id', 'status'], unique=False)
+    op.create_index(op.f('ix_rifas_slug'), 'rifas', ['slug'], unique=True)
+    op.create_index('ix_rifas_status_end_date', 'rifas', ['status', 'end_date'], unique=False)
+
+    op.create_table('feed_posts',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('likes_count', sa.Integer(), nullable=False),
+    sa.Column('comments_count', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rifa_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['rifa_id'], ['rifas.id'], name=op.f('fk_feed_posts_rifa_id_rifas')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_feed_posts_user_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_feed_posts'))
+    )
+
+    op.create_table('payments',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('mp_payment_id', sa.String(length=100), nullable=True),
+    sa.Column('mp_preference_id', sa.String(length=100), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('net_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'APPROVED', 'REJECTED', 'REFUNDED', 'CANCELLED', name='paymentstatus'), nullable=False),
+    sa.Column('method', sa.Enum('PIX', 'CREDIT_CARD', 'DEBIT_CARD', name='paymentmethod'), nullable=True),
+    sa.Column('metadata', sa.JSON(), nullable=True),
+    sa.Column('paid_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('pix_qr_code', sa.Text(), nullable=True),
+    sa.Column('pix_qr_code_base64', sa.Text(), nullable=True),
+    sa.Column('pix_copy_paste', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rifa_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['rifa_id'], ['rifas.id'], name=op.f('fk_payments_rifa_id_rifas')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_payments_user_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_payments'))
+    )
+    op.create_index(op.f('ix_payments_mp_payment_id'), 'payments', ['mp_payment_id'], unique=True)
+
+    op.create_table('tickets',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.Column('is_winner', sa.Boolean(), nullable=False),
+    sa.Column('rifa_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], name=op.f('fk_tickets_payment_id_payments')),
+    sa.ForeignKeyConstraint(['rifa_id'], ['rifas.id'], name=op.f('fk_tickets_rifa_id_rifas')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_tickets_user_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_tickets'))
+    )
+    op.create_index('ix_tickets_rifa_number', 'tickets', ['rifa_id', 'number'], unique=True)
+    op.create_index('ix_tickets_user_rifa', 'tickets', ['user_id', 'rifa_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tickets_user_rifa', table_name='tickets')
+    op.drop_index('ix_tickets_rifa_number', table_name='tickets')
+    op.drop_table('tickets')
+
+    op.drop_index(op.f('ix_payments_mp_payment_id'), table_name='payments')
+    op.drop_table('payments')
+
+    op.drop_table('feed_posts')
+
+    op.drop_index('ix_rifas_status_end_date', table_name='rifas')
+    op.drop_index(op.f('ix_rifas_slug'), table_name='rifas')
+    op.drop_index('ix_rifas_creator_status', table_name='rifas')
+    op.drop_table('rifas')
+
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+
+    op.drop_index(op.f('ix_categories_slug'), table_name='categories')
+    op.drop_table('categories')
+
+    if op.get_context().dialect.name == "postgresql":
+        for name in ENUMS:
+            op.execute(f"DROP TYPE IF EXISTS {name}")
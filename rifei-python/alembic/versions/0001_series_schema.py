@@ -0,0 +1,131 @@
+"""series schema
+
+Tudo o que a série acrescentou ao schema de 0000: users.token_version,
+rifas.numbers_bitmap, refresh_tokens, number_reservations e, no
+PostgreSQL, a coluna gerada search_vector com o índice GIN da busca
+textual (app.services.search).
+
+Idempotente: bancos criados com create_all no meio da série já têm
+parte destes objetos (o create_all só cria tabelas que faltam, nunca
+colunas), então cada passo confere o que existe antes.
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-17 21:30:22.098869
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = '0000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Busca textual (só PostgreSQL): unaccent não é IMMUTABLE, por isso o
+# wrapper rifei_unaccent exigido pela coluna gerada
+SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION rifei_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent', $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    ALTER TABLE rifas ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', rifei_unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('portuguese', rifei_unaccent(coalesce(description, ''))), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_rifas_search_vector ON rifas USING gin (search_vector)",
+]
+
+
+def is_postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade() -> None:
+    if not has_column('users', 'token_version'):
+        op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+    if not has_column('rifas', 'numbers_bitmap'):
+        # Rifas existentes ficam com NULL: o bitmap é reconstruído dos
+        # tickets na primeira leitura (app.services.numbers.rebuild_bitmap)
+        op.add_column('rifas', sa.Column('numbers_bitmap', sa.LargeBinary(), nullable=True))
+
+    if is_postgres():
+        for statement in SEARCH_DDL:
+            op.execute(statement)
+
+    if not has_table('refresh_tokens'):
+        op.create_table('refresh_tokens',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('jti', sa.String(length=32), nullable=False),
+        sa.Column('family_id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_refresh_tokens_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_refresh_tokens')),
+        sa.UniqueConstraint('jti', name=op.f('uq_refresh_tokens_jti'))
+        )
+        op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+        op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'], unique=False)
+        op.create_index('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id'], unique=False)
+
+    if not has_table('number_reservations'):
+        op.create_table('number_reservations',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('number', sa.Integer(), nullable=False),
+        sa.Column('reserved_until', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('rifa_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['rifa_id'], ['rifas.id'], name=op.f('fk_number_reservations_rifa_id_rifas')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_number_reservations_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_number_reservations'))
+        )
+        op.create_index('ix_number_reservations_reserved_until', 'number_reservations', ['reserved_until'], unique=False)
+        op.create_index('ix_number_reservations_rifa_number', 'number_reservations', ['rifa_id', 'number'], unique=True)
+        op.create_index('ix_number_reservations_user_rifa', 'number_reservations', ['user_id', 'rifa_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_number_reservations_user_rifa', table_name='number_reservations')
+    op.drop_index('ix_number_reservations_rifa_number', table_name='number_reservations')
+    op.drop_index('ix_number_reservations_reserved_until', table_name='number_reservations')
+    op.drop_table('number_reservations')
+
+    op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
+
+    if is_postgres():
+        op.execute("DROP INDEX IF EXISTS ix_rifas_search_vector")
+        op.execute("ALTER TABLE rifas DROP COLUMN IF EXISTS search_vector")
+        op.execute("DROP FUNCTION IF EXISTS rifei_unaccent(text)")
+
+    with op.batch_alter_table('rifas') as batch_op:
+        batch_op.drop_column('numbers_bitmap')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
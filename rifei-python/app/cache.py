@@ -0,0 +1,165 @@
+"""
+Cache da aplicação - Rifei
+Redis compartilhado entre workers quando settings.redis_url está configurado,
+LRU em memória do processo caso contrário (ou se o Redis estiver fora do ar)
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.config import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - dependência opcional
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+# Depois de uma falha, o Redis fica de fora por este tempo
+_REDIS_RETRY_SECONDS = 30
+
+
+# ===========================================
+# LRU LOCAL
+# ===========================================
+
+class LocalCache:
+    """
+    LRU com TTL por chave, seguro entre threads.
+
+    Valores None não são armazenados (None = ausente).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# ===========================================
+# REDIS
+# ===========================================
+
+_redis_client = None
+_redis_down_until = 0.0
+
+
+def get_redis():
+    """
+    Cliente Redis assíncrono (criado sob demanda)
+
+    Returns:
+        Cliente ou None se redis_url não estiver configurado, o pacote
+        redis não estiver instalado ou o servidor tiver falhado há pouco
+    """
+    global _redis_client
+
+    if not settings.redis_url or redis_asyncio is None:
+        return None
+    if _redis_down_until > time.monotonic():
+        return None
+
+    if _redis_client is None:
+        _redis_client = redis_asyncio.from_url(settings.redis_url)
+    return _redis_client
+
+
+def mark_redis_down(error: Exception) -> None:
+    """Registra falha do Redis e passa a usar o cache local por um tempo"""
+    global _redis_down_until
+
+    if _redis_down_until <= time.monotonic():
+        logger.warning("Redis indisponível, usando cache local: %s", error)
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+
+
+# ===========================================
+# CACHE
+# ===========================================
+
+class Cache:
+    """
+    Cache com namespace: Redis (valores em JSON) quando disponível,
+    LocalCache caso contrário.
+
+    Os valores devem ser serializáveis em JSON (dicts, listas, strings...).
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 1024):
+        self.namespace = namespace
+        self.local = LocalCache(maxsize)
+
+    def _key(self, key: str) -> str:
+        return f"rifei:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        client = get_redis()
+        if client is not None:
+            try:
+                raw = await client.get(self._key(key))
+                return None if raw is None else json.loads(raw)
+            except Exception as e:
+                mark_redis_down(e)
+        return self.local.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        client = get_redis()
+        if client is not None:
+            try:
+                await client.set(
+                    self._key(key),
+                    json.dumps(value, default=str),
+                    px=int(ttl * 1000),
+                )
+                return
+            except Exception as e:
+                mark_redis_down(e)
+        self.local.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        # O local é sempre limpo: pode ter sido usado enquanto o Redis caiu
+        self.local.delete(*keys)
+        client = get_redis()
+        if client is not None and keys:
+            try:
+                await client.delete(*(self._key(key) for key in keys))
+            except Exception as e:
+                mark_redis_down(e)
+
+    def clear_local(self) -> None:
+        self.local.clear()
@@ -1,10 +1,26 @@
 """
 Configuração do banco de dados com SQLAlchemy Async
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData
-from app.config import settings
+import asyncio
+import itertools
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy import MetaData, event, text
+from sqlalchemy.exc import DBAPIError
+from app.config import Settings, settings
+
+logger = logging.getLogger(__name__)
 
 # Convenção de nomenclatura para constraints
 convention = {
@@ -23,44 +39,468 @@ class Base(DeclarativeBase):
     metadata = metadata
 
 
-# Engine assíncrona
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.app_debug,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+# ===========================================
+# PERFIS DE ENGINE
+# ===========================================
+
+class EngineProfile(NamedTuple):
+    """Padrões de pool e sessão no Postgres de um tipo de processo"""
+    pool_size: int
+    max_overflow: int
+    null_pool: bool
+    statement_cache_size: int
+    statement_timeout_ms: int
+
+
+ENGINE_PROFILES = {
+    # Workers HTTP: pool pequeno e estável, consultas curtas
+    "web": EngineProfile(
+        pool_size=5, max_overflow=10, null_pool=False,
+        statement_cache_size=100, statement_timeout_ms=15000,
+    ),
+    # Jobs em background (expiração, contadores, snapshot): poucas
+    # conexões, consultas em lote mais longas
+    "worker": EngineProfile(
+        pool_size=2, max_overflow=0, null_pool=False,
+        statement_cache_size=100, statement_timeout_ms=120000,
+    ),
+    # Funções serverless: sem pool no processo (o pooler externo, ex.
+    # PgBouncer em modo transaction, não suporta prepared statements)
+    "serverless": EngineProfile(
+        pool_size=0, max_overflow=0, null_pool=True,
+        statement_cache_size=0, statement_timeout_ms=10000,
+    ),
+}
+
+
+def engine_options(config: Settings = settings, profile: Optional[str] = None) -> dict:
+    """
+    Argumentos de create_async_engine para o perfil
+
+    Args:
+        config: Configurações (db_* sobrescrevem os padrões do perfil)
+        profile: Nome do perfil (padrão: config.db_profile)
+
+    Raises:
+        ValueError: Perfil desconhecido
+    """
+    name = profile or config.db_profile
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Perfil de engine desconhecido: {name}")
+    defaults = ENGINE_PROFILES[name]
+
+    url = make_url(config.database_url)
+    options = {"echo": config.db_echo}
+    if url.get_backend_name() == "sqlite":
+        # Desenvolvimento/testes: o dialeto escolhe o pool (NullPool ou StaticPool)
+        return options
+
+    if defaults.null_pool:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=_pick(config.db_pool_size, defaults.pool_size),
+            max_overflow=_pick(config.db_max_overflow, defaults.max_overflow),
+            pool_timeout=config.db_pool_timeout,
+            pool_recycle=config.db_pool_recycle,
+            pool_pre_ping=config.db_pool_pre_ping,
+        )
+
+    if url.get_driver_name() == "asyncpg":
+        cache_size = _pick(config.db_statement_cache_size, defaults.statement_cache_size)
+        timeout_ms = _pick(config.db_statement_timeout_ms, defaults.statement_timeout_ms)
+        options["connect_args"] = {
+            # Cache do dialeto do SQLAlchemy e do próprio asyncpg
+            "prepared_statement_cache_size": cache_size,
+            "statement_cache_size": cache_size,
+            "timeout": config.db_connect_timeout,
+            "server_settings": {
+                "application_name": f"{config.db_application_name}:{name}",
+                "statement_timeout": str(timeout_ms),
+                "jit": "on" if config.db_jit else "off",
+            },
+        }
+
+    return options
+
+
+def _pick(value: Optional[int], default: int) -> int:
+    return default if value is None else value
+
+
+def create_engine(profile: Optional[str] = None) -> AsyncEngine:
+    """Cria a engine assíncrona do perfil (ver engine_options)"""
+    return create_async_engine(settings.database_url, **engine_options(settings, profile))
+
+
+# Engine e session factory são criadas no primeiro uso: importar o
+# módulo (ex.: no cold start de uma função serverless) não carrega o
+# driver nem monta o pool
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    """Engine assíncrona do processo (criada sob demanda)"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
+
+
+def async_session(**kwargs) -> AsyncSession:
+    """Abre uma sessão na engine do processo (uso: async with async_session() as db)"""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _session_factory(**kwargs)
+
 
-# Session factory
-async_session = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+def __getattr__(name: str):
+    # Compatibilidade: `from app.database import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ===========================================
+# UNIDADE DE TRABALHO
+# ===========================================
+
+# Chaves em session.info
+_WROTE = "rifei.wrote"
+_AFTER_COMMIT = "rifei.after_commit"
+
+# Transação de leitura sem BEGIN/COMMIT (cada SELECT vale por si)
+AUTOCOMMIT = {"isolation_level": "AUTOCOMMIT"}
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context) -> None:
+    session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dml(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_wrote(session) -> None:
+    session.info.pop(_WROTE, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session) -> None:
+    session.info.pop(_WROTE, None)
+    session.info.pop(_AFTER_COMMIT, None)
+
+
+def has_writes(session: AsyncSession) -> bool:
+    """Se a sessão tem escritas ainda não commitadas (pendentes ou já enviadas)"""
+    return bool(session.new or session.dirty or session.deleted or session.info.get(_WROTE))
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[Any]]) -> None:
+    """
+    Agenda um efeito colateral (índices em memória, invalidação de cache)
+    para depois do commit da requisição; descartado se houver rollback
+    ou se nada for commitado. Erros no callback só são logados: a
+    escrita já está gravada.
+    """
+    session.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+async def commit(session: AsyncSession) -> bool:
+    """
+    Fecha a unidade de trabalho: um único COMMIT, só se houve escrita
+
+    Os serviços chamados na requisição apenas fazem flush (com RETURNING
+    para os defaults do servidor); quem abriu a sessão commita.
+
+    Returns:
+        True se houve COMMIT
+    """
+    committed = await _commit_writes(session)
+    await _run_after_commit(session, committed)
+    return committed
+
+
+async def _commit_writes(session: AsyncSession) -> bool:
+    committed = has_writes(session)
+    if committed:
+        await session.commit()
+    return committed
+
+
+async def _run_after_commit(session: AsyncSession, committed: bool) -> None:
+    # Fora do caminho de rollback: falhar aqui não pode virar 500 (o
+    # cliente repetiria uma escrita que já foi gravada)
+    callbacks = session.info.pop(_AFTER_COMMIT, [])
+    if not committed:
+        return
+    for callback in callbacks:
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Falha em callback após commit: %r", callback)
 
 
 async def get_db() -> AsyncSession:
-    """Dependency para injetar sessão do banco"""
+    """Dependency para injetar sessão do banco (commit único ao fim da requisição)"""
     async with async_session() as session:
         try:
             yield session
-            await session.commit()
+            committed = await _commit_writes(session)
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
+        await _run_after_commit(session, committed)
+
+
+# ===========================================
+# RÉPLICAS DE LEITURA
+# ===========================================
+
+# Cookie que mantém o cliente no primário logo depois de uma escrita
+# (ler o que acabou de gravar, ex.: a rifa recém-criada)
+PRIMARY_PIN_COOKIE = "rifei_primary"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Atraso em segundos: 0 quando a réplica já aplicou todo o WAL recebido
+# (senão um primário sem escritas pareceria uma réplica atrasada)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReadReplica:
+    """Engine de uma réplica e o último atraso de replicação medido"""
+
+    def __init__(self, url: str):
+        config = settings.model_copy(update={
+            "database_url": url,
+            "db_application_name": f"{settings.db_application_name}-replica",
+        })
+        self.engine = create_async_engine(url, **engine_options(config))
+        self.sessions = async_sessionmaker(
+            self.engine.execution_options(**AUTOCOMMIT),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autoflush=False,
+            info={"read_only": True},
+        )
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+
+    async def check_lag(self) -> Optional[float]:
+        """
+        Atraso atual em segundos (medido no máximo a cada db_read_lag_check_seconds)
+
+        Returns:
+            Atraso ou None se a réplica não respondeu
+        """
+        now = time.monotonic()
+        if now - self.checked_at < settings.db_read_lag_check_seconds:
+            return self.lag
+        self.checked_at = now
+
+        if self.engine.dialect.name != "postgresql":
+            self.lag = 0.0
+            return self.lag
+        try:
+            async with self.engine.connect() as conn:
+                self.lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+        except (DBAPIError, OSError, asyncio.TimeoutError):
+            logger.warning("Réplica de leitura indisponível: %s", self.engine.url.host)
+            self.lag = None
+        return self.lag
+
+
+_replicas: Optional[List[ReadReplica]] = None
+_replica_turn = itertools.count()
+
+
+def get_replicas() -> List[ReadReplica]:
+    """Réplicas de settings.database_read_url (URLs separadas por vírgula)"""
+    global _replicas
+    if _replicas is None:
+        urls = (settings.database_read_url or "").split(",")
+        _replicas = [ReadReplica(url.strip()) for url in urls if url.strip()]
+    return _replicas
+
+
+async def pick_replica() -> Optional[ReadReplica]:
+    """
+    Próxima réplica em rodízio com atraso dentro de db_read_max_lag_seconds
+
+    Returns:
+        Réplica ou None (sem réplicas saudáveis: leia do primário)
+    """
+    replicas = get_replicas()
+    if not replicas:
+        return None
+
+    first = next(_replica_turn)
+    for offset in range(len(replicas)):
+        replica = replicas[(first + offset) % len(replicas)]
+        lag = await replica.check_lag()
+        if lag is not None and lag <= settings.db_read_max_lag_seconds:
+            return replica
+    return None
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Dependency para rotas somente leitura
+
+    Usa uma réplica quando há uma em dia; clientes que acabaram de
+    escrever (cookie PRIMARY_PIN_COOKIE) e a falta de réplicas saudáveis
+    levam ao primário. A sessão roda em AUTOCOMMIT, sem BEGIN nem
+    COMMIT/ROLLBACK; serviços que gravariam (ex.: rebuild_bitmap)
+    checam session.info["read_only"].
+    """
+    replica = None
+    if PRIMARY_PIN_COOKIE not in request.cookies:
+        replica = await pick_replica()
+
+    if replica is not None:
+        session = replica.sessions()
+    else:
+        session = async_session(bind=get_engine().execution_options(**AUTOCOMMIT))
+    async with session:
+        yield session
+
+
+class PrimaryPinMiddleware:
+    """
+    Middleware ASGI que fixa o cliente no primário após uma escrita
+
+    Respostas de sucesso a métodos não seguros (POST, PUT, DELETE...)
+    recebem o cookie PRIMARY_PIN_COOKIE por db_read_pin_seconds, o
+    suficiente para a réplica alcançar o que foi gravado.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or not settings.database_read_url
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PRIMARY_PIN_COOKIE}=1; Max-Age={settings.db_read_pin_seconds}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
 
 
 async def init_db():
-    """Inicializa o banco de dados (cria tabelas)"""
-    async with engine.begin() as conn:
+    """Cria as tabelas direto do metadata, sem migrações (testes e scripts locais)"""
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
 async def close_db():
-    """Fecha conexões do banco"""
-    await engine.dispose()
+    """Fecha conexões do banco e das réplicas (se chegaram a ser criadas)"""
+    global _engine, _session_factory, _replicas
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = _session_factory = None
+    for replica in _replicas or []:
+        await replica.engine.dispose()
+    _replicas = None
+
+
+# ===========================================
+# MIGRAÇÕES (ALEMBIC)
+# ===========================================
+
+# Revisão head de alembic/versions; atualizar junto com cada migração
+# nova (tests/test_database.py confere)
+SCHEMA_REVISION = "0001"
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+class SchemaNotReadyError(RuntimeError):
+    """Banco sem as migrações da versão atual do código"""
+
+    def __init__(self, revision: Optional[str]):
+        self.revision = revision
+        hint = "rode `alembic upgrade head`"
+        if revision is None:
+            # Banco criado pelo create_all (antes das migrações): o schema
+            # de partida é o de 0000, e 0001 completa o que faltar
+            hint = "banco criado com create_all: `alembic stamp 0000` e depois `alembic upgrade head`"
+        super().__init__(
+            f"Schema do banco na revisão {revision or 'nenhuma'}, esperado {SCHEMA_REVISION}: {hint}"
+        )
+
+
+async def schema_revision() -> Optional[str]:
+    """Revisão aplicada no banco (uma consulta em alembic_version; None se não migrado)"""
+    async with get_engine().connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except DBAPIError:
+            return None
+        return result.scalar()
+
+
+def alembic_config():
+    """Config do Alembic com caminhos absolutos (independe do diretório atual)"""
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations(revision: str = "head") -> None:
+    """Aplica as migrações (equivale a `alembic upgrade <revision>`)"""
+    from alembic import command
+
+    command.upgrade(alembic_config(), revision)
+
+
+async def ensure_schema() -> None:
+    """
+    Confere a versão do schema no startup (sem DDL nem inspeção de tabelas)
+
+    Com settings.db_migrate_on_startup (desenvolvimento) aplica as
+    migrações pendentes; senão o processo não sobe até o deploy rodar
+    `alembic upgrade head`.
+
+    Raises:
+        SchemaNotReadyError: Banco em outra revisão
+    """
+    revision = await schema_revision()
+    if revision == SCHEMA_REVISION:
+        return
+    if not settings.db_migrate_on_startup:
+        raise SchemaNotReadyError(revision)
+    # env.py roda o próprio loop: fora do loop da aplicação
+    await asyncio.to_thread(run_migrations)
@@ -2,14 +2,18 @@
 Dependencies do FastAPI - Rifei
 Funções de dependência para injeção em rotas
 """
-from typing import Optional, Annotated
+from typing import Optional, Annotated, Union
 from fastapi import Depends, HTTPException, status, Request, Cookie
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.models import User, UserRole
-from app.services.auth import verify_token, get_user_by_id
+from app.services.principals import (
+    ClaimsPrincipal,
+    resolve_principal,
+    resolve_claims_principal,
+)
 
 
 # ===========================================
@@ -58,36 +62,34 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # 4. Verificar token (DEVE ser do tipo "access", não "refresh")
-    payload = verify_token(token, token_type="access")
+    # 4. Verificar token (DEVE ser do tipo "access", não "refresh") e
+    #    carregar o usuário; tokens já vistos vêm do cache de principais
+    principal = await resolve_principal(db, token)
 
-    if not payload:
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido, expirado ou tipo incorreto",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 5. Extrair user_id do payload
-    user_id_str = payload.get("sub")
-    if not user_id_str:
+    # 5. Validar user_id do payload
+    if not principal.claims.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido: usuário não identificado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    try:
-        user_id = int(user_id_str)
-    except (ValueError, TypeError):
+    if principal.user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido: ID de usuário malformado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 6. Buscar usuário no banco
-    user = await get_user_by_id(db, user_id)
+    # 6. Usuário precisa existir
+    user = principal.user
 
     if not user:
         raise HTTPException(
@@ -146,29 +148,45 @@ async def get_optional_user(
     if not token:
         return None
 
-    # Verificar token (DEVE ser do tipo "access", não "refresh")
-    payload = verify_token(token, token_type="access")
+    # Verificar token e buscar usuário (via cache de principais)
+    principal = await resolve_principal(db, token)
 
-    if not payload:
+    if principal is None:
         return None
 
-    # Extrair user_id do payload
-    user_id_str = payload.get("sub")
-    if not user_id_str:
-        return None
+    user = principal.user
 
-    try:
-        user_id = int(user_id_str)
-    except (ValueError, TypeError):
+    if not user or not user.is_active:
         return None
 
-    # Buscar usuário
-    user = await get_user_by_id(db, user_id)
+    return user
+
 
-    if not user or not user.is_active:
+async def get_optional_claims_user(
+    request: Request,
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(security)],
+    db: AsyncSession = Depends(get_db),
+    session_token: Optional[str] = Cookie(default=None, alias="session_token")
+) -> Optional[Union[ClaimsPrincipal, User]]:
+    """
+    Como get_optional_user, mas monta o usuário a partir das claims do token.
+
+    Para páginas que só exibem nome/username/nível no header: não consulta
+    o banco (exceto para conferir a versão do token, em cache). O objeto
+    retornado tem apenas id, email, username, name, role, level e xp.
+    """
+    token = None
+
+    if credentials:
+        token = credentials.credentials
+
+    if not token and session_token:
+        token = session_token
+
+    if not token:
         return None
 
-    return user
+    return await resolve_claims_principal(db, token)
 
 
 # ===========================================
@@ -264,6 +282,7 @@ def require_owner_or_admin(resource_user_id_param: str = "user_id"):
 # Tipos anotados para uso mais limpo nas rotas
 CurrentUser = Annotated[User, Depends(get_current_user)]
 OptionalUser = Annotated[Optional[User], Depends(get_optional_user)]
+ClaimsUser = Annotated[Optional[Union[ClaimsPrincipal, User]], Depends(get_optional_claims_user)]
 ActiveUser = Annotated[User, Depends(get_current_active_user)]
 AdminUser = Annotated[User, Depends(get_admin_user)]
 CreatorUser = Annotated[User, Depends(get_creator_user)]
@@ -0,0 +1,95 @@
+"""
+Ambiente Jinja2 - Rifei
+Extensões, cache de bytecode e montagem do Jinja2Templates
+
+Importado só no primeiro render (app.templating): o jinja2 fica fora do
+import da aplicação, que é o cold start de uma função serverless.
+"""
+from contextlib import suppress
+from typing import Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.config import settings
+from app.templating import BASE_DIR, FLUSH_MARKER
+
+
+# ===========================================
+# STREAMING
+# ===========================================
+
+class StreamingExtension(Extension):
+    """
+    Tag {% flush %}: ponto em que o streaming envia o que já foi
+    renderizado e espera os dados adiados (deferred) da página.
+
+    Fica em layouts/base.html logo após a abertura do <body>: o <head>
+    com Tailwind/HTMX/Alpine sai antes das consultas ao banco. Fora do
+    streaming (render síncrono, sem dados adiados) não faz nada.
+    """
+
+    tags = {"flush"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        context = nodes.ContextReference()
+        return [
+            nodes.Output([self.call_method("_marker", [context])]).set_lineno(lineno),
+            nodes.Output([self.call_method("_resolve", [context])]).set_lineno(lineno),
+        ]
+
+    def _marker(self, context) -> str:
+        if self.environment.is_async and "_deferred" in context:
+            return Markup(FLUSH_MARKER)
+        return ""
+
+    def _resolve(self, context):
+        pending = context.get("_deferred")
+        if pending is None or not self.environment.is_async:
+            return ""
+        return self._resolve_async(context, pending)
+
+    async def _resolve_async(self, context, pending) -> str:
+        # Os blocos seguintes resolvem os nomes a partir do contexto
+        context.vars.update(await pending)
+        return ""
+
+
+# ===========================================
+# AMBIENTES
+# ===========================================
+
+class BytecodeCache(FileSystemBytecodeCache):
+    """Cache de bytecode em disco que tolera diretório somente leitura"""
+
+    def dump_bytecode(self, bucket) -> None:
+        # Em produção serverless o pacote é somente leitura: usa o que
+        # foi pré-compilado no build e compila em memória o resto
+        with suppress(OSError):
+            super().dump_bytecode(bucket)
+
+
+def bytecode_cache(kind: str, directory: Optional[str] = None) -> Optional[BytecodeCache]:
+    directory = directory or settings.template_bytecode_dir
+    if not directory:
+        return None
+    path = BASE_DIR / directory
+    with suppress(OSError):
+        path.mkdir(parents=True, exist_ok=True)
+    # O código gerado muda com enable_async: um arquivo por variante
+    return BytecodeCache(str(path), f"__jinja2_%s.{kind}.cache")
+
+
+def create_templates(enable_async: bool, bytecode_dir: Optional[str] = None) -> Jinja2Templates:
+    """Jinja2Templates sobre app/templates com as extensões do Rifei"""
+    env = Environment(
+        loader=FileSystemLoader(BASE_DIR / "templates"),
+        autoescape=True,
+        enable_async=enable_async,
+        extensions=[StreamingExtension],
+        bytecode_cache=bytecode_cache("async" if enable_async else "sync", bytecode_dir),
+    )
+    return Jinja2Templates(env=env)
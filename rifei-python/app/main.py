@@ -2,21 +2,30 @@
 Rifei - Plataforma de Rifas e Sorteios
 Aplicação principal FastAPI
 """
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 from typing import Optional
 
 from fastapi import FastAPI, Request, Depends, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database import init_db, close_db, get_db
-from app.dependencies import get_optional_user, OptionalUser, get_current_user, CurrentUser
+from app.database import ensure_schema, close_db, get_db, get_read_db, async_session, PrimaryPinMiddleware
+from app.dependencies import get_optional_user, OptionalUser, ClaimsUser, get_current_user, CurrentUser
 from app.models.models import User, RifaStatus
 from app.services import marketplace as marketplace_service
+from app.services import reservations as reservations_service
+from app.services import counters as counters_service
+from app.services import stats as stats_service
+from app.services import refresh_tokens as refresh_tokens_service
+from app.services import availability as availability_service
+from app.services.passwords import PasswordHasherBusyError, password_hasher
+from app.ratelimit import RateLimitExceeded
+from app.response_cache import ResponseCacheMiddleware
+from app.templating import templates, render_static_page, stream_template
 from app.schemas.marketplace import RifaFilters
 
 # Importar routers
@@ -28,14 +37,39 @@ BASE_DIR = Path(__file__).resolve().parent
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Gerencia ciclo de vida da aplicação"""
+    """
+    Gerencia ciclo de vida da aplicação
+
+    O schema vem das migrações (alembic upgrade head no deploy): o
+    startup só confere a revisão aplicada. Com settings.fast_start
+    (serverless) o startup não toca no banco: os filtros de
+    disponibilidade se montam na primeira consulta e as estatísticas
+    são calculadas sob demanda.
+    """
     # Startup
     print("🚀 Iniciando Rifei...")
-    await init_db()
-    print("✅ Banco de dados conectado")
+    background = [
+        reservations_service.run_expiry_worker,
+        counters_service.run_counters_worker,
+        refresh_tokens_service.run_purge_worker,
+    ]
+    if not settings.fast_start:
+        await ensure_schema()
+        print("✅ Banco de dados conectado")
+        async with async_session() as db:
+            await availability_service.warm_up(db)
+        background.append(stats_service.run_stats_worker)
+    background_tasks = [asyncio.create_task(worker()) for worker in background]
     yield
     # Shutdown
     print("👋 Encerrando Rifei...")
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    async with async_session() as db:
+        await counters_service.flush_view_counts(db)
+    password_hasher.shutdown()
     await close_db()
 
 
@@ -49,11 +83,38 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Cache de respostas das rotas marcadas com @cache_response
+app.add_middleware(ResponseCacheMiddleware)
+
+# Após uma escrita, o cliente lê do primário (réplicas de leitura)
+app.add_middleware(PrimaryPinMiddleware)
+
 # Montar arquivos estáticos
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
 
-# Configurar templates Jinja2
-templates = Jinja2Templates(directory=BASE_DIR / "templates")
+
+# ===========================================
+# HANDLERS DE ERRO
+# ===========================================
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    """Pool de hashing saturado: pede para o cliente tentar de novo"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    """Limite de tentativas atingido (login, cadastro, verificações)"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 # ===========================================
@@ -171,7 +232,7 @@ MOCK_RIFAS = [
 @app.get("/", response_class=HTMLResponse)
 async def home(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página inicial"""
     return templates.TemplateResponse(
@@ -188,7 +249,11 @@ async def home(
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "app": settings.app_name}
+    return {
+        "status": "healthy",
+        "app": settings.app_name,
+        "password_hasher": password_hasher.metrics(),
+    }
 
 
 # ===========================================
@@ -198,8 +263,8 @@ async def health_check():
 @app.get("/marketplace", response_class=HTMLResponse)
 async def marketplace_page(
     request: Request,
-    user: OptionalUser,
-    db: AsyncSession = Depends(get_db),
+    user: ClaimsUser,
+    db: AsyncSession = Depends(get_read_db),
     search: Optional[str] = Query(None),
     category: Optional[int] = Query(None),
     min_price: Optional[float] = Query(None),
@@ -224,31 +289,34 @@ async def marketplace_page(
         status=RifaStatus.ACTIVE,
     )
 
-    # Get rifas and categories from database
-    rifas, total = await marketplace_service.list_rifas(db, filters)
-    categories = await marketplace_service.list_categories(db)
-
-    # Build pagination info
-    total_pages = (total + filters.per_page - 1) // filters.per_page
-    pagination = {
-        "total": total,
-        "page": page,
-        "per_page": filters.per_page,
-        "total_pages": total_pages,
-        "has_prev": page > 1,
-        "has_next": page < total_pages,
-    }
+    async def load_page() -> dict:
+        # Get rifas and categories from database
+        rifas, total = await marketplace_service.list_rifas(db, filters)
+        categories = await marketplace_service.list_categories(db)
+
+        # Build pagination info
+        total_pages = (total + filters.per_page - 1) // filters.per_page
+        pagination = {
+            "total": total,
+            "page": page,
+            "per_page": filters.per_page,
+            "total_pages": total_pages,
+            "has_prev": page > 1,
+            "has_next": page < total_pages,
+        }
+        return {"rifas": rifas, "categories": categories, "pagination": pagination}
 
-    return templates.TemplateResponse(
+    # O shell da página sai antes das consultas (ver stream_template)
+    return stream_template(
+        request,
         "pages/marketplace.html",
         {
-            "request": request,
             "user": user,
-            "rifas": rifas,
-            "categories": categories,
             "filters": filters,
-            "pagination": pagination,
-        }
+            "active_page": "marketplace",
+        },
+        deferred=load_page(),
+        db=db,
     )
 
 
@@ -256,31 +324,46 @@ async def marketplace_page(
 async def rifa_detail_page(
     request: Request,
     slug: str,
-    user: OptionalUser,
-    db: AsyncSession = Depends(get_db),
+    user: ClaimsUser,
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Página de detalhe da rifa"""
-    # Get rifa by slug
-    rifa = await marketplace_service.get_rifa_by_slug(db, slug, increment_view=True)
+    # Rifa, criador, categoria e disponibilidade em uma query
+    detail = await marketplace_service.load_rifa_detail(db, slug=slug, increment_view=True)
 
-    if not rifa:
+    if not detail:
         return RedirectResponse(url="/marketplace")
 
-    # Get available numbers
-    available_numbers = await marketplace_service.get_available_numbers(db, rifa.id)
+    # Grade virtualizada: só a primeira janela vai no HTML, as demais
+    # vêm de /marketplace/api/rifas/{id}/numbers sob demanda
+    window_end = min(settings.number_grid_window_size, detail.bitmap.total)
+    number_grid = {
+        "rifaId": detail.rifa.id,
+        "totalNumbers": detail.bitmap.total,
+        "windowSize": settings.number_grid_window_size,
+        "maxNumbers": detail.rifa.max_numbers_per_user or 10,
+        "price": float(detail.rifa.price),
+        "window": {
+            "start": 1,
+            "end": window_end,
+            "ranges": detail.bitmap.available_ranges(1, window_end),
+        },
+    }
 
-    # Get categories for sidebar
-    categories = await marketplace_service.list_categories(db)
+    async def load_sidebar() -> dict:
+        # Get categories for sidebar
+        return {"categories": await marketplace_service.list_categories(db)}
 
-    return templates.TemplateResponse(
+    return stream_template(
+        request,
         "pages/rifa_detail.html",
         {
-            "request": request,
             "user": user,
-            "rifa": rifa,
-            "available_numbers": available_numbers,
-            "categories": categories,
-        }
+            "rifa": detail.rifa,
+            "number_grid": number_grid,
+        },
+        deferred=load_sidebar(),
+        db=db,
     )
 
 
@@ -358,6 +441,7 @@ async def dashboard_page(
             "stats": stats,
             "participations": participations,
             "categories": categories,
+            "active_page": "dashboard",
         }
     )
 
@@ -388,8 +472,8 @@ async def configuracoes_page(
 async def categoria_page(
     request: Request,
     slug: str,
-    user: OptionalUser,
-    db: AsyncSession = Depends(get_db),
+    user: ClaimsUser,
+    db: AsyncSession = Depends(get_read_db),
     search: Optional[str] = Query(None),
     sort: Optional[str] = Query("created_at:desc"),
     page: int = Query(1, ge=1),
@@ -467,6 +551,7 @@ async def criar_rifa_page(
             "request": request,
             "user": user,
             "categories": categories,
+            "active_page": "criar",
         }
     )
 
@@ -474,7 +559,7 @@ async def criar_rifa_page(
 @app.get("/feed", response_class=HTMLResponse)
 async def feed_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
     db: AsyncSession = Depends(get_db),
 ):
     """Página de feed social"""
@@ -487,6 +572,7 @@ async def feed_page(
             "user": user,
             "categories": categories,
             "feed_posts": [],  # Will be populated later
+            "active_page": "feed",
         }
     )
 
@@ -494,13 +580,13 @@ async def feed_page(
 @app.get("/como-funciona", response_class=HTMLResponse)
 async def como_funciona_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página Como Funciona"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/como-funciona.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
@@ -510,13 +596,13 @@ async def como_funciona_page(
 @app.get("/ajuda", response_class=HTMLResponse)
 async def ajuda_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página de Ajuda/FAQ"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/ajuda.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
@@ -526,13 +612,13 @@ async def ajuda_page(
 @app.get("/contato", response_class=HTMLResponse)
 async def contato_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página de Contato"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/contato.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
@@ -542,13 +628,13 @@ async def contato_page(
 @app.get("/premium", response_class=HTMLResponse)
 async def premium_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página do Rifei Premium"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/premium.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
@@ -558,13 +644,13 @@ async def premium_page(
 @app.get("/termos", response_class=HTMLResponse)
 async def termos_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página de Termos de Uso"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/termos.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
@@ -574,13 +660,13 @@ async def termos_page(
 @app.get("/privacidade", response_class=HTMLResponse)
 async def privacidade_page(
     request: Request,
-    user: OptionalUser,
+    user: ClaimsUser,
 ):
     """Página de Política de Privacidade"""
-    return templates.TemplateResponse(
+    return render_static_page(
+        request,
         "pages/privacidade.html",
         {
-            "request": request,
             "user": user,
             "categories": MOCK_CATEGORIES,
         }
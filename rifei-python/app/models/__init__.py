@@ -4,10 +4,12 @@ Models do Rifei
 from app.models.models import (
     User,
     UserRole,
+    RefreshToken,
     Category,
     Rifa,
     RifaStatus,
     Ticket,
+    NumberReservation,
     Payment,
     PaymentStatus,
     PaymentMethod,
@@ -17,10 +19,12 @@ from app.models.models import (
 __all__ = [
     "User",
     "UserRole",
+    "RefreshToken",
     "Category",
     "Rifa",
     "RifaStatus",
     "Ticket",
+    "NumberReservation",
     "Payment",
     "PaymentStatus",
     "PaymentMethod",
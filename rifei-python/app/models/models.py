@@ -6,7 +6,7 @@ from decimal import Decimal
 from typing import Optional, List
 from sqlalchemy import (
     String, Integer, Text, Boolean, DateTime, Numeric, 
-    ForeignKey, Enum as SQLEnum, JSON, Index
+    ForeignKey, Enum as SQLEnum, JSON, Index, LargeBinary
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -52,6 +52,10 @@ class PaymentMethod(str, enum.Enum):
 
 class TimestampMixin:
     """Mixin para campos de timestamp"""
+    # created_at/updated_at voltam no RETURNING do INSERT/UPDATE (sem
+    # refresh depois do flush)
+    __mapper_args__ = {"eager_defaults": True}
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -89,6 +93,8 @@ class User(Base, TimestampMixin):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # Versão dos tokens (claim "ver"); incrementar revoga os tokens emitidos
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     
     # Gamificação
     level: Mapped[int] = mapped_column(Integer, default=1)
@@ -109,6 +115,34 @@ class User(Base, TimestampMixin):
         return f"<User {self.username}>"
 
 
+class RefreshToken(Base, TimestampMixin):
+    """Refresh token emitido (registro no servidor para rotação e revogação)"""
+    __tablename__ = "refresh_tokens"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    
+    # Claim "jti" do token; tokens renovados a partir do mesmo login
+    # compartilham a família (claim "fam")
+    jti: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
+    family_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    used_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    
+    # Índices (revogação por família/usuário; expiração varrida em lote)
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+    
+    def __repr__(self):
+        return f"<RefreshToken {self.jti} - User {self.user_id}>"
+
+
 class Category(Base, TimestampMixin):
     """Categoria de rifas"""
     __tablename__ = "categories"
@@ -164,13 +198,19 @@ class Rifa(Base, TimestampMixin):
     sold_count: Mapped[int] = mapped_column(Integer, default=0)
     view_count: Mapped[int] = mapped_column(Integer, default=0)
     
+    # Bitmap de números vendidos (bit n-1 = número n vendido).
+    # Carregado sob demanda via app.services.numbers para não pesar listagens.
+    numbers_bitmap: Mapped[Optional[bytes]] = mapped_column(LargeBinary, deferred=True)
+    
     # Flags
     is_featured: Mapped[bool] = mapped_column(Boolean, default=False)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     
     # Relacionamentos
     creator_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    creator: Mapped["User"] = relationship("User", back_populates="rifas")
+    creator: Mapped["User"] = relationship(
+        "User", back_populates="rifas", foreign_keys=[creator_id]
+    )
     
     category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("categories.id"))
     category: Mapped[Optional["Category"]] = relationship("Category", back_populates="rifas")
@@ -229,6 +269,29 @@ class Ticket(Base, TimestampMixin):
         return f"<Ticket #{self.number} - Rifa {self.rifa_id}>"
 
 
+class NumberReservation(Base, TimestampMixin):
+    """Reserva temporária (hold) de um número durante a compra"""
+    __tablename__ = "number_reservations"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    
+    number: Mapped[int] = mapped_column(Integer, nullable=False)
+    reserved_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    rifa_id: Mapped[int] = mapped_column(Integer, ForeignKey("rifas.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Índices (um hold por número; expiração varrida em lote)
+    __table_args__ = (
+        Index("ix_number_reservations_rifa_number", "rifa_id", "number", unique=True),
+        Index("ix_number_reservations_reserved_until", "reserved_until"),
+        Index("ix_number_reservations_user_rifa", "user_id", "rifa_id"),
+    )
+    
+    def __repr__(self):
+        return f"<NumberReservation #{self.number} - Rifa {self.rifa_id}>"
+
+
 class Payment(Base, TimestampMixin):
     """Pagamento"""
     __tablename__ = "payments"
@@ -0,0 +1,253 @@
+"""
+Rate limiting - Rifei
+Contadores de janela deslizante por IP e por identificador (email/username),
+no Redis quando settings.redis_url está configurado e em memória caso contrário
+"""
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+from app.cache import get_redis, mark_redis_down
+from app.config import settings
+
+
+class RateLimitExceeded(Exception):
+    """Limite de tentativas atingido (responder 429 com Retry-After)"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__("Muitas tentativas. Tente novamente em instantes.")
+
+
+# ===========================================
+# JANELA DESLIZANTE
+# ===========================================
+
+def _estimate(previous: int, current: int, window: float, elapsed: float) -> float:
+    """
+    Requisições na última janela, aproximadas a partir de dois contadores
+    fixos: o da janela anterior pesa pela fração que ainda se sobrepõe.
+    """
+    return previous * (window - elapsed) / window + current
+
+
+def _retry_after(previous: int, current: int, limit: int, window: float, elapsed: float) -> int:
+    """Segundos até caber mais uma requisição"""
+    if current < limit and previous:
+        # Esperar a janela anterior "escorrer" o suficiente
+        wait = (window - elapsed) - (limit - 1 - current) * window / previous
+    else:
+        # Só na próxima janela, quando current vira previous
+        wait = (window - elapsed) + window * max(0.0, 1 - (limit - 1) / max(current, 1))
+    return max(1, math.ceil(wait))
+
+
+class LocalRateLimiter:
+    """
+    Contadores em memória do processo: [janela, anterior, atual] por chave.
+
+    Memória O(1) por chave; as chaves menos usadas são descartadas
+    além de maxsize.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def hit(self, key: str, limit: int, window: int, now: Optional[float] = None) -> int:
+        """
+        Registra uma requisição
+
+        Returns:
+            0 se permitida, ou os segundos de Retry-After se recusada
+            (requisições recusadas não contam)
+        """
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, window)
+        index = int(index)
+
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = [index, 0, 0]
+                self._counters[key] = counter
+                while len(self._counters) > self.maxsize:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+
+            if counter[0] != index:
+                counter[1] = counter[2] if counter[0] == index - 1 else 0
+                counter[2] = 0
+                counter[0] = index
+
+            _, previous, current = counter
+            if _estimate(previous, current, window, elapsed) + 1 > limit:
+                return _retry_after(previous, current, limit, window, elapsed)
+
+            counter[2] += 1
+            return 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+local_limiter = LocalRateLimiter()
+
+
+async def _redis_hit(client, key: str, limit: int, window: int) -> int:
+    """Mesma janela deslizante com dois contadores INCR/EXPIRE no Redis"""
+    now = time.time()
+    index, elapsed = divmod(now, window)
+    index = int(index)
+    current_key = f"rifei:ratelimit:{key}:{index}"
+
+    pipe = client.pipeline()
+    pipe.incr(current_key)
+    pipe.expire(current_key, window * 2)
+    pipe.get(f"rifei:ratelimit:{key}:{index - 1}")
+    current, _, previous = await pipe.execute()
+
+    previous = int(previous or 0)
+    # current já inclui esta requisição
+    if _estimate(previous, current - 1, window, elapsed) + 1 > limit:
+        await client.decr(current_key)
+        return _retry_after(previous, current - 1, limit, window, elapsed)
+    return 0
+
+
+async def hit(key: str, limit: int, window: int) -> None:
+    """
+    Conta uma requisição para a chave
+
+    Raises:
+        RateLimitExceeded: Se o limite da janela foi atingido
+    """
+    retry_after = None
+    client = get_redis()
+    if client is not None:
+        try:
+            retry_after = await _redis_hit(client, key, limit, window)
+        except Exception as e:
+            mark_redis_down(e)
+
+    if retry_after is None:
+        retry_after = local_limiter.hit(key, limit, window)
+
+    if retry_after:
+        raise RateLimitExceeded(retry_after)
+
+
+# ===========================================
+# DEPENDENCY
+# ===========================================
+
+@lru_cache(maxsize=8)
+def _trusted_proxies(value: str) -> Tuple[bool, tuple]:
+    """(confia em qualquer proxy, redes confiáveis) a partir de settings.trusted_proxies"""
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    if "*" in items:
+        return True, ()
+    return False, tuple(ipaddress.ip_network(item, strict=False) for item in items)
+
+
+def _is_trusted(host: str, trust_all: bool, networks: tuple) -> bool:
+    if trust_all:
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request: Request) -> str:
+    """
+    IP do cliente para os limites por IP
+
+    Se a conexão vem de um proxy confiável (settings.trusted_proxies), o
+    IP é lido do X-Forwarded-For: da direita para a esquerda, o primeiro
+    endereço que não é de proxy confiável. Sem proxies configurados o
+    header é ignorado, já que qualquer cliente pode enviá-lo.
+    """
+    peer = request.client.host if request.client else "unknown"
+    trust_all, networks = _trusted_proxies(settings.trusted_proxies)
+    if not (trust_all or networks) or not _is_trusted(peer, trust_all, networks):
+        return peer
+
+    forwarded = [
+        host.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for host in header.split(",")
+        if host.strip()
+    ]
+    for host in reversed(forwarded):
+        if not _is_trusted(host, trust_all, networks):
+            return host
+    return forwarded[0] if forwarded else peer
+
+
+async def _identifier(request: Request, field: str) -> Optional[str]:
+    """Valor do campo na query, no JSON ou no formulário (o corpo fica em cache no Request)"""
+    value = request.query_params.get(field)
+    if value is None and request.method == "POST":
+        content_type = request.headers.get("content-type", "")
+        try:
+            if content_type.startswith("application/json"):
+                body = await request.json()
+                value = body.get(field) if isinstance(body, dict) else None
+            elif "form" in content_type:
+                value = (await request.form()).get(field)
+        except Exception:
+            value = None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip().lower()
+
+
+class RateLimit:
+    """
+    Dependency de rate limit para um escopo de rotas.
+
+    Lê os limites de settings: rate_limit_<escopo>_per_ip,
+    rate_limit_<escopo>_per_account (se houver identifier) e
+    rate_limit_<escopo>_window_seconds.
+
+    Uso:
+        @router.post("/api/auth/login", dependencies=[Depends(RateLimit("login", identifier="email"))])
+    """
+
+    def __init__(self, scope: str, identifier: Optional[str] = None):
+        self.scope = scope
+        self.identifier = identifier
+
+    def _limits(self) -> Tuple[int, Optional[int], int]:
+        prefix = f"rate_limit_{self.scope}"
+        return (
+            getattr(settings, f"{prefix}_per_ip"),
+            getattr(settings, f"{prefix}_per_account", None) if self.identifier else None,
+            getattr(settings, f"{prefix}_window_seconds"),
+        )
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.rate_limit_enabled:
+            return
+
+        per_ip, per_account, window = self._limits()
+        await hit(f"{self.scope}:ip:{client_ip(request)}", per_ip, window)
+
+        if per_account:
+            value = await _identifier(request, self.identifier)
+            if value is not None:
+                await hit(f"{self.scope}:{self.identifier}:{value}", per_account, window)
@@ -0,0 +1,216 @@
+"""
+Cache de respostas - Rifei
+Middleware que guarda respostas JSON de rotas públicas marcadas com
+@cache_response, com ETag forte, 304 e invalidação por tags
+"""
+import hashlib
+import time
+import uuid
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import Cache
+from app.config import settings
+from app.database import PRIMARY_PIN_COOKIE
+
+
+# Respostas guardadas (Redis se configurado) e versão atual de cada tag
+response_store = Cache("responses", maxsize=1024)
+tag_versions = Cache("response_tags", maxsize=256)
+
+# Versões de tag vivem bem mais que qualquer resposta
+_TAG_VERSION_SECONDS = 86400
+
+# Headers recalculados a cada envio; os demais da rota são guardados
+_GENERATED_HEADERS = {b"etag", b"cache-control", b"age", b"x-cache", b"content-type", b"content-length"}
+
+
+class CacheRule(NamedTuple):
+    """Configuração de cache de uma rota"""
+    ttl: Optional[int]
+    tags: Tuple[str, ...]
+    bypass: Tuple[str, ...]
+
+
+def cache_response(
+    ttl: Optional[int] = None,
+    tags: Tuple[str, ...] = (),
+    bypass: Tuple[str, ...] = (),
+):
+    """
+    Marca uma rota GET pública para o ResponseCacheMiddleware
+
+    Args:
+        ttl: Segundos em cache (padrão: settings.response_cache_seconds)
+        tags: Tags invalidadas por invalidate_tags() quando os dados mudam
+        bypass: Parâmetros de query que desligam o cache (ex.: "fresh")
+
+    Uso:
+        @router.get("/api/categories")
+        @cache_response(ttl=60, tags=("categories",))
+        async def api_list_categories(...): ...
+    """
+    def decorator(endpoint):
+        endpoint._response_cache = CacheRule(ttl, tuple(tags), tuple(bypass))
+        return endpoint
+    return decorator
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Invalida todas as respostas com alguma das tags (em todos os workers, com Redis)"""
+    for tag in tags:
+        await tag_versions.set(tag, uuid.uuid4().hex, _TAG_VERSION_SECONDS)
+
+
+async def _current_versions(tags: Tuple[str, ...]) -> Dict[str, str]:
+    return {tag: await tag_versions.get(tag) or "" for tag in tags}
+
+
+def _cache_key(path: str, query: QueryParams) -> str:
+    """Rota + query normalizada (ordem dos parâmetros não importa)"""
+    items = sorted((key, value) for key, value in query.multi_items() if value != "")
+    return f"{path}?{urlencode(items)}"
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI do cache de respostas.
+
+    Só age em GET de rotas marcadas com @cache_response e em respostas
+    200 JSON sem Set-Cookie (cookie é de um cliente, não vai para o
+    cache); os demais headers da rota são guardados e reenviados.
+    Responde com ETag e Cache-Control (max-age +
+    stale-while-revalidate), e 304 quando o If-None-Match bate. Clientes
+    fixados no primário após uma escrita passam direto (ler o que
+    gravaram, não uma resposta montada a partir da réplica).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._rules: Optional[Dict[str, CacheRule]] = None
+
+    def _rule_for(self, scope: Scope) -> Optional[CacheRule]:
+        if self._rules is None:
+            self._rules = {
+                route.path: route.endpoint._response_cache
+                for route in scope["app"].routes
+                if hasattr(getattr(route, "endpoint", None), "_response_cache")
+            }
+        return self._rules.get(scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not settings.response_cache_enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._rule_for(scope)
+        query = QueryParams(scope.get("query_string", b""))
+        request_headers = Headers(scope=scope)
+        if (
+            rule is None
+            or any(name in query for name in rule.bypass)
+            or PRIMARY_PIN_COOKIE in cookie_parser(request_headers.get("cookie", ""))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        ttl = rule.ttl or settings.response_cache_seconds
+        key = _cache_key(scope["path"], query)
+        versions = await _current_versions(rule.tags)
+
+        entry = await response_store.get(key)
+        if entry is not None and entry["versions"] == versions:
+            await self._send(send, request_headers, entry, ttl, "HIT")
+            return
+
+        # Miss: executa a rota guardando a resposta antes de enviar
+        messages = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+
+        start = messages[0] if messages else None
+        headers = Headers(raw=start["headers"]) if start else None
+        if (
+            start is None
+            or start["status"] != 200
+            or not headers.get("content-type", "").startswith("application/json")
+            or "set-cookie" in headers
+        ):
+            for message in messages:
+                await send(message)
+            return
+
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        entry = {
+            "body": body.decode(),
+            "etag": _etag(body),
+            "media_type": headers["content-type"],
+            "headers": [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in start["headers"]
+                if name.lower() not in _GENERATED_HEADERS
+            ],
+            "stored_at": time.time(),
+            "versions": versions,
+        }
+        await response_store.set(key, entry, ttl)
+        await self._send(send, request_headers, entry, ttl, "MISS")
+
+    async def _send(
+        self,
+        send: Send,
+        request_headers: Headers,
+        entry: dict,
+        ttl: int,
+        status_label: str,
+    ) -> None:
+        age = max(0, int(time.time() - entry["stored_at"]))
+        headers = [
+            (b"etag", entry["etag"].encode()),
+            (
+                b"cache-control",
+                f"public, max-age={ttl}, "
+                f"stale-while-revalidate={settings.response_cache_stale_seconds}".encode(),
+            ),
+            (b"age", str(age).encode()),
+            (b"x-cache", status_label.encode()),
+        ]
+        headers += [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in entry.get("headers", ())
+        ]
+
+        if _etag_matches(request_headers.get("if-none-match"), entry["etag"]):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry["body"].encode()
+        headers += [
+            (b"content-type", entry["media_type"].encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
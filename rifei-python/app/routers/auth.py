@@ -2,13 +2,11 @@
 Router de Autenticação - Rifei
 Rotas para login, cadastro, logout e perfil
 """
-from datetime import timedelta
-from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi import APIRouter, Cookie, Depends, HTTPException, status, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
@@ -20,7 +18,8 @@ from app.schemas.auth import (
     UserResponse, 
     Token, 
     AuthResponse,
-    MessageResponse
+    MessageResponse,
+    RefreshRequest,
 )
 from app.services.auth import (
     authenticate_user,
@@ -28,10 +27,20 @@ from app.services.auth import (
     check_email_exists,
     check_username_exists,
     generate_tokens_for_user,
-    create_access_token,
     get_token_expiry_seconds,
 )
+from app.services.availability import email_taken, username_taken
+from app.services.passwords import PasswordHasherBusyError
+from app.services.refresh_tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    refresh_token_lifetime,
+    revoke_token,
+    rotate_refresh_token,
+)
 from app.dependencies import get_current_user, get_optional_user, OptionalUser
+from app.ratelimit import RateLimit
+from app.templating import templates
 
 
 # ===========================================
@@ -40,9 +49,34 @@ from app.dependencies import get_current_user, get_optional_user, OptionalUser
 
 router = APIRouter()
 
-# Templates
-BASE_DIR = Path(__file__).resolve().parent.parent
-templates = Jinja2Templates(directory=BASE_DIR / "templates")
+# Rate limit (ver settings.rate_limit_*)
+login_rate_limit = RateLimit("login", identifier="email")
+register_rate_limit = RateLimit("register")
+check_rate_limit = RateLimit("check")
+
+# Cookie do refresh token (httponly; renovado a cada uso)
+REFRESH_COOKIE = "refresh_token"
+
+
+def _set_refresh_cookie(response: Response, refresh_token: str) -> None:
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=refresh_token,
+        httponly=True,
+        secure=settings.is_production,
+        samesite="lax",
+        max_age=int(refresh_token_lifetime().total_seconds()),
+    )
+
+
+def _delete_auth_cookies(response: Response) -> None:
+    for key in ("session_token", REFRESH_COOKIE):
+        response.delete_cookie(
+            key=key,
+            httponly=True,
+            secure=settings.is_production,
+            samesite="lax",
+        )
 
 
 # ===========================================
@@ -97,7 +131,12 @@ async def cadastro_page(
 # ROTAS DA API
 # ===========================================
 
-@router.post("/api/auth/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/api/auth/register",
+    response_model=AuthResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(register_rate_limit)],
+)
 async def api_register(
     user_data: UserCreate,
     response: Response,
@@ -125,10 +164,11 @@ async def api_register(
     # Criar usuário
     user = await create_user(db, user_data)
     
-    # Gerar tokens
-    tokens = generate_tokens_for_user(user)
+    # Gerar tokens (refresh token registrado no servidor)
+    refresh_token = await issue_refresh_token(db, user.id)
+    tokens = generate_tokens_for_user(user, refresh_token=refresh_token)
     
-    # Setar cookie de sessão
+    # Setar cookies de sessão e de refresh
     response.set_cookie(
         key="session_token",
         value=tokens["access_token"],
@@ -137,19 +177,21 @@ async def api_register(
         samesite="lax",
         max_age=tokens["expires_in"],
     )
+    _set_refresh_cookie(response, refresh_token)
     
     return AuthResponse(
         user=UserResponse.model_validate(user),
         token=Token(
             access_token=tokens["access_token"],
             token_type=tokens["token_type"],
-            expires_in=tokens["expires_in"]
+            expires_in=tokens["expires_in"],
+            refresh_token=refresh_token,
         ),
         message="Conta criada com sucesso! Bem-vindo ao Rifei!"
     )
 
 
-@router.post("/api/auth/login", response_model=AuthResponse)
+@router.post("/api/auth/login", response_model=AuthResponse, dependencies=[Depends(login_rate_limit)])
 async def api_login(
     login_data: UserLogin,
     response: Response,
@@ -175,26 +217,15 @@ async def api_login(
             detail="Esta conta foi desativada"
         )
     
-    # Gerar tokens
-    # Se "remember" estiver ativo, aumentar tempo de expiração
-    if login_data.remember:
-        expires_delta = timedelta(days=30)
-        access_token = create_access_token(
-            data={
-                "sub": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "role": user.role.value,
-            },
-            expires_delta=expires_delta
-        )
-        expires_in = int(expires_delta.total_seconds())
-    else:
-        tokens = generate_tokens_for_user(user)
-        access_token = tokens["access_token"]
-        expires_in = tokens["expires_in"]
+    # Gerar tokens ("remember" só aumenta o tempo de expiração)
+    refresh_token = await issue_refresh_token(db, user.id)
+    tokens = generate_tokens_for_user(
+        user, refresh_token=refresh_token, remember=login_data.remember
+    )
+    access_token = tokens["access_token"]
+    expires_in = tokens["expires_in"]
     
-    # Setar cookie de sessão
+    # Setar cookies de sessão e de refresh
     response.set_cookie(
         key="session_token",
         value=access_token,
@@ -203,33 +234,85 @@ async def api_login(
         samesite="lax",
         max_age=expires_in,
     )
+    _set_refresh_cookie(response, refresh_token)
     
     return AuthResponse(
         user=UserResponse.model_validate(user),
         token=Token(
             access_token=access_token,
             token_type="bearer",
-            expires_in=expires_in
+            expires_in=expires_in,
+            refresh_token=refresh_token,
         ),
         message="Login realizado com sucesso!"
     )
 
 
 @router.post("/api/auth/logout", response_model=MessageResponse)
-async def api_logout(response: Response):
+async def api_logout(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    refresh_cookie: Optional[str] = Cookie(default=None, alias=REFRESH_COOKIE),
+):
+    """
+    Realiza logout removendo os cookies e revogando o refresh token.
+    """
+    if refresh_cookie:
+        await revoke_token(db, refresh_cookie)
+    
+    _delete_auth_cookies(response)
+    
+    return MessageResponse(
+        message="Logout realizado com sucesso",
+        success=True
+    )
+
+
+@router.post("/api/auth/refresh", response_model=Token)
+async def api_refresh(
+    response: Response,
+    body: Optional[RefreshRequest] = None,
+    db: AsyncSession = Depends(get_db),
+    refresh_cookie: Optional[str] = Cookie(default=None, alias=REFRESH_COOKIE),
+):
     """
-    Realiza logout removendo o cookie de sessão.
+    Troca um refresh token (corpo ou cookie) por um novo access token.
+    
+    O refresh token é rotacionado: o antigo deixa de valer e um novo é
+    devolvido. Reapresentar um token já usado revoga toda a sessão.
     """
-    response.delete_cookie(
+    token = (body.refresh_token if body else None) or refresh_cookie
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token ausente",
+        )
+    
+    try:
+        user, refresh_token = await rotate_refresh_token(db, token)
+    except RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Refresh token {e.reason}",
+        )
+    
+    tokens = generate_tokens_for_user(user, refresh_token=refresh_token)
+    
+    response.set_cookie(
         key="session_token",
+        value=tokens["access_token"],
         httponly=True,
         secure=settings.is_production,
         samesite="lax",
+        max_age=tokens["expires_in"],
     )
+    _set_refresh_cookie(response, refresh_token)
     
-    return MessageResponse(
-        message="Logout realizado com sucesso",
-        success=True
+    return Token(
+        access_token=tokens["access_token"],
+        token_type=tokens["token_type"],
+        expires_in=tokens["expires_in"],
+        refresh_token=refresh_token,
     )
 
 
@@ -262,29 +345,31 @@ async def api_check_auth(user: OptionalUser):
     return {"authenticated": False}
 
 
-@router.post("/api/auth/check-email")
+@router.post("/api/auth/check-email", dependencies=[Depends(check_rate_limit)])
 async def api_check_email(
     email: str,
     db: AsyncSession = Depends(get_db),
 ):
     """
     Verifica se um email já está cadastrado.
-    Útil para validação em tempo real no formulário.
+    Útil para validação em tempo real no formulário (filtro de Bloom
+    antes do banco; o cadastro em si confere no banco).
     """
-    exists = await check_email_exists(db, email)
+    exists = await email_taken(db, email)
     return {"exists": exists}
 
 
-@router.post("/api/auth/check-username")
+@router.post("/api/auth/check-username", dependencies=[Depends(check_rate_limit)])
 async def api_check_username(
     username: str,
     db: AsyncSession = Depends(get_db),
 ):
     """
     Verifica se um username já está em uso.
-    Útil para validação em tempo real no formulário.
+    Útil para validação em tempo real no formulário (filtro de Bloom
+    antes do banco; o cadastro em si confere no banco).
     """
-    exists = await check_username_exists(db, username)
+    exists = await username_taken(db, username)
     return {"exists": exists}
 
 
@@ -292,7 +377,7 @@ async def api_check_username(
 # ROTAS DE FORM (HTMX/FORM SUBMIT)
 # ===========================================
 
-@router.post("/auth/register", response_class=HTMLResponse)
+@router.post("/auth/register", response_class=HTMLResponse, dependencies=[Depends(register_rate_limit)])
 async def form_register(
     request: Request,
     response: Response,
@@ -355,8 +440,9 @@ async def form_register(
         )
         user = await create_user(db, user_data)
         
-        # Gerar token e setar cookie
-        tokens = generate_tokens_for_user(user)
+        # Gerar tokens e setar cookies
+        refresh_token = await issue_refresh_token(db, user.id)
+        tokens = generate_tokens_for_user(user, refresh_token=refresh_token)
         
         redirect = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
         redirect.set_cookie(
@@ -367,10 +453,30 @@ async def form_register(
             samesite="lax",
             max_age=tokens["expires_in"],
         )
+        _set_refresh_cookie(redirect, refresh_token)
         
         return redirect
         
-    except Exception as e:
+    except PasswordHasherBusyError:
+        # Tratado pelo handler global (503 + Retry-After)
+        raise
+    except IntegrityError:
+        # Cadastro concorrente com o mesmo email/username passou pela
+        # verificação acima: o flush falhou e a transação precisa ser
+        # desfeita antes do commit único do get_db
+        await db.rollback()
+        return templates.TemplateResponse(
+            "pages/cadastro.html",
+            {
+                "request": request,
+                "user": None,
+                "error": "Este email ou nome de usuário já está em uso",
+                "form_data": {"name": name, "username": username, "email": email},
+            },
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    except Exception:
+        await db.rollback()
         return templates.TemplateResponse(
             "pages/cadastro.html",
             {
@@ -383,7 +489,7 @@ async def form_register(
         )
 
 
-@router.post("/auth/login", response_class=HTMLResponse)
+@router.post("/auth/login", response_class=HTMLResponse, dependencies=[Depends(login_rate_limit)])
 async def form_login(
     request: Request,
     response: Response,
@@ -429,23 +535,11 @@ async def form_login(
             status_code=status.HTTP_403_FORBIDDEN,
         )
     
-    # Gerar token
-    if remember:
-        expires_delta = timedelta(days=30)
-        access_token = create_access_token(
-            data={
-                "sub": str(user.id),
-                "email": user.email,
-                "username": user.username,
-                "role": user.role.value,
-            },
-            expires_delta=expires_delta
-        )
-        expires_in = int(expires_delta.total_seconds())
-    else:
-        tokens = generate_tokens_for_user(user)
-        access_token = tokens["access_token"]
-        expires_in = tokens["expires_in"]
+    # Gerar tokens ("remember" só aumenta o tempo de expiração)
+    refresh_token = await issue_refresh_token(db, user.id)
+    tokens = generate_tokens_for_user(user, refresh_token=refresh_token, remember=remember)
+    access_token = tokens["access_token"]
+    expires_in = tokens["expires_in"]
     
     # Redirecionar
     redirect = RedirectResponse(url=next_url, status_code=status.HTTP_302_FOUND)
@@ -457,21 +551,24 @@ async def form_login(
         samesite="lax",
         max_age=expires_in,
     )
+    _set_refresh_cookie(redirect, refresh_token)
     
     return redirect
 
 
 @router.get("/logout", response_class=HTMLResponse)
-async def logout_page(response: Response):
+async def logout_page(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    refresh_cookie: Optional[str] = Cookie(default=None, alias=REFRESH_COOKIE),
+):
     """
     Logout via GET (para links de logout).
-    Remove cookie e redireciona para home.
+    Remove cookies, revoga o refresh token e redireciona para home.
     """
+    if refresh_cookie:
+        await revoke_token(db, refresh_cookie)
+    
     redirect = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
-    redirect.delete_cookie(
-        key="session_token",
-        httponly=True,
-        secure=settings.is_production,
-        samesite="lax",
-    )
+    _delete_auth_cookies(redirect)
     return redirect
@@ -9,23 +9,33 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.models import User, Rifa, UserRole, RifaStatus
 from app.dependencies import get_current_user, get_optional_user, OptionalUser
+from app.response_cache import cache_response
 from app.schemas.marketplace import (
     RifaResponse,
     RifaDetailResponse,
     RifaListResponse,
     RifaListItem,
+    SuggestionResponse,
     RifaCreate,
     RifaUpdate,
     RifaFilters,
     CategoryResponse,
     RifaStats,
+    RifaNumbersResponse,
+    NumberReserveRequest,
+    NumberReserveResponse,
     MarketplaceStats,
     MessageResponse,
 )
 from app.services import marketplace as marketplace_service
+from app.services import suggest as suggest_service
+from app.services import reservations as reservations_service
+from app.services.numbers import NumbersUnavailableError, NUMBER_RESERVED
+from app.services.counters import get_view_count
+from app.services.pagination import decode_cursor
 
 
 # ===========================================
@@ -40,10 +50,11 @@ router = APIRouter(prefix="/marketplace", tags=["marketplace"])
 # ===========================================
 
 @router.get("/api/rifas", response_model=RifaListResponse)
+@cache_response(tags=("rifas",))
 async def api_list_rifas(
     search: Optional[str] = Query(None),
     category_id: Optional[int] = Query(None),
-    status: Optional[RifaStatus] = Query(None),
+    rifa_status: Optional[RifaStatus] = Query(None, alias="status"),
     is_featured: Optional[bool] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
@@ -51,16 +62,22 @@ async def api_list_rifas(
     sort_order: str = Query("desc"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    count_mode: str = Query("exact"),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Lista rifas com filtros e paginação.
+
+    Para navegar sem custo crescente use `next_cursor`/`prev_cursor`
+    da resposta em `cursor`. `count_mode=approximate` reaproveita o total
+    em cache e `count_mode=none` não conta.
     """
     # Criar objeto de filtros
     filters = RifaFilters(
         search=search,
         category_id=category_id,
-        status=status,
+        status=rifa_status,
         is_featured=is_featured,
         min_price=min_price,
         max_price=max_price,
@@ -68,14 +85,22 @@ async def api_list_rifas(
         sort_order=sort_order,
         page=page,
         per_page=per_page,
+        cursor=cursor,
+        count_mode=count_mode,
     )
 
     # Buscar rifas
-    rifas, total = await marketplace_service.list_rifas(db, filters)
+    try:
+        result = await marketplace_service.paginate_rifas(db, filters)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
 
     # Converter para lista de items
     items = []
-    for rifa in rifas:
+    for rifa in result.items:
         item = RifaListItem(
             id=rifa.id,
             title=rifa.title,
@@ -95,25 +120,29 @@ async def api_list_rifas(
         items.append(item)
 
     # Calcular paginação
-    total_pages = (total + per_page - 1) // per_page
-    has_next = page < total_pages
-    has_prev = page > 1
+    total_pages = None
+    if result.total is not None:
+        total_pages = (result.total + per_page - 1) // per_page
 
     return RifaListResponse(
         items=items,
-        total=total,
+        total=result.total,
         page=page,
         per_page=per_page,
         total_pages=total_pages,
-        has_next=has_next,
-        has_prev=has_prev,
+        has_next=result.has_next,
+        has_prev=result.has_prev,
+        next_cursor=result.next_cursor,
+        prev_cursor=result.prev_cursor,
+        total_is_estimate=result.total_is_estimate,
     )
 
 
 @router.get("/api/rifas/featured", response_model=list[RifaListItem])
+@cache_response(tags=("rifas",))
 async def api_featured_rifas(
     limit: int = Query(6, ge=1, le=20),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Retorna rifas em destaque."""
     rifas = await marketplace_service.get_featured_rifas(db, limit)
@@ -142,10 +171,11 @@ async def api_featured_rifas(
 
 
 @router.get("/api/rifas/ending-soon", response_model=list[RifaListItem])
+@cache_response(tags=("rifas",))
 async def api_ending_soon_rifas(
     days: int = Query(3, ge=1, le=30),
     limit: int = Query(6, ge=1, le=20),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Retorna rifas terminando em breve."""
     rifas = await marketplace_service.get_ending_soon_rifas(db, days, limit)
@@ -177,25 +207,24 @@ async def api_ending_soon_rifas(
 # ROTAS DE API - DETALHES
 # ===========================================
 
-@router.get("/api/rifas/{rifa_id}", response_model=RifaDetailResponse)
-async def api_get_rifa(
-    rifa_id: int,
-    db: AsyncSession = Depends(get_db),
+@router.get("/api/rifas/suggest", response_model=list[SuggestionResponse])
+async def api_suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Retorna detalhes de uma rifa específica."""
-    rifa = await marketplace_service.get_rifa_by_id(db, rifa_id, increment_view=True)
+    """
+    Sugestões para a caixa de busca (rifas ativas, categorias e criadores).
 
-    if not rifa:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Rifa não encontrada"
-        )
+    Respondido a partir de um índice de prefixos em memória.
+    """
+    suggestions = await suggest_service.suggest(db, q, limit)
+    return [SuggestionResponse(**s._asdict()) for s in suggestions]
 
-    # Buscar números disponíveis
-    available_numbers = await marketplace_service.get_available_numbers(db, rifa.id)
 
-    # Buscar estatísticas
-    stats = await marketplace_service.get_rifa_stats(db, rifa.id)
+def _rifa_detail_response(detail: marketplace_service.RifaDetail) -> RifaDetailResponse:
+    """Monta a resposta de detalhe a partir do RifaDetail carregado"""
+    rifa = detail.rifa
 
     return RifaDetailResponse(
         id=rifa.id,
@@ -216,7 +245,7 @@ async def api_get_rifa(
         winner_id=rifa.winner_id,
         draw_proof=rifa.draw_proof,
         sold_count=rifa.sold_count,
-        view_count=rifa.view_count,
+        view_count=get_view_count(rifa),
         is_featured=rifa.is_featured,
         is_verified=rifa.is_verified,
         creator_id=rifa.creator_id,
@@ -227,65 +256,164 @@ async def api_get_rifa(
         created_at=rifa.created_at,
         updated_at=rifa.updated_at,
         progress_percent=rifa.progress_percent,
-        available_count=rifa.available_count,
-        available_numbers=available_numbers[:100],  # Limitar a 100
-        unique_buyers=stats.get("unique_buyers"),
-        last_purchase=stats.get("last_purchase"),
+        available_count=detail.available_count,
+        available_numbers=detail.bitmap.available_numbers(limit=100),
+        unique_buyers=detail.unique_buyers,
+        last_purchase=detail.last_purchase,
     )
 
 
+@router.get("/api/rifas/{rifa_id}", response_model=RifaDetailResponse)
+async def api_get_rifa(
+    rifa_id: int,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Retorna detalhes de uma rifa específica."""
+    detail = await marketplace_service.load_rifa_detail(
+        db, rifa_id=rifa_id, increment_view=True
+    )
+
+    if not detail:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rifa não encontrada"
+        )
+
+    return _rifa_detail_response(detail)
+
+
 @router.get("/api/rifas/slug/{slug}", response_model=RifaDetailResponse)
 async def api_get_rifa_by_slug(
     slug: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Retorna detalhes de uma rifa por slug."""
-    rifa = await marketplace_service.get_rifa_by_slug(db, slug, increment_view=True)
+    detail = await marketplace_service.load_rifa_detail(
+        db, slug=slug, increment_view=True
+    )
 
-    if not rifa:
+    if not detail:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rifa não encontrada"
         )
 
-    # Mesma lógica do endpoint anterior
-    available_numbers = await marketplace_service.get_available_numbers(db, rifa.id)
-    stats = await marketplace_service.get_rifa_stats(db, rifa.id)
+    return _rifa_detail_response(detail)
 
-    return RifaDetailResponse(
-        id=rifa.id,
-        title=rifa.title,
-        slug=rifa.slug,
-        description=rifa.description,
-        image_url=rifa.image_url,
-        images=rifa.images,
-        price=rifa.price,
-        total_numbers=rifa.total_numbers,
-        min_numbers=rifa.min_numbers,
-        max_numbers_per_user=rifa.max_numbers_per_user,
-        status=rifa.status,
-        start_date=rifa.start_date,
-        end_date=rifa.end_date,
-        draw_date=rifa.draw_date,
-        winner_number=rifa.winner_number,
-        winner_id=rifa.winner_id,
-        draw_proof=rifa.draw_proof,
-        sold_count=rifa.sold_count,
-        view_count=rifa.view_count,
-        is_featured=rifa.is_featured,
-        is_verified=rifa.is_verified,
-        creator_id=rifa.creator_id,
-        creator_name=rifa.creator.name if rifa.creator else None,
-        creator_username=rifa.creator.username if rifa.creator else None,
-        category_id=rifa.category_id,
-        category_name=rifa.category.name if rifa.category else None,
-        created_at=rifa.created_at,
-        updated_at=rifa.updated_at,
-        progress_percent=rifa.progress_percent,
-        available_count=rifa.available_count,
-        available_numbers=available_numbers[:100],
-        unique_buyers=stats.get("unique_buyers"),
-        last_purchase=stats.get("last_purchase"),
+
+@router.get("/api/rifas/{rifa_id}/numbers", response_model=RifaNumbersResponse)
+async def api_rifa_numbers(
+    rifa_id: int,
+    cursor: Optional[str] = Query(None),
+    start: Optional[int] = Query(None, ge=1),
+    limit: int = Query(1000, ge=1, le=10000),
+    encoding: str = Query("ranges", pattern="^(ranges|bitmap|list)$"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Retorna a disponibilidade dos números de uma rifa, uma janela por vez.
+
+    - ranges: faixas de números disponíveis ([[1, 40], [44, 100]])
+    - bitmap: bits da janela em base64 (1 = vendido)
+    - list: status de cada número (janela limitada a 1000)
+
+    Use `next_cursor` da resposta para buscar a próxima janela, ou
+    `start` para pular direto para um número (grade da página da rifa).
+    """
+    if start is None:
+        try:
+            position = decode_cursor(cursor) or {}
+            start = int(position.get("n", 1))
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+
+    if encoding == "list":
+        limit = min(limit, 1000)
+
+    numbers = await marketplace_service.get_rifa_numbers(
+        db, rifa_id, start=start, limit=limit, encoding=encoding
+    )
+
+    if numbers is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rifa não encontrada"
+        )
+
+    return RifaNumbersResponse(**numbers)
+
+
+# ===========================================
+# ROTAS DE API - RESERVA DE NÚMEROS
+# ===========================================
+
+@router.post("/api/rifas/{rifa_id}/reserve", response_model=NumberReserveResponse)
+async def api_reserve_numbers(
+    rifa_id: int,
+    reserve_data: NumberReserveRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Reserva números por alguns minutos enquanto o pagamento é feito.
+    A reserva é tudo ou nada: se algum número estiver indisponível, nenhum é reservado.
+    """
+    try:
+        numbers, reserved_until = await reservations_service.reserve_numbers(
+            db, rifa_id, current_user.id, reserve_data.numbers
+        )
+    except reservations_service.RifaClosedError as e:
+        if not e.found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Rifa não encontrada"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Esta rifa não está aceitando reservas"
+        )
+    except reservations_service.ReservationLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Limite de {e.limit} números por usuário nesta rifa"
+        )
+    except NumbersUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Números indisponíveis: {', '.join(map(str, e.numbers))}"
+        )
+
+    return NumberReserveResponse(
+        rifa_id=rifa_id,
+        reserved_until=reserved_until,
+        numbers=[
+            {
+                "number": n,
+                "status": NUMBER_RESERVED,
+                "user_id": current_user.id,
+                "reserved_until": reserved_until,
+            }
+            for n in numbers
+        ],
+    )
+
+
+@router.delete("/api/rifas/{rifa_id}/reserve", response_model=MessageResponse)
+async def api_release_numbers(
+    rifa_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Libera todas as reservas do usuário nesta rifa."""
+    released = await reservations_service.release_numbers(db, rifa_id, current_user.id)
+
+    return MessageResponse(
+        message="Reservas liberadas",
+        success=True,
+        data={"released": released},
     )
 
 
@@ -294,8 +422,9 @@ async def api_get_rifa_by_slug(
 # ===========================================
 
 @router.get("/api/categories", response_model=list[CategoryResponse])
+@cache_response(ttl=60, tags=("categories",))
 async def api_list_categories(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Lista todas as categorias ativas."""
     categories = await marketplace_service.list_categories(db, active_only=True)
@@ -322,28 +451,37 @@ async def api_list_categories(
 @router.get("/api/rifas/{rifa_id}/stats", response_model=RifaStats)
 async def api_rifa_stats(
     rifa_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Retorna estatísticas de uma rifa."""
-    rifa = await marketplace_service.get_rifa_by_id(db, rifa_id)
+    detail = await marketplace_service.load_rifa_detail(db, rifa_id=rifa_id)
 
-    if not rifa:
+    if not detail:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rifa não encontrada"
         )
 
-    stats = await marketplace_service.get_rifa_stats(db, rifa_id)
+    stats = await marketplace_service.get_rifa_stats(db, rifa_id, detail=detail)
 
     return RifaStats(**stats)
 
 
 @router.get("/api/stats", response_model=MarketplaceStats)
+@cache_response(ttl=60, tags=("stats",), bypass=("fresh",))
 async def api_marketplace_stats(
-    db: AsyncSession = Depends(get_db),
+    user: OptionalUser,
+    fresh: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Retorna estatísticas gerais do marketplace."""
-    stats = await marketplace_service.get_marketplace_stats(db)
+    """
+    Retorna estatísticas gerais do marketplace.
+
+    Servidas de um snapshot recalculado periodicamente (ver `stale_after`).
+    `fresh=1` recalcula na hora, apenas para administradores.
+    """
+    fresh = fresh and user is not None and user.role == UserRole.ADMIN
+    stats = await marketplace_service.get_marketplace_stats(db, fresh=fresh)
 
     return MarketplaceStats(**stats)
 
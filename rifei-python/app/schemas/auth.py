@@ -123,6 +123,12 @@ class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
     expires_in: int  # segundos
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    """Schema para renovar o access token (alternativa ao cookie)"""
+    refresh_token: Optional[str] = None
 
 
 class TokenData(BaseModel):
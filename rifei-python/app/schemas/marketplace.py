@@ -91,7 +91,7 @@ class RifaResponse(BaseModel):
 
     # Imagens
     image_url: Optional[str] = None
-    images: Optional[dict] = None
+    images: Optional[List[str]] = None
 
     # Configuração
     price: Decimal
@@ -189,13 +189,19 @@ class RifaFilters(BaseModel):
     max_price: Optional[Decimal] = Field(None, ge=0)
 
     # Ordenação
-    sort_by: str = Field(default="created_at", pattern="^(created_at|end_date|price|sold_count|view_count)$")
+    sort_by: str = Field(default="created_at", pattern="^(created_at|end_date|price|sold_count|view_count|relevance)$")
     sort_order: str = Field(default="desc", pattern="^(asc|desc)$")
 
     # Paginação
     page: int = Field(default=1, ge=1)
     per_page: int = Field(default=20, ge=1, le=100)
 
+    # Paginação por cursor (opaco, vindo de next_cursor/prev_cursor)
+    cursor: Optional[str] = None
+
+    # Total: exact (COUNT a cada página), approximate (COUNT em cache) ou none
+    count_mode: str = Field(default="exact", pattern="^(exact|approximate|none)$")
+
     @field_validator('max_price')
     @classmethod
     def validate_price_range(cls, v, info):
@@ -206,16 +212,29 @@ class RifaFilters(BaseModel):
         return v
 
 
+class SuggestionResponse(BaseModel):
+    """Schema de resposta para sugestões do autocomplete"""
+    type: str  # rifa, categoria, criador
+    label: str
+    value: str
+    url: Optional[str] = None
+
+
 class RifaListResponse(BaseModel):
     """Schema de resposta para listagem paginada"""
     items: List[RifaListItem]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
     has_next: bool
     has_prev: bool
 
+    # Paginação por cursor
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total_is_estimate: bool = False
+
 
 # ===========================================
 # NÚMEROS DA RIFA
@@ -242,13 +261,36 @@ class NumberStatusResponse(BaseModel):
     reserved_until: Optional[datetime] = None
 
 
+class NumberReserveResponse(BaseModel):
+    """Schema de resposta para reserva de números"""
+    rifa_id: int
+    reserved_until: datetime
+    numbers: List[NumberStatusResponse]
+
+
 class RifaNumbersResponse(BaseModel):
-    """Schema de resposta para números de uma rifa"""
+    """
+    Schema de resposta para números de uma rifa (uma janela por página)
+
+    Conforme `encoding`, apenas um destes campos vem preenchido:
+    - ranges: faixas de números disponíveis, ex: [[1, 40], [44, 100]]
+    - bitmap: bits da janela em base64 (bit 0 = número `start`, 1 = vendido)
+    - numbers: status de cada número da janela
+    """
     rifa_id: int
     total_numbers: int
     available_count: int
     sold_count: int
-    numbers: List[NumberStatusResponse]
+
+    # Janela retornada
+    encoding: str = "list"
+    start: int = 1
+    end: int = 0
+    next_cursor: Optional[str] = None
+
+    ranges: Optional[List[List[int]]] = None
+    bitmap: Optional[str] = None
+    numbers: List[NumberStatusResponse] = []
 
 
 # ===========================================
@@ -285,6 +327,10 @@ class MarketplaceStats(BaseModel):
     total_revenue: Decimal
     popular_categories: List[dict]
 
+    # Snapshot: quando foi calculado e a partir de quando é considerado velho
+    generated_at: Optional[datetime] = None
+    stale_after: Optional[datetime] = None
+
 
 # ===========================================
 # MENSAGENS
@@ -4,6 +4,8 @@ Services do Rifei
 from app.services.auth import (
     hash_password,
     verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     decode_token,
@@ -21,6 +23,8 @@ from app.services.auth import (
 __all__ = [
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "verify_password_async",
     "create_access_token",
     "create_refresh_token",
     "decode_token",
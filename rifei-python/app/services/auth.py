@@ -3,33 +3,59 @@ Service de Autenticação - Rifei
 Funções para hash de senha, JWT e verificação de usuários
 """
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional, Union
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.models import User
 from app.schemas.auth import UserCreate, TokenData
+from app.services.availability import track_user
+from app.services.passwords import password_hasher
 
 
 # ===========================================
 # CONFIGURAÇÃO DE HASH DE SENHA
 # ===========================================
 
-# Contexto para hashing de senha usando bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib e jose são importados no primeiro uso, fora do cold start
+@lru_cache
+def _crypt_context():
+    """Contexto para hashing de senha usando bcrypt"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
     """Gera hash bcrypt da senha"""
-    return pwd_context.hash(password)
+    return _crypt_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha plain corresponde ao hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _crypt_context().verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password no pool de hashing, sem bloquear o event loop
+
+    Raises:
+        PasswordHasherBusyError: Se a fila do pool estiver cheia
+    """
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password no pool de hashing, sem bloquear o event loop
+
+    Raises:
+        PasswordHasherBusyError: Se a fila do pool estiver cheia
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
 
 
 # ===========================================
@@ -65,6 +91,8 @@ def create_access_token(
         "type": "access"
     })
     
+    from jose import jwt
+
     encoded_jwt = jwt.encode(
         to_encode, 
         settings.jwt_secret_key, 
@@ -103,6 +131,8 @@ def create_refresh_token(
         "type": "refresh"
     })
     
+    from jose import jwt
+
     encoded_jwt = jwt.encode(
         to_encode,
         settings.jwt_secret_key,
@@ -122,6 +152,8 @@ def decode_token(token: str) -> Optional[TokenData]:
     Returns:
         TokenData com os dados do token ou None se inválido
     """
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token,
@@ -155,6 +187,8 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     Returns:
         Payload do token ou None se inválido
     """
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(
             token,
@@ -220,7 +254,7 @@ async def authenticate_user(
     if not user:
         return None
         
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
         
     return user
@@ -237,8 +271,8 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
     Returns:
         Objeto User criado
     """
-    # Hash da senha
-    password_hash = hash_password(user_data.password)
+    # Hash da senha (no pool, fora do event loop)
+    password_hash = await hash_password_async(user_data.password)
     
     # Criar objeto User
     user = User(
@@ -248,10 +282,12 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         password_hash=password_hash,
     )
     
-    # Salvar no banco
+    # Salvar no banco (flush com RETURNING; o commit é o da requisição)
     db.add(user)
-    await db.commit()
-    await db.refresh(user)
+    await db.flush()
+    
+    # Filtros da validação de cadastro (services.availability)
+    track_user(user)
     
     return user
 
@@ -277,29 +313,45 @@ def get_token_expiry_seconds() -> int:
     return settings.jwt_access_token_expire_minutes * 60
 
 
-def generate_tokens_for_user(user: User) -> dict:
+def generate_tokens_for_user(
+    user: User,
+    refresh_token: Optional[str] = None,
+    remember: bool = False,
+) -> dict:
     """
     Gera access token e refresh token para um usuário
     
     Args:
         user: Objeto User
+        refresh_token: Refresh token já registrado (services.refresh_tokens);
+            sem ele é gerado um token avulso, que /api/auth/refresh recusa
+        remember: "Lembrar-me": access token válido por
+            settings.jwt_remember_expire_days (mesmas claims)
         
     Returns:
         Dicionário com access_token, refresh_token e expires_in
     """
+    # Dados de exibição vão no token para que páginas públicas montem o
+    # usuário sem consultar o banco (ver services.principals)
     token_data = {
         "sub": str(user.id),
         "email": user.email,
         "username": user.username,
+        "name": user.name,
         "role": user.role.value if hasattr(user.role, 'value') else user.role,
+        "level": user.level,
+        "xp": user.xp,
+        "ver": user.token_version or 0,
     }
 
-    access_token = create_access_token(token_data)
-    refresh_token = create_refresh_token({"sub": str(user.id)})
+    expires_delta = timedelta(days=settings.jwt_remember_expire_days) if remember else None
+    access_token = create_access_token(token_data, expires_delta)
+    if refresh_token is None:
+        refresh_token = create_refresh_token({"sub": str(user.id)})
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
         "token_type": "bearer",
-        "expires_in": get_token_expiry_seconds()
+        "expires_in": int(expires_delta.total_seconds()) if remember else get_token_expiry_seconds()
     }
@@ -0,0 +1,180 @@
+"""
+Service de Disponibilidade - Rifei
+Filtros de Bloom de emails e usernames cadastrados para a validação em tempo real do cadastro
+"""
+import hashlib
+import math
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import User
+
+
+# ===========================================
+# FILTRO DE BLOOM
+# ===========================================
+
+class BloomFilter:
+    """
+    Conjunto probabilístico: "não contém" é definitivo, "contém" pode
+    ser falso positivo (com probabilidade ~error_rate até capacity itens).
+
+    Posições por hashing duplo sobre um único blake2b de 128 bits.
+    100.000 itens a 1% ocupam ~117 KB.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        bits = self._bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class UserFilters:
+    """
+    Filtros de emails e usernames (minúsculos) já cadastrados.
+
+    Montados na inicialização e atualizados por create_user; usuários
+    criados em outros workers entram na próxima sincronização
+    incremental (id > último id visto), feita no máximo a cada
+    settings.user_filter_sync_seconds. Remoções não são refletidas,
+    o que só gera falsos positivos (que caem no banco).
+    """
+
+    def __init__(self):
+        self.emails: Optional[BloomFilter] = None
+        self.usernames: Optional[BloomFilter] = None
+        self.last_id = 0
+        self.synced_at = 0.0
+
+    @property
+    def built(self) -> bool:
+        return self.emails is not None
+
+    def rebuild(self, rows: Iterable, expected: int) -> None:
+        """Recria os filtros a partir de linhas (id, email, username)"""
+        capacity = max(settings.user_filter_capacity, expected * 2)
+        self.emails = BloomFilter(capacity, settings.user_filter_error_rate)
+        self.usernames = BloomFilter(capacity, settings.user_filter_error_rate)
+        self.last_id = 0
+        self.add_rows(rows)
+        self.synced_at = time.monotonic()
+
+    def add_rows(self, rows: Iterable) -> None:
+        for user_id, email, username in rows:
+            self.add(email, username)
+            self.last_id = max(self.last_id, user_id)
+
+    def add(self, email: str, username: str) -> None:
+        if self.built:
+            self.emails.add(email.lower())
+            self.usernames.add(username.lower())
+
+    @property
+    def saturated(self) -> bool:
+        """Passou da capacidade (taxa de falsos positivos subindo)"""
+        return self.built and self.emails.count > self.emails.capacity
+
+    def clear(self) -> None:
+        self.emails = None
+        self.usernames = None
+        self.last_id = 0
+        self.synced_at = 0.0
+
+
+user_filters = UserFilters()
+
+
+# ===========================================
+# API DO SERVICE
+# ===========================================
+
+async def warm_up(db: AsyncSession) -> None:
+    """Carrega todos os emails e usernames nos filtros (startup)"""
+    result = await db.execute(select(User.id, User.email, User.username))
+    rows = result.all()
+    user_filters.rebuild(rows, len(rows))
+
+
+async def _sync(db: AsyncSession) -> None:
+    """Monta os filtros se preciso, ou acrescenta usuários criados desde o último id"""
+    if not user_filters.built or user_filters.saturated:
+        await warm_up(db)
+        return
+
+    if time.monotonic() - user_filters.synced_at < settings.user_filter_sync_seconds:
+        return
+
+    result = await db.execute(
+        select(User.id, User.email, User.username)
+        .where(User.id > user_filters.last_id)
+        .order_by(User.id)
+    )
+    user_filters.add_rows(result.all())
+    user_filters.synced_at = time.monotonic()
+
+
+def track_user(user: User) -> None:
+    """
+    Registra um usuário recém-criado nos filtros
+
+    last_id não avança aqui: usuários com id menor criados em outros
+    workers ainda precisam entrar na sincronização.
+    """
+    user_filters.add(user.email, user.username)
+
+
+async def email_taken(db: AsyncSession, email: str) -> bool:
+    """
+    Verifica se o email já está cadastrado
+
+    Emails fora do filtro retornam sem consultar o banco; só prováveis
+    cadastrados (ou falsos positivos) fazem o SELECT.
+    """
+    email = email.lower()
+    await _sync(db)
+    if email not in user_filters.emails:
+        return False
+
+    result = await db.execute(select(User.id).where(User.email == email))
+    return result.first() is not None
+
+
+async def username_taken(db: AsyncSession, username: str) -> bool:
+    """Verifica se o username já está em uso (mesma lógica de email_taken)"""
+    username = username.lower()
+    await _sync(db)
+    if username not in user_filters.usernames:
+        return False
+
+    result = await db.execute(select(User.id).where(User.username == username))
+    return result.first() is not None
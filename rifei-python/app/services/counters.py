@@ -0,0 +1,300 @@
+"""
+Service de Contadores - Rifei
+Contadores de view_count (HINCRBY no Redis quando configurado, memória do
+processo caso contrário) descarregados em lote e reconciliação de sold_count
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional
+
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_redis, mark_redis_down
+from app.config import settings
+from app.models.models import Rifa, Ticket
+
+logger = logging.getLogger(__name__)
+
+
+# ===========================================
+# CONTADOR EM MEMÓRIA
+# ===========================================
+
+class ShardedCounter:
+    """
+    Contador por chave dividido em shards, cada um com seu lock.
+
+    Incrementos só tocam um shard (sem disputa global); drain() troca
+    cada shard por um dicionário vazio e devolve os deltas acumulados.
+    """
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Dict[Hashable, int]] = [defaultdict(int) for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        # Instante (monotonic) do primeiro incremento ainda não descarregado
+        self._oldest: Optional[float] = None
+
+    def __len__(self) -> int:
+        """Quantidade de chaves com delta pendente"""
+        return sum(len(shard) for shard in self._shards)
+
+    def _index(self, key: Hashable) -> int:
+        return hash(key) % len(self._shards)
+
+    def increment(self, key: Hashable, amount: int = 1) -> None:
+        index = self._index(key)
+        with self._locks[index]:
+            self._shards[index][key] += amount
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def age(self) -> float:
+        """Segundos desde o primeiro incremento pendente (0 se vazio)"""
+        oldest = self._oldest
+        return 0.0 if oldest is None else time.monotonic() - oldest
+
+    def pending(self, key: Hashable) -> int:
+        """Delta ainda não descarregado para a chave"""
+        index = self._index(key)
+        with self._locks[index]:
+            return self._shards[index].get(key, 0)
+
+    def drain(self) -> Dict[Hashable, int]:
+        """Retira e retorna todos os deltas pendentes"""
+        drained: Dict[Hashable, int] = {}
+        self._oldest = None
+        for index, lock in enumerate(self._locks):
+            with lock:
+                shard, self._shards[index] = self._shards[index], defaultdict(int)
+            drained.update(shard)
+        return drained
+
+    def restore(self, deltas: Dict[Hashable, int]) -> None:
+        """Devolve deltas que não puderam ser gravados"""
+        for key, amount in deltas.items():
+            self.increment(key, amount)
+
+    def clear(self) -> None:
+        self.drain()
+
+
+# Visualizações de rifas ainda não gravadas no banco
+view_counter = ShardedCounter()
+
+# Hash no Redis com as visualizações pendentes (rifa_id -> delta),
+# compartilhado entre workers e instâncias serverless
+VIEW_COUNTS_KEY = "rifei:view_counts"
+
+_flushing = False
+
+
+async def record_view(rifa_id: int) -> None:
+    """
+    Registra uma visualização sem tocar no banco
+
+    Com Redis o delta vai para um hash (HINCRBY) e sobrevive ao fim do
+    processo. Sem Redis fica em memória; com settings.fast_start a
+    própria requisição descarrega o buffer quando ele passa do limite
+    de idade ou de tamanho (uma função serverless congelada ou
+    reciclada nunca chega a rodar o worker nem o shutdown).
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            await client.hincrby(VIEW_COUNTS_KEY, str(rifa_id), 1)
+            return
+        except Exception as e:
+            mark_redis_down(e)
+
+    view_counter.increment(rifa_id)
+    if settings.fast_start and _flush_due():
+        await flush_buffered_views()
+
+
+def get_view_count(rifa: Rifa) -> int:
+    """
+    view_count persistido + visualizações pendentes na memória do processo
+
+    As pendentes no Redis só aparecem depois da próxima descarga.
+    """
+    return (rifa.view_count or 0) + view_counter.pending(rifa.id)
+
+
+def _flush_due() -> bool:
+    return (
+        len(view_counter) >= settings.view_count_flush_max_pending
+        or view_counter.age() >= settings.view_count_flush_max_age_seconds
+    )
+
+
+# ===========================================
+# DESCARGA E RECONCILIAÇÃO
+# ===========================================
+
+async def _drain_redis() -> Dict[int, int]:
+    """Retira o hash de pendentes do Redis (HGETALL + DEL na mesma transação)"""
+    client = get_redis()
+    if client is None:
+        return {}
+    try:
+        pipe = client.pipeline()
+        pipe.hgetall(VIEW_COUNTS_KEY)
+        pipe.delete(VIEW_COUNTS_KEY)
+        pending, _ = await pipe.execute()
+    except Exception as e:
+        mark_redis_down(e)
+        return {}
+    return {int(rifa_id): int(delta) for rifa_id, delta in pending.items()}
+
+
+async def _restore_redis(deltas: Dict[int, int]) -> None:
+    """Devolve deltas ao hash do Redis (ou à memória se o Redis falhar)"""
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            for rifa_id, delta in deltas.items():
+                pipe.hincrby(VIEW_COUNTS_KEY, str(rifa_id), delta)
+            await pipe.execute()
+            return
+        except Exception as e:
+            mark_redis_down(e)
+    view_counter.restore(deltas)
+
+
+async def flush_view_counts(db: AsyncSession) -> int:
+    """
+    Grava as visualizações pendentes com UPDATE ... SET view_count = view_count + :n
+
+    Junta os deltas da memória do processo e do Redis em um único
+    executemany por descarga; em caso de erro os deltas voltam para a
+    origem.
+
+    Returns:
+        Quantidade de rifas atualizadas
+    """
+    local_deltas = view_counter.drain()
+    redis_deltas = await _drain_redis()
+
+    deltas: Dict[Hashable, int] = defaultdict(int, local_deltas)
+    for rifa_id, delta in redis_deltas.items():
+        deltas[rifa_id] += delta
+    if not deltas:
+        return 0
+
+    rifas = Rifa.__table__
+    stmt = (
+        update(rifas)
+        .where(rifas.c.id == bindparam("rifa_id"))
+        .values(view_count=rifas.c.view_count + bindparam("delta"))
+    )
+
+    try:
+        await db.execute(
+            stmt,
+            [{"rifa_id": rifa_id, "delta": delta} for rifa_id, delta in deltas.items()],
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        view_counter.restore(local_deltas)
+        if redis_deltas:
+            await _restore_redis(redis_deltas)
+        raise
+
+    return len(deltas)
+
+
+async def flush_buffered_views() -> int:
+    """
+    Descarrega as visualizações pendentes em uma sessão própria no primário
+
+    Chamada pela requisição (settings.fast_start) quando o buffer passa
+    do limite; a leitura que registrou a visualização pode estar numa
+    réplica. Uma descarga por vez no processo; falhas só são logadas
+    (os deltas voltam para o buffer).
+
+    Returns:
+        Quantidade de rifas atualizadas
+    """
+    global _flushing
+    from app.database import async_session
+
+    if _flushing:
+        return 0
+    _flushing = True
+    try:
+        async with async_session() as db:
+            return await flush_view_counts(db)
+    except Exception:
+        logger.exception("Falha ao descarregar visualizações")
+        return 0
+    finally:
+        _flushing = False
+
+
+async def reconcile_sold_counts(
+    db: AsyncSession,
+    rifa_ids: Optional[List[int]] = None
+) -> int:
+    """
+    Recalcula sold_count a partir da tabela de tickets
+
+    Só reescreve rifas cujo contador divergiu.
+
+    Returns:
+        Quantidade de rifas corrigidas
+    """
+    actual = (
+        select(func.count())
+        .select_from(Ticket)
+        .where(Ticket.rifa_id == Rifa.id)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        update(Rifa)
+        .where(func.coalesce(Rifa.sold_count, -1) != actual)
+        .values(sold_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    if rifa_ids:
+        stmt = stmt.where(Rifa.id.in_(rifa_ids))
+
+    result = await db.execute(stmt)
+    await db.commit()
+
+    return result.rowcount
+
+
+async def run_counters_worker(
+    flush_interval: Optional[int] = None,
+    reconcile_interval: Optional[int] = None
+) -> None:
+    """Loop de descarga de view_count e reconciliação de sold_count (lifespan)"""
+    from app.database import async_session
+
+    flush_interval = flush_interval or settings.view_count_flush_seconds
+    reconcile_interval = reconcile_interval or settings.sold_count_reconcile_seconds
+    loop = asyncio.get_running_loop()
+    next_reconcile = loop.time() + reconcile_interval
+
+    while True:
+        await asyncio.sleep(flush_interval)
+        try:
+            async with async_session() as db:
+                await flush_view_counts(db)
+
+                if loop.time() >= next_reconcile:
+                    next_reconcile = loop.time() + reconcile_interval
+                    fixed = await reconcile_sold_counts(db)
+                    if fixed:
+                        logger.warning("sold_count corrigido em %s rifa(s)", fixed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao descarregar contadores")
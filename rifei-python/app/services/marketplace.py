@@ -2,18 +2,24 @@
 Service de Marketplace - Rifei
 Funções para gestão de rifas, categorias e marketplace
 """
+import asyncio
+import base64
+import time
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Optional, List, Tuple
-from sqlalchemy import select, func, and_, or_, desc, asc
+from typing import Optional, List, Tuple, Dict, NamedTuple
+from sqlalchemy import select, func, and_, or_, desc, asc, event
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import Session, contains_eager, object_session, selectinload, undefer
 
+from app.cache import Cache
+from app.config import settings
+from app.database import after_commit
 from app.models.models import (
     Rifa,
     Category,
-    User,
     Ticket,
+    NumberReservation,
     RifaStatus,
 )
 from app.schemas.marketplace import (
@@ -22,6 +28,21 @@ from app.schemas.marketplace import (
     RifaFilters,
     RifaListItem,
 )
+from app.services.numbers import (
+    NumberBitmap,
+    load_bitmap,
+    rebuild_bitmap,
+    NUMBER_AVAILABLE,
+    NUMBER_RESERVED,
+    NUMBER_SOLD,
+)
+from app.services.pagination import encode_cursor, decode_cursor
+from app.services.counters import record_view
+from app.services import search as search_service
+from app.services import suggest as suggest_service
+from app.services import stats as stats_service
+from app.services.search import SearchMatch
+from app.response_cache import invalidate_tags
 
 
 # ===========================================
@@ -36,6 +57,9 @@ async def create_rifa(
     """
     Cria uma nova rifa
 
+    Só faz flush (id e timestamps vêm no RETURNING): o commit é o da
+    requisição, e os índices/cache são atualizados depois dele.
+
     Args:
         db: Sessão do banco de dados
         rifa_data: Dados da rifa
@@ -49,11 +73,13 @@ async def create_rifa(
         creator_id=creator_id,
         images=rifa_data.images or [],
         status=RifaStatus.DRAFT,
+        numbers_bitmap=NumberBitmap(rifa_data.total_numbers).to_bytes(),
     )
 
     db.add(rifa)
-    await db.commit()
-    await db.refresh(rifa)
+    await db.flush()
+
+    after_commit(db, lambda: _reindex_rifa(db, rifa))
 
     return rifa
 
@@ -69,7 +95,7 @@ async def get_rifa_by_id(
     Args:
         db: Sessão do banco de dados
         rifa_id: ID da rifa
-        increment_view: Se True, incrementa contador de visualizações
+        increment_view: Se True, registra uma visualização (gravada em lote)
 
     Returns:
         Rifa encontrada ou None
@@ -85,9 +111,8 @@ async def get_rifa_by_id(
     rifa = result.scalar_one_or_none()
 
     if rifa and increment_view:
-        rifa.view_count += 1
-        await db.commit()
-        await db.refresh(rifa)
+        # Acumulado (Redis ou memória) e gravado em lote (services.counters)
+        await record_view(rifa.id)
 
     return rifa
 
@@ -109,20 +134,108 @@ async def get_rifa_by_slug(
     rifa = result.scalar_one_or_none()
 
     if rifa and increment_view:
-        rifa.view_count += 1
-        await db.commit()
-        await db.refresh(rifa)
+        # Acumulado (Redis ou memória) e gravado em lote (services.counters)
+        await record_view(rifa.id)
 
     return rifa
 
 
+class RifaDetail(NamedTuple):
+    """Rifa com criador, categoria, compradores e disponibilidade"""
+    rifa: Rifa
+    bitmap: NumberBitmap
+    unique_buyers: int
+    last_purchase: Optional[datetime]
+
+    @property
+    def available_count(self) -> int:
+        return self.bitmap.available_count
+
+
+async def load_rifa_detail(
+    db: AsyncSession,
+    rifa_id: Optional[int] = None,
+    slug: Optional[str] = None,
+    increment_view: bool = False
+) -> Optional[RifaDetail]:
+    """
+    Carrega tudo o que as telas de detalhe precisam em uma única query
+
+    Rifa, criador e categoria vêm por JOIN; compradores únicos e última
+    compra por subqueries correlacionadas; o bitmap de vendidos (deferred
+    na listagem) vem junto. Compartilhado por api_get_rifa,
+    api_get_rifa_by_slug, api_rifa_stats e a página /rifa/{slug}.
+
+    Args:
+        db: Sessão do banco de dados
+        rifa_id: ID da rifa (ou slug)
+        slug: Slug da rifa
+        increment_view: Se True, registra uma visualização (gravada em lote)
+
+    Returns:
+        RifaDetail ou None se a rifa não existir
+    """
+    unique_buyers = (
+        select(func.count(func.distinct(Ticket.user_id)))
+        .where(Ticket.rifa_id == Rifa.id)
+        .scalar_subquery()
+    )
+    last_purchase = (
+        select(func.max(Ticket.created_at))
+        .where(Ticket.rifa_id == Rifa.id)
+        .scalar_subquery()
+    )
+
+    query = (
+        select(
+            Rifa,
+            unique_buyers.label("unique_buyers"),
+            last_purchase.label("last_purchase"),
+        )
+        .outerjoin(Rifa.creator)
+        .outerjoin(Rifa.category)
+        .options(
+            contains_eager(Rifa.creator),
+            contains_eager(Rifa.category),
+            undefer(Rifa.numbers_bitmap),
+        )
+    )
+    if rifa_id is not None:
+        query = query.where(Rifa.id == rifa_id)
+    else:
+        query = query.where(Rifa.slug == slug)
+
+    result = await db.execute(query)
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    rifa = row.Rifa
+    if rifa.numbers_bitmap is None:
+        # Rifas anteriores ao bitmap: reconstrói uma única vez
+        bitmap = await rebuild_bitmap(db, rifa.id, rifa.total_numbers)
+    else:
+        bitmap = NumberBitmap(rifa.total_numbers, rifa.numbers_bitmap)
+
+    if increment_view:
+        # Acumulado (Redis ou memória) e gravado em lote (services.counters)
+        await record_view(rifa.id)
+
+    return RifaDetail(
+        rifa=rifa,
+        bitmap=bitmap,
+        unique_buyers=row.unique_buyers or 0,
+        last_purchase=row.last_purchase,
+    )
+
+
 async def update_rifa(
     db: AsyncSession,
     rifa: Rifa,
     rifa_data: RifaUpdate
 ) -> Rifa:
     """
-    Atualiza dados de uma rifa
+    Atualiza dados de uma rifa (flush; índices e cache após o commit)
 
     Args:
         db: Sessão do banco de dados
@@ -133,26 +246,47 @@ async def update_rifa(
         Rifa atualizada
     """
     update_data = rifa_data.model_dump(exclude_unset=True)
+    status_changed = "status" in update_data and update_data["status"] != rifa.status
 
     for field, value in update_data.items():
         setattr(rifa, field, value)
 
-    await db.commit()
-    await db.refresh(rifa)
+    await db.flush()
+
+    after_commit(db, lambda: _reindex_rifa(db, rifa))
+    # Contagens por status mudaram: atualiza o snapshot de estatísticas
+    if status_changed:
+        after_commit(db, lambda: stats_service.refresh_marketplace_stats(db))
 
     return rifa
 
 
 async def delete_rifa(db: AsyncSession, rifa: Rifa) -> None:
     """
-    Deleta uma rifa (apenas se não tiver vendas)
+    Deleta uma rifa (apenas se não tiver vendas; flush, índices após o commit)
 
     Args:
         db: Sessão do banco de dados
         rifa: Rifa a ser deletada
     """
+    rifa_id = rifa.id
     await db.delete(rifa)
-    await db.commit()
+    await db.flush()
+
+    async def unindex() -> None:
+        search_service.unindex_rifa(rifa_id)
+        await suggest_service.unindex_rifa(rifa_id)
+        await invalidate_tags("rifas")
+        await stats_service.refresh_marketplace_stats(db)
+
+    after_commit(db, unindex)
+
+
+async def _reindex_rifa(db: AsyncSession, rifa: Rifa) -> None:
+    """Índices de busca/autocomplete e cache das listagens (após o commit)"""
+    search_service.index_rifa(rifa)
+    await suggest_service.index_rifa(db, rifa)
+    await invalidate_tags("rifas")
 
 
 async def check_slug_exists(db: AsyncSession, slug: str, exclude_id: Optional[int] = None) -> bool:
@@ -170,38 +304,32 @@ async def check_slug_exists(db: AsyncSession, slug: str, exclude_id: Optional[in
 # LISTAGEM E BUSCA
 # ===========================================
 
-async def list_rifas(
-    db: AsyncSession,
-    filters: RifaFilters
-) -> Tuple[List[Rifa], int]:
-    """
-    Lista rifas com filtros e paginação
+class RifaPage(NamedTuple):
+    """Página de rifas com cursores para navegação"""
+    items: List[Rifa]
+    total: Optional[int]
+    has_next: bool
+    has_prev: bool
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
-    Args:
-        db: Sessão do banco de dados
-        filters: Filtros de busca
 
-    Returns:
-        Tupla (rifas, total)
-    """
-    # Query base
-    query = select(Rifa).options(
-        selectinload(Rifa.creator),
-        selectinload(Rifa.category)
-    )
+# Cache de contagens para count_mode="approximate": chave -> (expira_em, total)
+_count_cache: Dict[tuple, Tuple[float, int]] = {}
+_COUNT_CACHE_MAX_KEYS = 1024
+
 
-    # Aplicar filtros
+def _rifa_conditions(
+    filters: RifaFilters,
+    search: Optional[SearchMatch] = None
+) -> list:
+    """Monta as condições WHERE a partir dos filtros"""
     conditions = []
 
-    # Busca textual
-    if filters.search:
-        search_term = f"%{filters.search}%"
-        conditions.append(
-            or_(
-                Rifa.title.ilike(search_term),
-                Rifa.description.ilike(search_term)
-            )
-        )
+    # Busca textual (ver services.search)
+    if search is not None:
+        conditions.append(search.condition)
 
     # Categoria
     if filters.category_id:
@@ -232,11 +360,83 @@ async def list_rifas(
     if filters.max_price is not None:
         conditions.append(Rifa.price <= filters.max_price)
 
-    # Aplicar condições
-    if conditions:
-        query = query.where(and_(*conditions))
+    return conditions
+
+
+def _sort_key(filters: RifaFilters) -> str:
+    """Coluna de ordenação efetiva (relevance só faz sentido com busca)"""
+    if filters.sort_by == "relevance" and not filters.search:
+        return "created_at"
+    return filters.sort_by
+
+
+def _sort_expression(sort_by: str, search: Optional[SearchMatch] = None):
+    """Expressão de ordenação (contadores podem ser NULL em linhas antigas)"""
+    if sort_by == "relevance":
+        return search.rank
+    column = getattr(Rifa, sort_by, Rifa.created_at)
+    if sort_by in ("sold_count", "view_count"):
+        return func.coalesce(column, 0)
+    return column
+
+
+def _sort_value(value):
+    """Valor da coluna de ordenação serializável no cursor"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _parse_sort_value(value, sort_by: str):
+    """Converte o valor do cursor de volta para o tipo da coluna"""
+    if sort_by in ("created_at", "end_date"):
+        return datetime.fromisoformat(value)
+    if sort_by == "price":
+        return Decimal(value)
+    if sort_by == "relevance":
+        return float(value)
+    return int(value)
+
+
+def _make_cursor(row, filters: RifaFilters, direction: str) -> str:
+    return encode_cursor({
+        "s": filters.sort_by,
+        "o": filters.sort_order,
+        "v": _sort_value(row.sort_value),
+        "id": row.Rifa.id,
+        "d": direction,
+    })
+
+
+async def _count_rifas(
+    db: AsyncSession,
+    filters: RifaFilters,
+    conditions: list
+) -> Tuple[Optional[int], bool]:
+    """
+    Conta rifas conforme filters.count_mode
+
+    Returns:
+        Tupla (total, é_estimativa)
+    """
+    if filters.count_mode == "none":
+        return None, False
+
+    key = None
+    if filters.count_mode == "approximate":
+        # Só os filtros que mudam o total (não ordenação nem página)
+        key = tuple(
+            (name, str(value))
+            for name, value in sorted(filters.model_dump(
+                exclude={"page", "per_page", "cursor", "count_mode", "sort_by", "sort_order"}
+            ).items())
+        )
+        cached = _count_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], True
 
-    # Total de resultados (antes da paginação)
     count_query = select(func.count()).select_from(Rifa)
     if conditions:
         count_query = count_query.where(and_(*conditions))
@@ -244,22 +444,142 @@ async def list_rifas(
     total_result = await db.execute(count_query)
     total = total_result.scalar()
 
-    # Ordenação
-    sort_column = getattr(Rifa, filters.sort_by, Rifa.created_at)
-    if filters.sort_order == "desc":
-        query = query.order_by(desc(sort_column))
+    if key is not None:
+        if len(_count_cache) >= _COUNT_CACHE_MAX_KEYS:
+            _count_cache.clear()
+        _count_cache[key] = (time.monotonic() + settings.list_count_cache_seconds, total)
+
+    return total, key is not None
+
+
+async def paginate_rifas(
+    db: AsyncSession,
+    filters: RifaFilters
+) -> RifaPage:
+    """
+    Lista rifas com filtros, por página (OFFSET) ou por cursor (keyset)
+
+    Com filters.cursor a página é buscada por (coluna_de_ordenação, id),
+    sem OFFSET: o custo não cresce com a profundidade. Sem cursor, page > 1
+    continua usando OFFSET para a paginação numerada das páginas HTML.
+    filters.search usa a busca textual de services.search; sort_by="relevance"
+    ordena pela pontuação da busca.
+
+    Args:
+        db: Sessão do banco de dados
+        filters: Filtros de busca
+
+    Returns:
+        RifaPage com itens, total e cursores
+
+    Raises:
+        ValueError: Se o cursor for inválido ou de outra ordenação
+    """
+    # Busca textual
+    search = None
+    if filters.search:
+        search = await search_service.match_rifas(db, filters.search)
+
+    sort_by = _sort_key(filters)
+    sort_column = _sort_expression(sort_by, search)
+
+    # Query base (valor de ordenação junto, para montar os cursores)
+    query = select(Rifa, sort_column.label("sort_value")).options(
+        selectinload(Rifa.creator),
+        selectinload(Rifa.category)
+    )
+
+    conditions = _rifa_conditions(filters, search)
+
+    # Posição do cursor
+    position = decode_cursor(filters.cursor)
+    if position is not None:
+        if position.get("s") != filters.sort_by or position.get("o") != filters.sort_order:
+            raise ValueError("Cursor não corresponde à ordenação")
+        try:
+            after_value = _parse_sort_value(position["v"], sort_by)
+            after_id = int(position["id"])
+        except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+            raise ValueError("Cursor inválido") from e
+        backwards = position.get("d") == "prev"
+    else:
+        backwards = False
+
+    # Ordenação (id desempata para que o cursor seja estável)
+    descending = (filters.sort_order == "desc") != backwards
+
+    if position is not None:
+        if descending:
+            conditions.append(or_(
+                sort_column < after_value,
+                and_(sort_column == after_value, Rifa.id < after_id)
+            ))
+        else:
+            conditions.append(or_(
+                sort_column > after_value,
+                and_(sort_column == after_value, Rifa.id > after_id)
+            ))
+
+    # Aplicar condições
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    if descending:
+        query = query.order_by(desc(sort_column), desc(Rifa.id))
     else:
-        query = query.order_by(asc(sort_column))
+        query = query.order_by(asc(sort_column), asc(Rifa.id))
 
-    # Paginação
-    offset = (filters.page - 1) * filters.per_page
-    query = query.limit(filters.per_page).offset(offset)
+    # Paginação (um item extra indica se há mais)
+    query = query.limit(filters.per_page + 1)
+    if position is None and filters.page > 1:
+        query = query.offset((filters.page - 1) * filters.per_page)
 
     # Executar query
     result = await db.execute(query)
-    rifas = result.scalars().all()
+    rows = list(result.all())
+
+    has_more = len(rows) > filters.per_page
+    rows = rows[:filters.per_page]
+
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next = has_more
+        has_prev = position is not None or filters.page > 1
+
+    # Total (sem o filtro do cursor)
+    total, total_is_estimate = await _count_rifas(
+        db, filters, _rifa_conditions(filters, search)
+    )
+
+    return RifaPage(
+        items=[row.Rifa for row in rows],
+        total=total,
+        has_next=has_next,
+        has_prev=has_prev,
+        next_cursor=_make_cursor(rows[-1], filters, "next") if rows and has_next else None,
+        prev_cursor=_make_cursor(rows[0], filters, "prev") if rows and has_prev else None,
+        total_is_estimate=total_is_estimate,
+    )
 
-    return list(rifas), total
+
+async def list_rifas(
+    db: AsyncSession,
+    filters: RifaFilters
+) -> Tuple[List[Rifa], int]:
+    """
+    Lista rifas com filtros e paginação
+
+    Args:
+        db: Sessão do banco de dados
+        filters: Filtros de busca
+
+    Returns:
+        Tupla (rifas, total)
+    """
+    page = await paginate_rifas(db, filters)
+    return page.items, page.total
 
 
 async def get_featured_rifas(
@@ -369,6 +689,103 @@ async def get_rifas_by_creator(
 # CATEGORIAS
 # ===========================================
 
+# Cache de categorias: Redis (compartilhado entre workers) ou LRU local.
+# Dentro de uma requisição a lista fica também em db.info.
+category_cache = Cache("categories", maxsize=16)
+_CATEGORIES_KEY = "all"
+_SESSION_CATEGORIES = "rifei.categories"
+_SESSION_CATEGORIES_DIRTY = "rifei.categories_dirty"
+
+_CATEGORY_FIELDS = (
+    "id", "name", "slug", "icon", "description", "is_active", "order",
+    "created_at", "updated_at",
+)
+
+# Tarefas de invalidação no Redis agendadas após commit
+_invalidation_tasks: set = set()
+
+
+def _category_to_dict(row) -> dict:
+    data = dict(row._mapping)
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+
+def _category_from_dict(data: dict) -> Category:
+    """Instância desanexada da sessão (somente leitura)"""
+    values = dict(data)
+    for field in ("created_at", "updated_at"):
+        if values.get(field):
+            values[field] = datetime.fromisoformat(values[field])
+    return Category(**values)
+
+
+async def _load_categories(db: AsyncSession) -> List[dict]:
+    """Todas as categorias (ativas e inativas), ordenadas, via cache"""
+    rows = db.info.get(_SESSION_CATEGORIES)
+    if rows is not None:
+        return rows
+
+    rows = await category_cache.get(_CATEGORIES_KEY)
+    if rows is None:
+        # Colunas, não entidades: não passa pelo identity map da sessão
+        result = await db.execute(
+            select(*(getattr(Category, field) for field in _CATEGORY_FIELDS))
+            .order_by(Category.order, Category.name)
+        )
+        rows = [_category_to_dict(row) for row in result]
+        await category_cache.set(_CATEGORIES_KEY, rows, settings.category_cache_seconds)
+
+    db.info[_SESSION_CATEGORIES] = rows
+    return rows
+
+
+async def invalidate_categories(db: Optional[AsyncSession] = None) -> None:
+    """
+    Descarta as categorias em cache
+
+    Alterações feitas pelo ORM já invalidam o cache no commit; use esta
+    função após UPDATE/INSERT diretos na tabela categories.
+    """
+    if db is not None:
+        db.info.pop(_SESSION_CATEGORIES, None)
+    await category_cache.delete(_CATEGORIES_KEY)
+
+
+@event.listens_for(Category, "after_insert")
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _mark_categories_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_CATEGORIES_DIRTY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_categories_on_commit(session) -> None:
+    if not session.info.pop(_SESSION_CATEGORIES_DIRTY, False):
+        return
+
+    session.info.pop(_SESSION_CATEGORIES, None)
+    category_cache.clear_local()
+    # Categorias também aparecem no autocomplete: remonta na próxima consulta
+    suggest_service.suggest_index.clear()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    for coro in (
+        category_cache.delete(_CATEGORIES_KEY),
+        invalidate_tags("categories"),
+        suggest_service.mark_changed(),
+    ):
+        task = loop.create_task(coro)
+        _invalidation_tasks.add(task)
+        task.add_done_callback(_invalidation_tasks.discard)
+
+
 async def list_categories(
     db: AsyncSession,
     active_only: bool = True
@@ -376,6 +793,9 @@ async def list_categories(
     """
     Lista todas as categorias
 
+    Servido do cache de categorias (settings.category_cache_seconds);
+    os objetos retornados não pertencem à sessão.
+
     Args:
         db: Sessão do banco de dados
         active_only: Se True, apenas categorias ativas
@@ -383,31 +803,29 @@ async def list_categories(
     Returns:
         Lista de categorias
     """
-    query = select(Category)
-
-    if active_only:
-        query = query.where(Category.is_active == True)
-
-    query = query.order_by(Category.order, Category.name)
+    rows = await _load_categories(db)
 
-    result = await db.execute(query)
-    return list(result.scalars().all())
+    return [
+        _category_from_dict(row)
+        for row in rows
+        if row["is_active"] or not active_only
+    ]
 
 
 async def get_category_by_id(db: AsyncSession, category_id: int) -> Optional[Category]:
-    """Busca categoria por ID"""
-    result = await db.execute(
-        select(Category).where(Category.id == category_id)
-    )
-    return result.scalar_one_or_none()
+    """Busca categoria por ID (via cache de categorias)"""
+    for row in await _load_categories(db):
+        if row["id"] == category_id:
+            return _category_from_dict(row)
+    return None
 
 
 async def get_category_by_slug(db: AsyncSession, slug: str) -> Optional[Category]:
-    """Busca categoria por slug"""
-    result = await db.execute(
-        select(Category).where(Category.slug == slug)
-    )
-    return result.scalar_one_or_none()
+    """Busca categoria por slug (via cache de categorias)"""
+    for row in await _load_categories(db):
+        if row["slug"] == slug:
+            return _category_from_dict(row)
+    return None
 
 
 # ===========================================
@@ -416,35 +834,139 @@ async def get_category_by_slug(db: AsyncSession, slug: str) -> Optional[Category
 
 async def get_available_numbers(
     db: AsyncSession,
-    rifa_id: int
+    rifa_id: int,
+    offset: int = 0,
+    limit: Optional[int] = None
 ) -> List[int]:
     """
-    Retorna lista de números disponíveis de uma rifa
+    Retorna números disponíveis de uma rifa, a partir do bitmap de vendidos
 
     Args:
         db: Sessão do banco de dados
         rifa_id: ID da rifa
+        offset: Quantos números disponíveis pular
+        limit: Máximo de números retornados (None = todos)
 
     Returns:
         Lista de números disponíveis
     """
-    # Buscar a rifa
-    rifa = await get_rifa_by_id(db, rifa_id)
-    if not rifa:
+    bitmap = await load_bitmap(db, rifa_id)
+    if not bitmap:
         return []
 
-    # Buscar números já vendidos
-    result = await db.execute(
-        select(Ticket.number)
-        .where(Ticket.rifa_id == rifa_id)
-    )
-    sold_numbers = set(result.scalars().all())
+    return bitmap.available_numbers(offset=offset, limit=limit)
+
+
+async def get_available_ranges(
+    db: AsyncSession,
+    rifa_id: int
+) -> List[Tuple[int, int]]:
+    """
+    Retorna faixas contínuas de números disponíveis ([início, fim] inclusivo)
+
+    Args:
+        db: Sessão do banco de dados
+        rifa_id: ID da rifa
 
-    # Retornar números disponíveis
-    all_numbers = set(range(1, rifa.total_numbers + 1))
-    available = sorted(list(all_numbers - sold_numbers))
+    Returns:
+        Lista de tuplas (início, fim)
+    """
+    bitmap = await load_bitmap(db, rifa_id)
+    if not bitmap:
+        return []
 
-    return available
+    return bitmap.available_ranges()
+
+
+async def get_rifa_numbers(
+    db: AsyncSession,
+    rifa_id: int,
+    start: int = 1,
+    limit: int = 1000,
+    encoding: str = "ranges"
+) -> Optional[dict]:
+    """
+    Retorna uma janela de números da rifa em formato compacto
+
+    Args:
+        db: Sessão do banco de dados
+        rifa_id: ID da rifa
+        start: Primeiro número da janela
+        limit: Quantidade de números na janela
+        encoding: "ranges", "bitmap" ou "list"
+
+    Returns:
+        Dicionário no formato de RifaNumbersResponse ou None se a rifa não existir
+    """
+    bitmap = await load_bitmap(db, rifa_id)
+    if not bitmap:
+        return None
+
+    start = max(start, 1)
+    end = min(start + limit - 1, bitmap.total)
+
+    data = {
+        "rifa_id": rifa_id,
+        "total_numbers": bitmap.total,
+        "available_count": bitmap.available_count,
+        "sold_count": bitmap.sold_count,
+        "encoding": encoding,
+        "start": start,
+        "end": end,
+        "next_cursor": encode_cursor({"n": end + 1}) if end < bitmap.total else None,
+    }
+
+    if start > end:
+        return data
+
+    if encoding == "ranges":
+        data["ranges"] = [
+            [first, last] for first, last in bitmap.iter_available_ranges(start, end)
+        ]
+    elif encoding == "bitmap":
+        window = bitmap.window_bytes(start, end - start + 1)
+        data["bitmap"] = base64.b64encode(window).decode()
+    else:
+        # Dono de cada número vendido na janela
+        result = await db.execute(
+            select(Ticket.number, Ticket.user_id)
+            .where(
+                and_(
+                    Ticket.rifa_id == rifa_id,
+                    Ticket.number.between(start, end)
+                )
+            )
+        )
+        owners = dict(result.all())
+
+        # Holds ativos na janela
+        result = await db.execute(
+            select(NumberReservation).where(
+                and_(
+                    NumberReservation.rifa_id == rifa_id,
+                    NumberReservation.number.between(start, end),
+                    NumberReservation.reserved_until > datetime.now(timezone.utc)
+                )
+            )
+        )
+        holds = {r.number: r for r in result.scalars().all()}
+
+        numbers = []
+        for n in range(start, end + 1):
+            if bitmap.is_sold(n):
+                numbers.append({"number": n, "status": NUMBER_SOLD, "user_id": owners.get(n)})
+            elif n in holds:
+                numbers.append({
+                    "number": n,
+                    "status": NUMBER_RESERVED,
+                    "user_id": holds[n].user_id,
+                    "reserved_until": holds[n].reserved_until,
+                })
+            else:
+                numbers.append({"number": n, "status": NUMBER_AVAILABLE})
+        data["numbers"] = numbers
+
+    return data
 
 
 async def check_numbers_available(
@@ -453,7 +975,10 @@ async def check_numbers_available(
     numbers: List[int]
 ) -> Tuple[bool, List[int]]:
     """
-    Verifica se números estão disponíveis
+    Verifica se números estão disponíveis (nem vendidos, nem com hold ativo)
+
+    Consulta apenas informativa: para garantir os números use
+    app.services.reservations.reserve_numbers, que é atômica.
 
     Args:
         db: Sessão do banco de dados
@@ -473,9 +998,22 @@ async def check_numbers_available(
             )
         )
     )
-    sold_numbers = set(result.scalars().all())
+    unavailable_numbers = set(result.scalars().all())
+
+    # Buscar números reservados por outros compradores
+    result = await db.execute(
+        select(NumberReservation.number)
+        .where(
+            and_(
+                NumberReservation.rifa_id == rifa_id,
+                NumberReservation.number.in_(numbers),
+                NumberReservation.reserved_until > datetime.now(timezone.utc)
+            )
+        )
+    )
+    unavailable_numbers.update(result.scalars().all())
 
-    unavailable = sorted(list(sold_numbers))
+    unavailable = sorted(unavailable_numbers)
     all_available = len(unavailable) == 0
 
     return all_available, unavailable
@@ -485,126 +1023,66 @@ async def check_numbers_available(
 # ESTATÍSTICAS
 # ===========================================
 
-async def get_rifa_stats(db: AsyncSession, rifa_id: int) -> dict:
+async def get_rifa_stats(
+    db: AsyncSession,
+    rifa_id: int,
+    detail: Optional[RifaDetail] = None
+) -> dict:
     """
     Obtém estatísticas de uma rifa
 
     Args:
         db: Sessão do banco de dados
         rifa_id: ID da rifa
+        detail: Detalhe já carregado (evita nova consulta)
 
     Returns:
         Dicionário com estatísticas
     """
-    rifa = await get_rifa_by_id(db, rifa_id)
-    if not rifa:
+    if detail is None:
+        detail = await load_rifa_detail(db, rifa_id)
+    if not detail:
         return {}
 
-    # Compradores únicos
-    unique_buyers_result = await db.execute(
-        select(func.count(func.distinct(Ticket.user_id)))
-        .where(Ticket.rifa_id == rifa_id)
-    )
-    unique_buyers = unique_buyers_result.scalar() or 0
+    rifa = detail.rifa
 
     # Receita total
     total_revenue = rifa.price * rifa.sold_count
 
-    # Tempo restante
+    # Tempo restante (SQLite devolve datas sem fuso: assume UTC)
     now = datetime.now(timezone.utc)
-    time_diff = rifa.end_date - now if rifa.end_date > now else timedelta(0)
+    end_date = rifa.end_date
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    time_diff = end_date - now if end_date > now else timedelta(0)
     days_remaining = time_diff.days
     hours_remaining = time_diff.seconds // 3600
 
-    # Última compra
-    last_purchase_result = await db.execute(
-        select(Ticket.created_at)
-        .where(Ticket.rifa_id == rifa_id)
-        .order_by(desc(Ticket.created_at))
-        .limit(1)
-    )
-    last_purchase = last_purchase_result.scalar_one_or_none()
-
     return {
         "rifa_id": rifa.id,
         "total_numbers": rifa.total_numbers,
         "sold_count": rifa.sold_count,
         "available_count": rifa.available_count,
         "progress_percent": rifa.progress_percent,
-        "unique_buyers": unique_buyers,
+        "unique_buyers": detail.unique_buyers,
         "total_revenue": total_revenue,
         "days_remaining": days_remaining if days_remaining >= 0 else 0,
         "hours_remaining": hours_remaining if days_remaining >= 0 else 0,
-        "last_purchase": last_purchase,
+        "last_purchase": detail.last_purchase,
     }
 
 
-async def get_marketplace_stats(db: AsyncSession) -> dict:
+async def get_marketplace_stats(db: AsyncSession, fresh: bool = False) -> dict:
     """
     Obtém estatísticas gerais do marketplace
 
+    Servidas do snapshot de services.stats (ver stale_after).
+
     Args:
         db: Sessão do banco de dados
+        fresh: Se True, recalcula em vez de usar o snapshot
 
     Returns:
         Dicionário com estatísticas
     """
-    # Total de rifas
-    total_rifas_result = await db.execute(
-        select(func.count()).select_from(Rifa)
-    )
-    total_rifas = total_rifas_result.scalar()
-
-    # Rifas ativas
-    active_rifas_result = await db.execute(
-        select(func.count())
-        .select_from(Rifa)
-        .where(Rifa.status == RifaStatus.ACTIVE)
-    )
-    active_rifas = active_rifas_result.scalar()
-
-    # Rifas completas
-    completed_rifas_result = await db.execute(
-        select(func.count())
-        .select_from(Rifa)
-        .where(Rifa.status == RifaStatus.COMPLETED)
-    )
-    completed_rifas = completed_rifas_result.scalar()
-
-    # Total de usuários
-    total_users_result = await db.execute(
-        select(func.count()).select_from(User)
-    )
-    total_users = total_users_result.scalar()
-
-    # Receita total estimada
-    revenue_result = await db.execute(
-        select(func.sum(Rifa.price * Rifa.sold_count)).select_from(Rifa)
-    )
-    total_revenue = revenue_result.scalar() or Decimal(0)
-
-    # Categorias populares
-    popular_categories_result = await db.execute(
-        select(
-            Category.name,
-            func.count(Rifa.id).label('count')
-        )
-        .join(Rifa, Category.id == Rifa.category_id)
-        .where(Rifa.status == RifaStatus.ACTIVE)
-        .group_by(Category.name)
-        .order_by(desc('count'))
-        .limit(5)
-    )
-    popular_categories = [
-        {"name": row.name, "count": row.count}
-        for row in popular_categories_result.all()
-    ]
-
-    return {
-        "total_rifas": total_rifas,
-        "active_rifas": active_rifas,
-        "completed_rifas": completed_rifas,
-        "total_users": total_users,
-        "total_revenue": total_revenue,
-        "popular_categories": popular_categories,
-    }
+    return await stats_service.get_marketplace_stats(db, fresh=fresh)
@@ -0,0 +1,344 @@
+"""
+Service de Números - Rifei
+Índice compacto (bitmap) de números vendidos por rifa e escrita de tickets
+"""
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import after_commit
+from app.models.models import Rifa, Ticket
+from app.response_cache import invalidate_tags
+
+
+# Bytes que ainda têm algum bit livre / algum bit marcado
+_HAS_AVAILABLE = re.compile(rb"[^\xff]")
+_HAS_SOLD = re.compile(rb"[^\x00]")
+
+# Status de número expostos pela API (ver NumberStatusResponse)
+NUMBER_AVAILABLE = "disponivel"
+NUMBER_RESERVED = "reservado"
+NUMBER_SOLD = "pago"
+
+
+class NumbersUnavailableError(Exception):
+    """Um ou mais números pedidos já estão vendidos ou fora da rifa"""
+
+    def __init__(self, numbers: List[int]):
+        self.numbers = sorted(numbers)
+        super().__init__(f"Números indisponíveis: {self.numbers}")
+
+
+# ===========================================
+# BITMAP
+# ===========================================
+
+class NumberBitmap:
+    """
+    Bitmap de números vendidos de uma rifa.
+
+    O número N corresponde ao bit N-1 (byte (N-1) // 8, bit menos
+    significativo primeiro). Bit 1 = vendido, bit 0 = disponível.
+    Uma rifa de 100.000 números ocupa 12,5 KB.
+    """
+
+    __slots__ = ("total", "_bits")
+
+    def __init__(self, total: int, data: Optional[bytes] = None):
+        self.total = total
+        size = (total + 7) // 8
+        if data is None:
+            self._bits = bytearray(size)
+        else:
+            # Ajusta o tamanho caso total_numbers tenha mudado
+            self._bits = bytearray(data[:size].ljust(size, b"\x00"))
+            self._clear_padding()
+
+    @classmethod
+    def from_numbers(cls, total: int, sold: Iterable[int]) -> "NumberBitmap":
+        """Monta o bitmap a partir dos números vendidos"""
+        bitmap = cls(total)
+        bitmap.mark_sold(sold)
+        return bitmap
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    def _clear_padding(self) -> None:
+        """Garante que os bits além de total fiquem zerados"""
+        extra = len(self._bits) * 8 - self.total
+        if extra and self._bits:
+            self._bits[-1] &= 0xFF >> extra
+
+    def _check(self, number: int) -> None:
+        if not 1 <= number <= self.total:
+            raise ValueError(f"Número fora da rifa: {number}")
+
+    # -------------------------------------------
+    # Escrita
+    # -------------------------------------------
+
+    def mark_sold(self, numbers: Iterable[int]) -> None:
+        for number in numbers:
+            self._check(number)
+            index = number - 1
+            self._bits[index >> 3] |= 1 << (index & 7)
+
+    def mark_available(self, numbers: Iterable[int]) -> None:
+        for number in numbers:
+            self._check(number)
+            index = number - 1
+            self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    # -------------------------------------------
+    # Consulta
+    # -------------------------------------------
+
+    def is_sold(self, number: int) -> bool:
+        self._check(number)
+        index = number - 1
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def is_available(self, number: int) -> bool:
+        return not self.is_sold(number)
+
+    @property
+    def sold_count(self) -> int:
+        return int.from_bytes(self._bits, "little").bit_count()
+
+    @property
+    def available_count(self) -> int:
+        return self.total - self.sold_count
+
+    def _next(self, index: int, sold: bool) -> Optional[int]:
+        """
+        Índice (0-based) do próximo bit no estado pedido a partir de index.
+
+        Bytes inteiros no estado oposto são pulados via regex (em C),
+        então runs longos custam O(1) em Python.
+        """
+        if index >= self.total:
+            return None
+
+        bits = self._bits
+        byte_index, offset = divmod(index, 8)
+        current = bits[byte_index] if sold else ~bits[byte_index] & 0xFF
+        current &= (0xFF << offset) & 0xFF
+
+        if not current:
+            pattern = _HAS_SOLD if sold else _HAS_AVAILABLE
+            match = pattern.search(bits, byte_index + 1)
+            if not match:
+                return None
+            byte_index = match.start()
+            current = bits[byte_index] if sold else ~bits[byte_index] & 0xFF
+
+        found = byte_index * 8 + (current & -current).bit_length() - 1
+        return found if found < self.total else None
+
+    def iter_available_ranges(
+        self,
+        start: int = 1,
+        end: Optional[int] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Itera faixas contínuas de números disponíveis (inclusivas)
+        dentro de [start, end].
+        """
+        end = self.total if end is None else min(end, self.total)
+        index = max(start, 1) - 1
+
+        while index < end:
+            first = self._next(index, sold=False)
+            if first is None or first >= end:
+                return
+            after = self._next(first, sold=True)
+            last = end if after is None else min(after, end)
+            yield first + 1, last
+            index = last
+
+    def available_ranges(
+        self,
+        start: int = 1,
+        end: Optional[int] = None,
+    ) -> List[Tuple[int, int]]:
+        return list(self.iter_available_ranges(start, end))
+
+    def window_bytes(self, start: int, count: int) -> bytes:
+        """
+        Bits dos números [start, start + count - 1] em um novo bitmap
+        (bit 0 = start), no mesmo formato de to_bytes().
+        """
+        count = max(0, min(count, self.total - start + 1))
+        if count == 0:
+            return b""
+
+        index = start - 1
+        first_byte, shift = divmod(index, 8)
+        last_byte = (index + count + 7) // 8
+        value = int.from_bytes(self._bits[first_byte:last_byte], "little") >> shift
+        value &= (1 << count) - 1
+        return value.to_bytes((count + 7) // 8, "little")
+
+    def available_numbers(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Página de números disponíveis, em ordem crescente.
+
+        Args:
+            offset: Quantos números disponíveis pular
+            limit: Máximo de números retornados (None = todos)
+        """
+        numbers: List[int] = []
+        for first, last in self.iter_available_ranges():
+            size = last - first + 1
+            if offset >= size:
+                offset -= size
+                continue
+
+            first += offset
+            offset = 0
+
+            if limit is not None:
+                last = min(last, first + (limit - len(numbers)) - 1)
+            numbers.extend(range(first, last + 1))
+
+            if limit is not None and len(numbers) >= limit:
+                break
+
+        return numbers
+
+
+# ===========================================
+# PERSISTÊNCIA DO BITMAP
+# ===========================================
+
+async def rebuild_bitmap(
+    db: AsyncSession,
+    rifa_id: int,
+    total_numbers: int
+) -> NumberBitmap:
+    """
+    Reconstrói o bitmap a partir da tabela de tickets e persiste
+
+    Usado para rifas antigas (sem bitmap) ou para corrigir divergências.
+    Em sessões de réplica (get_read_db) só reconstrói em memória.
+    """
+    result = await db.execute(
+        select(Ticket.number).where(Ticket.rifa_id == rifa_id)
+    )
+    bitmap = NumberBitmap.from_numbers(
+        total_numbers,
+        (n for n in result.scalars() if 1 <= n <= total_numbers),
+    )
+
+    if db.info.get("read_only"):
+        return bitmap
+
+    await db.execute(
+        update(Rifa)
+        .where(Rifa.id == rifa_id)
+        .values(numbers_bitmap=bitmap.to_bytes())
+        .execution_options(synchronize_session=False)
+    )
+
+    return bitmap
+
+
+async def load_bitmap(db: AsyncSession, rifa_id: int) -> Optional[NumberBitmap]:
+    """
+    Carrega o bitmap de números vendidos de uma rifa
+
+    Returns:
+        NumberBitmap ou None se a rifa não existir
+    """
+    result = await db.execute(
+        select(Rifa.total_numbers, Rifa.numbers_bitmap).where(Rifa.id == rifa_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    if row.numbers_bitmap is None:
+        return await rebuild_bitmap(db, rifa_id, row.total_numbers)
+
+    return NumberBitmap(row.total_numbers, row.numbers_bitmap)
+
+
+# ===========================================
+# ESCRITA DE TICKETS
+# ===========================================
+
+async def create_tickets(
+    db: AsyncSession,
+    rifa_id: int,
+    user_id: int,
+    numbers: List[int],
+    payment_id: Optional[int] = None,
+) -> List[Ticket]:
+    """
+    Registra tickets vendidos e atualiza bitmap e sold_count na mesma transação
+
+    A linha da rifa é travada (SELECT ... FOR UPDATE) enquanto o bitmap é
+    atualizado, então escritas concorrentes não perdem bits. sold_count é
+    incrementado no próprio UPDATE (sold_count = sold_count + n); divergências
+    são corrigidas por services.counters.reconcile_sold_counts.
+
+    Raises:
+        NumbersUnavailableError: Se algum número já estiver vendido
+    """
+    result = await db.execute(
+        select(Rifa.total_numbers, Rifa.numbers_bitmap)
+        .where(Rifa.id == rifa_id)
+        .with_for_update()
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise NumbersUnavailableError(numbers)
+
+    if row.numbers_bitmap is None:
+        sold = await db.execute(
+            select(Ticket.number).where(Ticket.rifa_id == rifa_id)
+        )
+        bitmap = NumberBitmap.from_numbers(
+            row.total_numbers,
+            (n for n in sold.scalars() if 1 <= n <= row.total_numbers),
+        )
+    else:
+        bitmap = NumberBitmap(row.total_numbers, row.numbers_bitmap)
+
+    unavailable = [
+        n for n in numbers
+        if not 1 <= n <= bitmap.total or bitmap.is_sold(n)
+    ]
+    if unavailable:
+        raise NumbersUnavailableError(unavailable)
+
+    bitmap.mark_sold(numbers)
+
+    tickets = [
+        Ticket(rifa_id=rifa_id, user_id=user_id, number=n, payment_id=payment_id)
+        for n in numbers
+    ]
+    db.add_all(tickets)
+
+    await db.execute(
+        update(Rifa)
+        .where(Rifa.id == rifa_id)
+        .values(
+            numbers_bitmap=bitmap.to_bytes(),
+            sold_count=Rifa.sold_count + len(numbers),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.flush()
+
+    # sold_count/progresso aparecem nas listagens em cache
+    after_commit(db, lambda: invalidate_tags("rifas"))
+
+    return tickets
@@ -0,0 +1,46 @@
+"""
+Helpers de paginação - Rifei
+Cursores opacos para paginação por cursor
+"""
+import base64
+import json
+from typing import Optional
+
+
+def encode_cursor(data: dict) -> str:
+    """
+    Codifica um cursor opaco (JSON compacto em base64 url-safe)
+
+    Args:
+        data: Dados da posição (ex: {"n": 1001})
+
+    Returns:
+        Cursor em texto, seguro para query string
+    """
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """
+    Decodifica um cursor gerado por encode_cursor
+
+    Returns:
+        Dicionário com a posição ou None se o cursor for vazio
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+    if not isinstance(data, dict):
+        raise ValueError("Cursor inválido")
+
+    return data
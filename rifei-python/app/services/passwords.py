@@ -0,0 +1,133 @@
+"""
+Service de Senhas - Rifei
+Hash/verificação bcrypt fora do event loop, em um pool limitado com métricas
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    """Fila do pool de hashing cheia (responder 503 com Retry-After)"""
+
+    def __init__(self, retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__("Serviço de autenticação ocupado")
+
+
+def _timed(fn: Callable, *args):
+    """Executa fn no worker e devolve (resultado, início, fim) em monotonic"""
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic()
+
+
+class PasswordHasher:
+    """
+    Pool de threads (ou processos) para bcrypt com fila limitada.
+
+    Até `workers` hashes rodam em paralelo e até `max_queue` esperam;
+    além disso run() falha na hora com PasswordHasherBusyError em vez
+    de acumular requisições. bcrypt libera o GIL, então threads bastam
+    na maioria dos casos; "process" isola totalmente a CPU.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 64,
+        kind: str = "thread",
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+
+        # Métricas
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self.max_latency = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="bcrypt",
+                )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Tarefas aguardando um worker livre"""
+        return max(0, self.pending - self.workers)
+
+    async def run(self, fn: Callable, *args):
+        """
+        Executa fn(*args) no pool
+
+        Raises:
+            PasswordHasherBusyError: Se a fila estiver cheia
+        """
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError()
+
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(
+                self._get_executor(), _timed, fn, *args
+            )
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self._wait_total += started - submitted
+        self._run_total += finished - started
+        self.max_latency = max(self.max_latency, finished - submitted)
+
+        return result
+
+    def metrics(self) -> dict:
+        """Snapshot das métricas (exposto em /health)"""
+        completed = self.completed or 1
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / completed * 1000, 2),
+            "avg_run_ms": round(self._run_total / completed * 1000, 2),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    kind=settings.password_hash_executor,
+)
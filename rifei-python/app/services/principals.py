@@ -0,0 +1,360 @@
+"""
+Service de Principais - Rifei
+Cache de tokens já verificados (claims + projeção do usuário) e principal
+montado só a partir das claims, usados pelas dependencies de auth
+"""
+import hashlib
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Union
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.cache import LocalCache
+from app.config import settings
+from app.database import after_commit
+from app.models.models import User, UserRole
+from app.services.auth import verify_token
+from app.services.refresh_tokens import revoke_user_refresh_tokens
+
+
+# Colunas carregadas para o usuário autenticado (as de UserResponse, sem
+# password_hash e demais campos que rotas e templates não usam)
+_USER_FIELDS = (
+    "id", "email", "name", "username", "avatar_url", "bio", "phone",
+    "role", "is_active", "is_verified", "level", "xp", "total_wins",
+    "token_version", "created_at",
+)
+
+_SESSION_USERS_DIRTY = "rifei.principals_dirty"
+
+
+class Principal(NamedTuple):
+    """Resultado da autenticação de um token de acesso"""
+    claims: dict
+    user_id: Optional[int]   # None se "sub" estiver ausente ou malformado
+    user: Optional[User]     # None se o usuário não existir
+
+
+class _Entry(NamedTuple):
+    claims: dict
+    user_id: int
+    user: dict
+    generation: int
+
+
+class PrincipalCache:
+    """
+    LRU de tokens verificados, indexado pelo SHA-256 do token.
+
+    Cada entrada vive no máximo até o exp do token (e nunca mais que
+    settings.auth_cache_seconds). Invalidar um usuário incrementa a sua
+    geração, o que descarta de uma vez todas as entradas dos tokens dele.
+
+    O cache é local ao processo de propósito: um acerto custa um lookup
+    em dict, enquanto uma ida ao Redis custaria o mesmo que o SELECT por
+    chave primária que ele substitui. Em outros workers a invalidação
+    chega pelo TTL.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._entries = LocalCache(maxsize)
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token_hash: str) -> Optional[_Entry]:
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            return None
+        if entry.generation != self._generations.get(entry.user_id, 0):
+            self._entries.delete(token_hash)
+            return None
+        return entry
+
+    def set(self, token_hash: str, claims: dict, user: dict, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        user_id = user["id"]
+        with self._lock:
+            generation = self._generations.get(user_id, 0)
+        self._entries.set(
+            token_hash,
+            _Entry(claims, user_id, user, generation),
+            ttl,
+        )
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Descarta todas as entradas de um usuário"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _user_from_dict(data: dict) -> User:
+    """
+    Instância desanexada da sessão, nova a cada requisição
+
+    Atributos fora de _USER_FIELDS e relacionamentos não estão carregados
+    (acessá-los levanta DetachedInstanceError); use o id para consultas.
+    """
+    user = User(**data)
+    make_transient_to_detached(user)
+    return user
+
+
+async def _load_user(db: AsyncSession, user_id: int) -> Optional[dict]:
+    # Colunas, não entidades: não passa pelo identity map da sessão
+    result = await db.execute(
+        select(*(getattr(User, field) for field in _USER_FIELDS))
+        .where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    return None if row is None else dict(row._mapping)
+
+
+# ===========================================
+# API DO SERVICE
+# ===========================================
+
+async def resolve_principal(db: AsyncSession, token: str) -> Optional[Principal]:
+    """
+    Verifica um token de acesso e carrega o usuário dele
+
+    Tokens já vistos são servidos do cache, sem jwt.decode nem acesso
+    ao banco. Usuários inexistentes não são guardados.
+
+    Args:
+        db: Sessão do banco de dados
+        token: Token JWT (header Authorization ou cookie)
+
+    Returns:
+        Principal, ou None se o token for inválido, expirado, revogado
+        (claim "ver" diferente de users.token_version) ou não for do
+        tipo "access"
+    """
+    token_hash = hash_token(token)
+
+    entry = principal_cache.get(token_hash)
+    if entry is not None:
+        return Principal(entry.claims, entry.user_id, _user_from_dict(entry.user))
+
+    claims = verify_token(token, token_type="access")
+    if not claims:
+        return None
+
+    try:
+        user_id = int(claims.get("sub"))
+    except (ValueError, TypeError):
+        return Principal(claims, None, None)
+
+    user = await _load_user(db, user_id)
+    if user is None:
+        return Principal(claims, user_id, None)
+
+    # Usuários inativos seguem adiante para a dependency responder 403
+    # Sem claim "ver" (tokens antigos ou montados à mão) conta como revogado
+    if user["is_active"] and claims.get("ver") != user["token_version"]:
+        return None
+
+    ttl = settings.auth_cache_seconds
+    if claims.get("exp") is not None:
+        ttl = min(ttl, claims["exp"] - time.time())
+    principal_cache.set(token_hash, claims, user, ttl)
+
+    return Principal(claims, user_id, _user_from_dict(user))
+
+
+# ===========================================
+# PRINCIPAL A PARTIR DAS CLAIMS
+# ===========================================
+
+class ClaimsPrincipal:
+    """
+    Usuário montado só com as claims do token (sem acesso ao banco).
+
+    Tem os campos usados no header e na sidebar; páginas que precisam
+    de mais dados (perfil, configurações) devem usar OptionalUser.
+    level e xp refletem o momento em que o token foi emitido.
+    """
+
+    __slots__ = ("id", "email", "username", "name", "role", "level", "xp", "version")
+
+    is_active = True
+
+    def __init__(
+        self,
+        id: int,
+        email: str,
+        username: str,
+        name: str,
+        role: UserRole,
+        level: int,
+        xp: int,
+        version: int,
+    ):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.name = name
+        self.role = role
+        self.level = level
+        self.xp = xp
+        self.version = version
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> Optional["ClaimsPrincipal"]:
+        """None se faltar alguma claim (tokens emitidos antes delas)"""
+        try:
+            return cls(
+                id=int(claims["sub"]),
+                email=claims["email"],
+                username=claims["username"],
+                name=claims["name"],
+                role=UserRole(claims["role"]),
+                level=claims["level"],
+                xp=claims["xp"],
+                version=claims["ver"],
+            )
+        except (KeyError, ValueError, TypeError):
+            return None
+
+    def __repr__(self):
+        return f"<ClaimsPrincipal {self.username}>"
+
+
+# Versão atual dos tokens por usuário (_INACTIVE = inativo ou removido),
+# consultada no banco no máximo uma vez a cada settings.auth_cache_seconds
+token_versions = LocalCache(maxsize=8192)
+
+_INACTIVE = -1
+
+
+async def current_token_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Versão vigente dos tokens do usuário
+
+    Returns:
+        users.token_version, ou None se o usuário estiver inativo ou
+        não existir
+    """
+    version = token_versions.get(str(user_id))
+    if version is None:
+        result = await db.execute(
+            select(User.token_version, User.is_active).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        version = row.token_version if row is not None and row.is_active else _INACTIVE
+        token_versions.set(str(user_id), version, settings.auth_cache_seconds)
+
+    return None if version == _INACTIVE else version
+
+
+async def resolve_claims_principal(
+    db: AsyncSession,
+    token: str
+) -> Optional[Union[ClaimsPrincipal, User]]:
+    """
+    Usuário para páginas que só exibem dados do header/sidebar
+
+    O token é decodificado e o principal montado a partir das claims; o
+    banco só é lido para conferir a claim "ver" quando a versão do
+    usuário não está em cache. Tokens antigos (sem as claims) caem no
+    caminho de resolve_principal.
+
+    Returns:
+        ClaimsPrincipal (ou User, para tokens antigos), ou None se o
+        token for inválido, revogado ou o usuário estiver inativo
+    """
+    claims = verify_token(token, token_type="access")
+    if not claims:
+        return None
+
+    principal = ClaimsPrincipal.from_claims(claims)
+    if principal is None:
+        resolved = await resolve_principal(db, token)
+        if resolved is None or resolved.user is None or not resolved.user.is_active:
+            return None
+        return resolved.user
+
+    if await current_token_version(db, principal.id) != principal.version:
+        return None
+
+    return principal
+
+
+# ===========================================
+# INVALIDAÇÃO
+# ===========================================
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Descarta os tokens em cache de um usuário
+
+    Alterações feitas pelo ORM (desativação, troca de role, perfil) já
+    invalidam no commit; use esta função após UPDATE direto em users.
+    """
+    principal_cache.invalidate_user(user_id)
+    token_versions.delete(str(user_id))
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> None:
+    """
+    Revoga todos os tokens já emitidos para o usuário ("sair de todos os
+    dispositivos"): access tokens pela versão e os refresh tokens no banco
+
+    As duas revogações vão no mesmo commit (o da requisição); o cache é
+    descartado depois dele.
+    """
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await revoke_user_refresh_tokens(db, user_id)
+
+    async def invalidate() -> None:
+        invalidate_user(user_id)
+
+    after_commit(db, invalidate)
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target) -> None:
+    # Desativar ou trocar a role revoga os tokens (claims "role"/"ver")
+    state = inspect(target)
+    if (
+        state.attrs.is_active.history.has_changes()
+        or state.attrs.role.history.has_changes()
+    ):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_SESSION_USERS_DIRTY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_on_commit(session) -> None:
+    for user_id in session.info.pop(_SESSION_USERS_DIRTY, ()):
+        invalidate_user(user_id)
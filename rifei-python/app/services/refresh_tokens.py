@@ -0,0 +1,242 @@
+"""
+Service de Refresh Tokens - Rifei
+Registro dos refresh tokens no servidor: rotação, revogação por família e expiração em lote
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import Cache
+from app.config import settings
+from app.database import after_commit, commit
+from app.models.models import RefreshToken, User
+from app.services.auth import create_refresh_token, get_user_by_id, verify_token
+
+logger = logging.getLogger(__name__)
+
+# Famílias revogadas, recusadas sem ir ao banco (Redis se configurado)
+revoked_families = Cache("refresh_families", maxsize=4096)
+
+
+class RefreshTokenError(Exception):
+    """Refresh token inválido, expirado, revogado ou reutilizado"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(f"Refresh token recusado: {reason}")
+
+
+def refresh_token_lifetime() -> timedelta:
+    return timedelta(days=settings.jwt_refresh_token_expire_days)
+
+
+def _add_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    """Registra um novo refresh token na sessão (sem commit) e devolve o JWT"""
+    lifetime = refresh_token_lifetime()
+    jti = uuid.uuid4().hex
+    family_id = family_id or uuid.uuid4().hex
+
+    db.add(RefreshToken(
+        jti=jti,
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + lifetime,
+    ))
+
+    return create_refresh_token(
+        {"sub": str(user_id), "jti": jti, "fam": family_id},
+        expires_delta=lifetime,
+    )
+
+
+# ===========================================
+# EMISSÃO E ROTAÇÃO
+# ===========================================
+
+async def issue_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """
+    Emite o refresh token de um novo login (nova família)
+
+    Returns:
+        Refresh token JWT (claims "jti" e "fam")
+    """
+    token = _add_token(db, user_id)
+    await db.flush()
+    return token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[User, str]:
+    """
+    Troca um refresh token por um novo da mesma família
+
+    Cada refresh token vale uma única vez: o UPDATE condicional que o
+    marca como usado é o que decide, então duas renovações simultâneas
+    com o mesmo token não passam. Apresentar de novo um token já usado
+    indica vazamento, e a família inteira é revogada.
+
+    Args:
+        db: Sessão do banco de dados
+        token: Refresh token JWT
+
+    Returns:
+        (usuário, novo refresh token)
+
+    Raises:
+        RefreshTokenError: Se o token for inválido, expirado, revogado,
+            reutilizado ou o usuário estiver inativo
+    """
+    claims = verify_token(token, token_type="refresh")
+    jti = claims.get("jti") if claims else None
+    family_id = claims.get("fam") if claims else None
+    if not jti or not family_id:
+        raise RefreshTokenError("inválido")
+
+    if await revoked_families.get(family_id):
+        raise RefreshTokenError("revogado")
+
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != 1:
+        await db.rollback()
+        used = await db.execute(
+            select(RefreshToken.used_at).where(RefreshToken.jti == jti)
+        )
+        if used.scalar_one_or_none() is not None:
+            # Único commit do serviço: a revogação precisa valer mesmo
+            # com a requisição terminando em 401
+            await revoke_family(db, family_id)
+            await commit(db)
+            raise RefreshTokenError("reutilizado")
+        raise RefreshTokenError("revogado")
+
+    # Desativar o usuário já revoga os tokens dele (token_version)
+    user = await get_user_by_id(db, int(claims["sub"]))
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise RefreshTokenError("usuário inativo")
+
+    new_token = _add_token(db, user.id, family_id)
+    await db.flush()
+
+    return user, new_token
+
+
+# ===========================================
+# REVOGAÇÃO
+# ===========================================
+
+async def revoke_family(db: AsyncSession, family_id: str) -> None:
+    """
+    Revoga todos os tokens de uma família (logout, reuso detectado)
+
+    Só faz o UPDATE: o commit é o da requisição, e a família entra em
+    revoked_families depois dele.
+    """
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    after_commit(db, lambda: revoked_families.set(
+        family_id, True, refresh_token_lifetime().total_seconds()
+    ))
+
+
+async def revoke_token(db: AsyncSession, token: str) -> None:
+    """Revoga a família de um refresh token (ignora tokens inválidos)"""
+    claims = verify_token(token, token_type="refresh")
+    if claims and claims.get("fam"):
+        await revoke_family(db, claims["fam"])
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int) -> int:
+    """
+    Revoga todos os refresh tokens de um usuário (sem commit)
+
+    Returns:
+        Quantidade de tokens revogados
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+# ===========================================
+# EXPIRAÇÃO
+# ===========================================
+
+async def purge_expired_refresh_tokens(
+    db: AsyncSession,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Remove refresh tokens vencidos em lotes (um commit por lote)
+
+    Tokens usados ou revogados ficam até vencer: são eles que permitem
+    detectar reuso.
+
+    Returns:
+        Total de tokens removidos
+    """
+    batch_size = batch_size or settings.refresh_token_purge_batch_size
+    now = datetime.now(timezone.utc)
+    total = 0
+
+    while True:
+        batch = (
+            select(RefreshToken.id)
+            .where(RefreshToken.expires_at <= now)
+            .order_by(RefreshToken.expires_at)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            delete(RefreshToken)
+            .where(RefreshToken.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def run_purge_worker(interval: Optional[int] = None) -> None:
+    """Loop de limpeza de refresh tokens (iniciado no lifespan da aplicação)"""
+    from app.database import async_session
+
+    interval = interval or settings.refresh_token_purge_interval_seconds
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as db:
+                purged = await purge_expired_refresh_tokens(db)
+            if purged:
+                logger.info("Refresh tokens vencidos removidos: %s", purged)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao remover refresh tokens vencidos")
@@ -0,0 +1,310 @@
+"""
+Service de Reservas - Rifei
+Hold temporário de números durante a compra, sem corrida entre compradores
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, delete, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.models import Rifa, Ticket, NumberReservation, RifaStatus
+from app.services.numbers import (
+    NumberBitmap,
+    NumbersUnavailableError,
+    create_tickets,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RifaClosedError(Exception):
+    """Rifa inexistente ou que não está aceitando reservas"""
+
+    def __init__(self, rifa_id: int, found: bool = True):
+        self.rifa_id = rifa_id
+        self.found = found
+        super().__init__(f"Rifa {rifa_id} não está aceitando reservas")
+
+
+class ReservationLimitError(Exception):
+    """Usuário excederia max_numbers_per_user da rifa"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"Limite de {limit} números por usuário")
+
+
+def _insert(db: AsyncSession):
+    """insert() do dialeto atual (ON CONFLICT é específico de dialeto)"""
+    # Importado aqui: o pacote do dialeto que não está em uso (e o do
+    # asyncpg) fica fora do import da aplicação
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+# ===========================================
+# RESERVA
+# ===========================================
+
+async def reserve_numbers(
+    db: AsyncSession,
+    rifa_id: int,
+    user_id: int,
+    numbers: List[int],
+    ttl: Optional[timedelta] = None
+) -> Tuple[List[int], datetime]:
+    """
+    Reserva números de forma atômica (tudo ou nada)
+
+    Os holds são gravados com um único INSERT ... ON CONFLICT DO UPDATE,
+    que só renova holds do próprio usuário; holds de outros compradores
+    (não expirados) ficam intactos. Nenhuma linha de `rifas` é travada.
+    Não commita: os holds valem a partir do commit da requisição (get_db).
+
+    Args:
+        db: Sessão do banco de dados
+        rifa_id: ID da rifa
+        user_id: ID do comprador
+        numbers: Números a reservar (até 100)
+        ttl: Duração do hold (padrão: settings.reservation_ttl_minutes)
+
+    Returns:
+        Tupla (números reservados, reserved_until)
+
+    Raises:
+        RifaClosedError: Rifa inexistente ou não ativa
+        NumbersUnavailableError: Algum número vendido, reservado ou fora da rifa
+        ReservationLimitError: Excede max_numbers_per_user
+    """
+    result = await db.execute(
+        select(
+            Rifa.status,
+            Rifa.total_numbers,
+            Rifa.max_numbers_per_user,
+            Rifa.numbers_bitmap,
+        ).where(Rifa.id == rifa_id)
+    )
+    rifa = result.one_or_none()
+
+    if rifa is None:
+        raise RifaClosedError(rifa_id, found=False)
+    if rifa.status != RifaStatus.ACTIVE:
+        raise RifaClosedError(rifa_id)
+
+    # Vendidos/fora da faixa: rejeita antes de tocar nos holds
+    bitmap = NumberBitmap(rifa.total_numbers, rifa.numbers_bitmap)
+    unavailable = [
+        n for n in numbers
+        if not 1 <= n <= rifa.total_numbers
+        or (rifa.numbers_bitmap is not None and bitmap.is_sold(n))
+    ]
+    if unavailable:
+        raise NumbersUnavailableError(unavailable)
+
+    now = datetime.now(timezone.utc)
+    reserved_until = now + (ttl or timedelta(minutes=settings.reservation_ttl_minutes))
+
+    if rifa.max_numbers_per_user:
+        held = await db.execute(
+            select(
+                select(func.count())
+                .select_from(Ticket)
+                .where(and_(Ticket.rifa_id == rifa_id, Ticket.user_id == user_id))
+                .scalar_subquery(),
+                select(func.count())
+                .select_from(NumberReservation)
+                .where(
+                    and_(
+                        NumberReservation.rifa_id == rifa_id,
+                        NumberReservation.user_id == user_id,
+                        NumberReservation.reserved_until > now,
+                        NumberReservation.number.not_in(numbers),
+                    )
+                )
+                .scalar_subquery(),
+            )
+        )
+        tickets_count, holds_count = held.one()
+        if tickets_count + holds_count + len(numbers) > rifa.max_numbers_per_user:
+            raise ReservationLimitError(rifa.max_numbers_per_user)
+
+    # Holds expirados desses números não devem bloquear o INSERT
+    await db.execute(
+        delete(NumberReservation).where(
+            and_(
+                NumberReservation.rifa_id == rifa_id,
+                NumberReservation.number.in_(numbers),
+                NumberReservation.reserved_until <= now,
+            )
+        )
+    )
+
+    insert = _insert(db)
+    stmt = insert(NumberReservation).values([
+        {
+            "rifa_id": rifa_id,
+            "user_id": user_id,
+            "number": n,
+            "reserved_until": reserved_until,
+        }
+        for n in numbers
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NumberReservation.rifa_id, NumberReservation.number],
+        set_={"reserved_until": stmt.excluded.reserved_until},
+        where=NumberReservation.user_id == stmt.excluded.user_id,
+    ).returning(NumberReservation.number)
+
+    result = await db.execute(stmt)
+    acquired = set(result.scalars().all())
+
+    if len(acquired) != len(numbers):
+        await db.rollback()
+        raise NumbersUnavailableError([n for n in numbers if n not in acquired])
+
+    # Um ticket pode ter sido escrito entre a leitura do bitmap e o INSERT
+    sold = await db.execute(
+        select(Ticket.number).where(
+            and_(Ticket.rifa_id == rifa_id, Ticket.number.in_(numbers))
+        )
+    )
+    sold_numbers = sold.scalars().all()
+    if sold_numbers:
+        await db.rollback()
+        raise NumbersUnavailableError(sold_numbers)
+
+    return sorted(numbers), reserved_until
+
+
+async def release_numbers(
+    db: AsyncSession,
+    rifa_id: int,
+    user_id: int,
+    numbers: Optional[List[int]] = None
+) -> int:
+    """
+    Libera holds do usuário (todos da rifa se numbers for None)
+
+    Returns:
+        Quantidade de holds removidos
+    """
+    conditions = [
+        NumberReservation.rifa_id == rifa_id,
+        NumberReservation.user_id == user_id,
+    ]
+    if numbers:
+        conditions.append(NumberReservation.number.in_(numbers))
+
+    result = await db.execute(delete(NumberReservation).where(and_(*conditions)))
+
+    return result.rowcount
+
+
+async def confirm_reservation(
+    db: AsyncSession,
+    rifa_id: int,
+    user_id: int,
+    numbers: List[int],
+    payment_id: Optional[int] = None
+) -> List[Ticket]:
+    """
+    Converte holds válidos do usuário em tickets
+
+    Os holds são consumidos com DELETE ... RETURNING na mesma transação
+    em que os tickets são escritos; sold_count é incrementado no banco.
+
+    Raises:
+        NumbersUnavailableError: Algum número sem hold válido do usuário
+    """
+    now = datetime.now(timezone.utc)
+
+    result = await db.execute(
+        delete(NumberReservation)
+        .where(
+            and_(
+                NumberReservation.rifa_id == rifa_id,
+                NumberReservation.user_id == user_id,
+                NumberReservation.number.in_(numbers),
+                NumberReservation.reserved_until > now,
+            )
+        )
+        .returning(NumberReservation.number)
+    )
+    claimed = set(result.scalars().all())
+
+    if len(claimed) != len(numbers):
+        await db.rollback()
+        raise NumbersUnavailableError([n for n in numbers if n not in claimed])
+
+    try:
+        return await create_tickets(db, rifa_id, user_id, numbers, payment_id=payment_id)
+    except NumbersUnavailableError:
+        await db.rollback()
+        raise
+
+
+# ===========================================
+# EXPIRAÇÃO
+# ===========================================
+
+async def expire_reservations(
+    db: AsyncSession,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Remove holds expirados em lotes (um commit por lote)
+
+    Lotes pequenos mantêm cada transação curta, sem travar a tabela
+    inteira enquanto compradores reservam.
+
+    Returns:
+        Total de holds removidos
+    """
+    batch_size = batch_size or settings.reservation_expire_batch_size
+    now = datetime.now(timezone.utc)
+    total = 0
+
+    while True:
+        batch = (
+            select(NumberReservation.id)
+            .where(NumberReservation.reserved_until <= now)
+            .order_by(NumberReservation.reserved_until)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            delete(NumberReservation)
+            .where(NumberReservation.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def run_expiry_worker(interval: Optional[int] = None) -> None:
+    """Loop de expiração de holds (iniciado no lifespan da aplicação)"""
+    from app.database import async_session
+
+    interval = interval or settings.reservation_expire_interval_seconds
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as db:
+                expired = await expire_reservations(db)
+            if expired:
+                logger.info("Reservas expiradas removidas: %s", expired)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao expirar reservas")
@@ -0,0 +1,272 @@
+"""
+Service de Busca - Rifei
+Busca textual de rifas: tsvector + GIN no PostgreSQL, índice invertido em memória nos demais bancos
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import DDL, case, event, false, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Rifa
+
+
+# Pesos dos campos (equivalentes aos pesos A/B padrão do ts_rank)
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+# Configuração de busca do PostgreSQL
+TS_CONFIG = "portuguese"
+
+
+# ===========================================
+# POSTGRESQL (tsvector + GIN)
+# ===========================================
+
+# Coluna gerada e índice GIN criados junto com a tabela; unaccent não é
+# IMMUTABLE, por isso o wrapper rifei_unaccent (exigido em colunas geradas).
+# Vale para o create_all (testes/scripts); em produção o schema vem de
+# alembic/versions/0001_series_schema.py, que repete este DDL (também
+# para bancos anteriores às migrações, após `alembic stamp 0000`).
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION rifei_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent', $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    f"""
+    ALTER TABLE rifas ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', rifei_unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', rifei_unaccent(coalesce(description, ''))), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_rifas_search_vector ON rifas USING gin (search_vector)",
+]
+
+for _statement in _POSTGRES_DDL:
+    event.listen(
+        Rifa.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
+
+search_vector = literal_column("rifas.search_vector")
+
+
+class SearchMatch(NamedTuple):
+    """Condição WHERE e expressão de relevância de uma busca"""
+    condition: object
+    rank: object
+
+
+def _postgres_match(term: str) -> SearchMatch:
+    query = func.websearch_to_tsquery(TS_CONFIG, func.rifei_unaccent(term))
+    return SearchMatch(
+        condition=search_vector.op("@@")(query),
+        rank=func.ts_rank_cd(search_vector, query),
+    )
+
+
+# ===========================================
+# ÍNDICE INVERTIDO (fallback)
+# ===========================================
+
+_TOKEN = re.compile(r"\w+")
+
+_STOPWORDS = frozenset(
+    "a o as os e de da do das dos em no na nos nas um uma uns umas com por "
+    "para pra que se ao aos ou mais".split()
+)
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    """
+    Redução leve de plural em português (sem acentos).
+
+    Aproxima o stemmer do PostgreSQL o bastante para que "celulares"
+    encontre "celular" e "cartões" encontre "cartão".
+    """
+    if len(token) <= 3:
+        return token
+    for suffix, replacement in (("oes", "ao"), ("aes", "ao"), ("ais", "al"),
+                                ("eis", "el"), ("ois", "ol"), ("ns", "m")):
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    if token.endswith("es") and token[-3] in "rsz":
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Termos indexáveis de um texto"""
+    if not text:
+        return []
+    return [
+        stem(token)
+        for token in _TOKEN.findall(normalize(text))
+        if token not in _STOPWORDS
+    ]
+
+
+class SearchIndex:
+    """
+    Índice invertido termo -> {rifa_id: peso} com ranking TF-IDF.
+
+    Montado sob demanda a partir do banco na primeira busca e mantido
+    pelo service de marketplace (create/update/delete de rifas). Usado
+    quando o banco não é PostgreSQL (SQLite em testes/desenvolvimento).
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._documents: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _add(self, rifa_id: int, title: Optional[str], description: Optional[str]) -> None:
+        weights: Dict[str, float] = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+
+        for token, weight in weights.items():
+            self._postings[token][rifa_id] = weight
+        self._documents[rifa_id] = list(weights)
+
+    def _remove(self, rifa_id: int) -> None:
+        for token in self._documents.pop(rifa_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(rifa_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def add(self, rifa_id: int, title: Optional[str], description: Optional[str]) -> None:
+        """Indexa (ou reindexa) uma rifa"""
+        with self._lock:
+            self._remove(rifa_id)
+            self._add(rifa_id, title, description)
+
+    def remove(self, rifa_id: int) -> None:
+        with self._lock:
+            self._remove(rifa_id)
+
+    def rebuild(self, rows: Iterable) -> None:
+        """Recria o índice a partir de linhas (id, title, description)"""
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            for rifa_id, title, description in rows:
+                self._add(rifa_id, title, description)
+            self.built = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self.built = False
+
+    def search(self, text: str) -> Dict[int, float]:
+        """
+        Rifas que contêm todos os termos, com a pontuação de relevância
+
+        Returns:
+            Dicionário rifa_id -> score (vazio se nenhum termo indexável)
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return {}
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            total = len(self._documents)
+
+        # Interseção começando pelo termo mais raro
+        postings.sort(key=len)
+        if not postings[0]:
+            return {}
+
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+            if not matches:
+                return {}
+
+        scores: Dict[int, float] = dict.fromkeys(matches, 0.0)
+        for posting in postings:
+            idf = math.log(1 + total / len(posting))
+            for rifa_id in matches:
+                scores[rifa_id] += posting[rifa_id] * idf
+
+        return scores
+
+
+search_index = SearchIndex()
+
+
+def index_rifa(rifa: Rifa) -> None:
+    """Atualiza o índice em memória após criar/editar uma rifa"""
+    if search_index.built:
+        search_index.add(rifa.id, rifa.title, rifa.description)
+
+
+def unindex_rifa(rifa_id: int) -> None:
+    """Remove uma rifa do índice em memória"""
+    if search_index.built:
+        search_index.remove(rifa_id)
+
+
+async def _fallback_match(db: AsyncSession, term: str) -> SearchMatch:
+    if not search_index.built:
+        result = await db.execute(select(Rifa.id, Rifa.title, Rifa.description))
+        search_index.rebuild(result.all())
+
+    scores = search_index.search(term)
+    if not scores:
+        return SearchMatch(condition=false(), rank=literal_column("0.0"))
+
+    return SearchMatch(
+        condition=Rifa.id.in_(scores),
+        rank=case(scores, value=Rifa.id, else_=0.0),
+    )
+
+
+# ===========================================
+# API DO SERVICE
+# ===========================================
+
+async def match_rifas(db: AsyncSession, term: str) -> SearchMatch:
+    """
+    Condição de busca textual e expressão de relevância para a query de rifas
+
+    No PostgreSQL usa a coluna search_vector (GIN) com stemming em
+    português e sem acentos; nos demais bancos usa o índice em memória.
+
+    Args:
+        db: Sessão do banco de dados
+        term: Texto digitado pelo usuário
+
+    Returns:
+        SearchMatch com condition (WHERE) e rank (maior = mais relevante)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return _postgres_match(term)
+    return await _fallback_match(db, term)
@@ -0,0 +1,139 @@
+"""
+Service de Estatísticas - Rifei
+Snapshot das estatísticas do marketplace, recalculado periodicamente
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import Cache
+from app.config import settings
+from app.models.models import Rifa, Category, User, RifaStatus
+from app.response_cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+# Snapshot compartilhado entre workers (Redis) ou local ao processo
+stats_cache = Cache("stats", maxsize=4)
+_SNAPSHOT_KEY = "marketplace"
+
+
+# ===========================================
+# CÁLCULO
+# ===========================================
+
+async def compute_marketplace_stats(db: AsyncSession) -> dict:
+    """
+    Calcula as estatísticas direto no banco
+
+    Contagens e receita saem de uma única varredura de rifas
+    (COUNT ... FILTER); categorias populares em uma segunda query.
+
+    Returns:
+        Dicionário com estatísticas (sem generated_at/stale_after)
+    """
+    totals = await db.execute(
+        select(
+            func.count(Rifa.id),
+            func.count(Rifa.id).filter(Rifa.status == RifaStatus.ACTIVE),
+            func.count(Rifa.id).filter(Rifa.status == RifaStatus.COMPLETED),
+            func.sum(Rifa.price * Rifa.sold_count),
+            select(func.count()).select_from(User).scalar_subquery(),
+        )
+    )
+    total_rifas, active_rifas, completed_rifas, total_revenue, total_users = totals.one()
+
+    # Categorias populares
+    popular_categories_result = await db.execute(
+        select(
+            Category.name,
+            func.count(Rifa.id).label('count')
+        )
+        .join(Rifa, Category.id == Rifa.category_id)
+        .where(Rifa.status == RifaStatus.ACTIVE)
+        .group_by(Category.name)
+        .order_by(desc('count'))
+        .limit(5)
+    )
+    popular_categories = [
+        {"name": row.name, "count": row.count}
+        for row in popular_categories_result.all()
+    ]
+
+    return {
+        "total_rifas": total_rifas,
+        "active_rifas": active_rifas,
+        "completed_rifas": completed_rifas,
+        "total_users": total_users,
+        "total_revenue": Decimal(total_revenue or 0),
+        "popular_categories": popular_categories,
+    }
+
+
+# ===========================================
+# SNAPSHOT
+# ===========================================
+
+async def refresh_marketplace_stats(db: AsyncSession) -> dict:
+    """
+    Recalcula e grava o snapshot
+
+    O snapshot vale por settings.stats_snapshot_seconds (stale_after) e
+    fica no cache pelo dobro disso, para que leitores não recalculem
+    caso uma execução do worker atrase.
+    """
+    stats = await compute_marketplace_stats(db)
+
+    generated_at = datetime.now(timezone.utc)
+    interval = settings.stats_snapshot_seconds
+    snapshot = {
+        **stats,
+        "total_revenue": str(stats["total_revenue"]),
+        "generated_at": generated_at.isoformat(),
+        "stale_after": (generated_at + timedelta(seconds=interval)).isoformat(),
+    }
+    await stats_cache.set(_SNAPSHOT_KEY, snapshot, ttl=interval * 2)
+    await invalidate_tags("stats")
+
+    return snapshot
+
+
+async def get_marketplace_stats(db: AsyncSession, fresh: bool = False) -> dict:
+    """
+    Estatísticas do marketplace a partir do snapshot
+
+    Args:
+        db: Sessão do banco de dados
+        fresh: Se True, ignora o snapshot e recalcula (e regrava)
+
+    Returns:
+        Dicionário com estatísticas, generated_at e stale_after
+    """
+    if not fresh:
+        snapshot = await stats_cache.get(_SNAPSHOT_KEY)
+        if snapshot is not None:
+            return snapshot
+
+    return await refresh_marketplace_stats(db)
+
+
+async def run_stats_worker(interval: Optional[int] = None) -> None:
+    """Loop de recálculo do snapshot (iniciado no lifespan da aplicação)"""
+    from app.database import async_session
+
+    interval = interval or settings.stats_snapshot_seconds
+
+    while True:
+        try:
+            async with async_session() as db:
+                await refresh_marketplace_stats(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao recalcular estatísticas")
+        await asyncio.sleep(interval)
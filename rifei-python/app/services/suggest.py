@@ -0,0 +1,330 @@
+"""
+Service de Sugestões - Rifei
+Autocomplete da busca a partir de um índice de prefixos em memória
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import Cache
+from app.config import settings
+from app.models.models import Rifa, Category, User, RifaStatus
+from app.services.search import normalize
+
+
+# Tipos de sugestão, na ordem de exibição em caso de empate
+SUGGEST_RIFA = "rifa"
+SUGGEST_CATEGORY = "categoria"
+SUGGEST_CREATOR = "criador"
+
+_KIND_ORDER = {SUGGEST_RIFA: 0, SUGGEST_CATEGORY: 1, SUGGEST_CREATOR: 2}
+
+# Máximo de chaves examinadas por consulta (limita o custo de prefixos curtos)
+_MAX_SCAN = 200
+
+
+class Suggestion(NamedTuple):
+    """Item sugerido no autocomplete"""
+    type: str
+    label: str
+    value: str
+    url: Optional[str] = None
+
+
+# Chave do índice: (texto normalizado, posição da palavra, tipo, identificador)
+_Key = Tuple[str, int, str, str]
+
+
+def _keys_for(label: str, kind: str, ident: str) -> List[_Key]:
+    """
+    Uma chave por palavra do rótulo (a partir dela até o fim), para que
+    "pro" encontre "iPhone 15 Pro" e não só rótulos que começam com "pro".
+    """
+    words = normalize(label).split()
+    return [
+        (" ".join(words[position:]), position, kind, ident)
+        for position in range(len(words))
+    ]
+
+
+class PrefixIndex:
+    """
+    Lista ordenada de chaves normalizadas consultada por bisect.
+
+    Uma consulta é uma busca binária seguida de uma varredura curta
+    (limitada a _MAX_SCAN chaves), sem acesso ao banco.
+    """
+
+    def __init__(self):
+        self._keys: List[_Key] = []
+        self._entries: Dict[Tuple[str, str], Suggestion] = {}
+        self._entry_keys: Dict[Tuple[str, str], List[_Key]] = {}
+        # Rifas ativas -> slug e username do criador
+        # (criadores ficam no índice enquanto tiverem rifas ativas)
+        self._rifa_slugs: Dict[int, str] = {}
+        self._rifa_creators: Dict[int, str] = {}
+        self._creator_refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.built = False
+        # Momento da montagem (time.monotonic) e geração compartilhada lida antes dela
+        self.built_at = 0.0
+        self.generation: Optional[str] = None
+        # Última leitura da geração compartilhada (time.monotonic)
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -------------------------------------------
+    # Escrita (chamar com o lock)
+    # -------------------------------------------
+
+    def _put(self, suggestion: Suggestion, ordered: bool = True) -> None:
+        entry = (suggestion.type, suggestion.value)
+        self._drop(entry)
+
+        keys = _keys_for(suggestion.label, suggestion.type, suggestion.value)
+        for key in keys:
+            if ordered:
+                insort(self._keys, key)
+            else:
+                self._keys.append(key)
+        self._entries[entry] = suggestion
+        self._entry_keys[entry] = keys
+
+    def _drop(self, entry: Tuple[str, str]) -> None:
+        for key in self._entry_keys.pop(entry, ()):
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+        self._entries.pop(entry, None)
+
+    def _put_rifa(
+        self,
+        rifa_id: int,
+        title: str,
+        slug: str,
+        creator: Optional[str],
+        ordered: bool = True
+    ) -> None:
+        self._drop_rifa(rifa_id)
+        self._put(Suggestion(SUGGEST_RIFA, title, slug, f"/rifa/{slug}"), ordered)
+        self._rifa_slugs[rifa_id] = slug
+
+        if creator:
+            self._rifa_creators[rifa_id] = creator
+            self._creator_refs[creator] = self._creator_refs.get(creator, 0) + 1
+            if self._creator_refs[creator] == 1:
+                self._put(Suggestion(SUGGEST_CREATOR, creator, creator), ordered)
+
+    def _drop_rifa(self, rifa_id: int) -> None:
+        slug = self._rifa_slugs.pop(rifa_id, None)
+        if slug is not None:
+            self._drop((SUGGEST_RIFA, slug))
+
+        creator = self._rifa_creators.pop(rifa_id, None)
+        if creator is not None:
+            self._creator_refs[creator] -= 1
+            if not self._creator_refs[creator]:
+                del self._creator_refs[creator]
+                self._drop((SUGGEST_CREATOR, creator))
+
+    # -------------------------------------------
+    # API
+    # -------------------------------------------
+
+    def add_rifa(self, rifa_id: int, title: str, slug: str, creator: Optional[str]) -> None:
+        """Indexa (ou reindexa) uma rifa ativa"""
+        with self._lock:
+            self._put_rifa(rifa_id, title, slug, creator)
+
+    def remove_rifa(self, rifa_id: int) -> None:
+        with self._lock:
+            self._drop_rifa(rifa_id)
+
+    def add_category(self, name: str, slug: str) -> None:
+        with self._lock:
+            self._put(Suggestion(SUGGEST_CATEGORY, name, slug, f"/categoria/{slug}"))
+
+    def remove_category(self, slug: str) -> None:
+        with self._lock:
+            self._drop((SUGGEST_CATEGORY, slug))
+
+    def _reset(self) -> None:
+        self._keys.clear()
+        self._entries.clear()
+        self._entry_keys.clear()
+        self._rifa_slugs.clear()
+        self._rifa_creators.clear()
+        self._creator_refs.clear()
+
+    def rebuild(self, rifas, categories) -> None:
+        """
+        Recria o índice a partir de linhas (id, title, slug, username) e
+        (name, slug), ordenando as chaves uma única vez no final.
+        """
+        with self._lock:
+            self._reset()
+            for rifa_id, title, slug, username in rifas:
+                self._put_rifa(rifa_id, title, slug, username, ordered=False)
+            for name, slug in categories:
+                self._put(
+                    Suggestion(SUGGEST_CATEGORY, name, slug, f"/categoria/{slug}"),
+                    ordered=False,
+                )
+            self._keys.sort()
+            self.built = True
+            self.built_at = self.checked_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.built = False
+
+    def suggest(self, text: str, limit: int = 8) -> List[Suggestion]:
+        """
+        Sugestões cujo rótulo (ou alguma palavra dele) começa com text
+
+        Rótulos que começam com o texto vêm antes de casamentos no meio;
+        depois rifas, categorias e criadores.
+        """
+        prefix = " ".join(normalize(text).split())
+        if not prefix:
+            return []
+
+        with self._lock:
+            keys = self._keys
+            index = bisect_left(keys, (prefix,))
+            found: Dict[Tuple[str, str], int] = {}
+
+            for key in keys[index:index + _MAX_SCAN]:
+                if not key[0].startswith(prefix):
+                    break
+                entry = (key[2], key[3])
+                if entry not in self._entries:
+                    continue
+                if entry not in found or key[1] < found[entry]:
+                    found[entry] = key[1]
+
+            ranked = sorted(
+                found,
+                key=lambda entry: (
+                    found[entry] > 0,
+                    _KIND_ORDER[entry[0]],
+                    len(self._entries[entry].label),
+                    self._entries[entry].label,
+                ),
+            )
+            return [self._entries[entry] for entry in ranked[:limit]]
+
+
+suggest_index = PrefixIndex()
+
+# Geração do índice compartilhada entre workers (Redis se configurado):
+# cada escrita troca o valor e os outros processos remontam o índice
+index_generation = Cache("suggest_index", maxsize=4)
+_GENERATION_KEY = "generation"
+_GENERATION_TTL = 7 * 24 * 3600
+
+
+# ===========================================
+# API DO SERVICE
+# ===========================================
+
+async def build_index(db: AsyncSession) -> None:
+    """Carrega rifas abertas, categorias ativas e criadores no índice"""
+    # Lida antes das consultas: escritas durante a montagem forçam outra
+    generation = await index_generation.get(_GENERATION_KEY)
+
+    rifas = await db.execute(
+        select(Rifa.id, Rifa.title, Rifa.slug, User.username)
+        .join(User, User.id == Rifa.creator_id, isouter=True)
+        .where(
+            Rifa.status == RifaStatus.ACTIVE,
+            Rifa.end_date > datetime.now(timezone.utc),
+            Rifa.sold_count < Rifa.total_numbers,
+        )
+    )
+    categories = await db.execute(
+        select(Category.name, Category.slug).where(Category.is_active.is_(True))
+    )
+
+    suggest_index.rebuild(rifas.all(), categories.all())
+    suggest_index.generation = generation
+
+
+async def mark_changed() -> None:
+    """Nova geração do índice: os demais workers remontam na próxima consulta"""
+    generation = uuid.uuid4().hex
+    await index_generation.set(_GENERATION_KEY, generation, _GENERATION_TTL)
+    # Este processo já aplicou a mudança incrementalmente
+    suggest_index.generation = generation
+
+
+async def _is_current() -> bool:
+    if not suggest_index.built:
+        return False
+    now = time.monotonic()
+    if now - suggest_index.built_at > settings.suggest_index_max_age_seconds:
+        return False
+    # A geração compartilhada (um GET no Redis) é conferida no máximo a
+    # cada suggest_generation_check_seconds, não a cada tecla digitada
+    if now - suggest_index.checked_at < settings.suggest_generation_check_seconds:
+        return True
+    suggest_index.checked_at = now
+    return await index_generation.get(_GENERATION_KEY) == suggest_index.generation
+
+
+async def index_rifa(db: AsyncSession, rifa: Rifa) -> None:
+    """
+    Atualiza o índice após criar/editar uma rifa
+
+    Só rifas ativas e com números disponíveis são sugeridas; as demais
+    saem do índice. Rifas que encerram pelo prazo saem na remontagem
+    periódica (settings.suggest_index_max_age_seconds).
+    """
+    if suggest_index.built:
+        if rifa.status != RifaStatus.ACTIVE or (rifa.sold_count or 0) >= rifa.total_numbers:
+            suggest_index.remove_rifa(rifa.id)
+        else:
+            result = await db.execute(
+                select(User.username).where(User.id == rifa.creator_id)
+            )
+            suggest_index.add_rifa(rifa.id, rifa.title, rifa.slug, result.scalar_one_or_none())
+
+    await mark_changed()
+
+
+async def unindex_rifa(rifa_id: int) -> None:
+    """Remove uma rifa do índice"""
+    if suggest_index.built:
+        suggest_index.remove_rifa(rifa_id)
+    await mark_changed()
+
+
+async def suggest(db: AsyncSession, text: str, limit: int = 8) -> List[Suggestion]:
+    """
+    Sugestões para o texto digitado
+
+    O banco só é lido para (re)montar o índice: na primeira chamada do
+    processo, quando outro worker mudou a geração compartilhada (vista em
+    até settings.suggest_generation_check_seconds) ou quando o índice
+    passa de settings.suggest_index_max_age_seconds.
+
+    Args:
+        db: Sessão do banco de dados
+        text: Prefixo digitado
+        limit: Máximo de sugestões
+
+    Returns:
+        Lista de sugestões
+    """
+    if not await _is_current():
+        await build_index(db)
+    return suggest_index.suggest(text, limit)
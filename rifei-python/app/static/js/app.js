@@ -36,6 +36,37 @@ const Rifei = {
         return 'agora mesmo';
     },
 
+    // Autocomplete da busca (componente Alpine)
+    searchSuggest(initial = '') {
+        return {
+            query: initial,
+            items: [],
+            open: false,
+            async fetchSuggestions() {
+                const q = this.query.trim();
+                if (!q) {
+                    this.items = [];
+                    this.open = false;
+                    return;
+                }
+                const response = await fetch(`/marketplace/api/rifas/suggest?q=${encodeURIComponent(q)}`);
+                if (!response.ok) return;
+                // Descarta respostas atrasadas
+                if (q !== this.query.trim()) return;
+                this.items = await response.json();
+                this.open = this.items.length > 0;
+            },
+            select(item, event) {
+                this.open = false;
+                if (item.url) return;
+                // Sem página própria: usa o valor como termo de busca
+                event.preventDefault();
+                this.query = item.value;
+                this.$nextTick(() => this.$el.closest('form').requestSubmit());
+            }
+        };
+    },
+
     // Toast notifications
     toast(message, type = 'info') {
         const container = document.getElementById('toast-container');
@@ -126,66 +157,84 @@ const Rifei = {
         setInterval(update, 1000);
     },
 
-    // Seletor de números de rifa
-    initNumberSelector(config) {
-        const { 
-            containerId, 
-            totalNumbers, 
-            soldNumbers = [], 
-            pricePerNumber,
-            onSelectionChange 
-        } = config;
-
-        const container = document.getElementById(containerId);
-        if (!container) return;
+    // Grade de números da rifa (componente Alpine, uma janela por vez)
+    // O HTML traz só a primeira janela; as outras vêm da API sob demanda
+    numberGrid(config) {
+        const { rifaId, totalNumbers, windowSize, maxNumbers, price, window: first } = config;
 
-        let selectedNumbers = [];
-
-        const render = () => {
-            container.innerHTML = '';
-            
-            for (let i = 1; i <= totalNumbers; i++) {
-                const button = document.createElement('button');
-                const isSold = soldNumbers.includes(i);
-                const isSelected = selectedNumbers.includes(i);
-
-                button.className = `
-                    rifa-number aspect-square rounded-lg text-sm font-bold transition-all
-                    ${isSold 
-                        ? 'bg-gray-200 dark:bg-gray-800 text-gray-400 cursor-not-allowed opacity-50' 
-                        : isSelected 
-                            ? 'bg-gradient-to-br from-emerald-500 to-violet-500 text-white scale-110 shadow-lg selected'
-                            : 'bg-gray-100 dark:bg-gray-800/50 hover:bg-emerald-500/20'
+        return {
+            totalNumbers,
+            windowSize,
+            maxNumbers,
+            price,
+            selectedNumbers: [],
+            windows: { [first.start]: first.ranges },
+            start: first.start,
+            end: first.end,
+            ranges: first.ranges,
+            loading: false,
+            jumpTo: '',
+            get numbers() {
+                const numbers = [];
+                for (let num = this.start; num <= this.end; num++) numbers.push(num);
+                return numbers;
+            },
+            get hasPrev() {
+                return this.start > 1;
+            },
+            get hasNext() {
+                return this.end < this.totalNumbers;
+            },
+            async loadWindow(num) {
+                num = Math.min(Math.max(num, 1), this.totalNumbers);
+                const start = num - ((num - 1) % this.windowSize);
+                let ranges = this.windows[start];
+                if (!ranges) {
+                    this.loading = true;
+                    try {
+                        const response = await fetch(
+                            `/marketplace/api/rifas/${rifaId}/numbers?start=${start}&limit=${this.windowSize}&encoding=ranges`
+                        );
+                        if (!response.ok) return;
+                        ranges = (await response.json()).ranges || [];
+                        this.windows[start] = ranges;
+                    } finally {
+                        this.loading = false;
                     }
-                `;
-                button.textContent = i;
-                button.disabled = isSold;
-
-                if (!isSold) {
-                    button.addEventListener('click', () => {
-                        if (isSelected) {
-                            selectedNumbers = selectedNumbers.filter(n => n !== i);
-                        } else {
-                            selectedNumbers.push(i);
-                        }
-                        render();
-                        if (onSelectionChange) {
-                            onSelectionChange(selectedNumbers, selectedNumbers.length * pricePerNumber);
-                        }
-                    });
                 }
-
-                container.appendChild(button);
-            }
-        };
-
-        render();
-
-        return {
-            getSelected: () => selectedNumbers,
-            clearSelection: () => {
-                selectedNumbers = [];
-                render();
+                this.start = start;
+                this.end = Math.min(start + this.windowSize - 1, this.totalNumbers);
+                this.ranges = ranges;
+            },
+            goTo() {
+                const num = parseInt(this.jumpTo, 10);
+                if (num) this.loadWindow(num);
+            },
+            toggleNumber(num) {
+                const idx = this.selectedNumbers.indexOf(num);
+                if (idx > -1) {
+                    this.selectedNumbers.splice(idx, 1);
+                } else if (this.selectedNumbers.length < this.maxNumbers) {
+                    this.selectedNumbers.push(num);
+                }
+            },
+            isSelected(num) {
+                return this.selectedNumbers.includes(num);
+            },
+            // Busca binária nas faixas disponíveis da janela atual
+            isAvailable(num) {
+                let lo = 0, hi = this.ranges.length - 1;
+                while (lo <= hi) {
+                    const mid = (lo + hi) >> 1;
+                    const [firstNum, lastNum] = this.ranges[mid];
+                    if (num < firstNum) hi = mid - 1;
+                    else if (num > lastNum) lo = mid + 1;
+                    else return true;
+                }
+                return false;
+            },
+            get total() {
+                return (this.selectedNumbers.length * this.price).toFixed(2);
             }
         };
     }
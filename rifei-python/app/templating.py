@@ -0,0 +1,181 @@
+"""
+Templates - Rifei
+Ambiente Jinja2 compartilhado, cache de página inteira para páginas
+estáticas de visitantes e respostas em streaming para páginas pesadas
+
+Os ambientes são montados no primeiro uso e podem ler o bytecode dos
+templates pré-compilado no deploy (settings.template_bytecode_dir):
+    python -m app.templating [diretório]
+"""
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from app.cache import LocalCache
+from app.config import settings
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# HTML renderizado é local ao processo: vale para a versão dos
+# templates carregada neste worker
+page_cache = LocalCache(maxsize=64)
+
+
+# ===========================================
+# STREAMING
+# ===========================================
+
+# Marca de envio imediato (comentário HTML, inofensivo se escapar)
+FLUSH_MARKER = "<!-- flush -->"
+
+# Acumula a saída do template até este tamanho antes de enviar
+STREAM_CHUNK_SIZE = 16384
+
+
+# ===========================================
+# AMBIENTES (CRIADOS SOB DEMANDA)
+# ===========================================
+
+def _create_templates(enable_async: bool, bytecode_dir: Optional[str] = None) -> "Jinja2Templates":
+    # jinja2 (e as extensões) só é importado no primeiro render: rotas de
+    # API numa função serverless fria não pagam por ele
+    from app.jinja_env import create_templates
+
+    return create_templates(enable_async, bytecode_dir)
+
+
+class LazyTemplates:
+    """Jinja2Templates montado no primeiro acesso (não no import)"""
+
+    def __init__(self, enable_async: bool = False):
+        self._enable_async = enable_async
+        self._templates: Optional["Jinja2Templates"] = None
+
+    def __getattr__(self, name: str):
+        if self._templates is None:
+            self._templates = _create_templates(self._enable_async)
+        return getattr(self._templates, name)
+
+
+templates = LazyTemplates()
+
+# Mesmo diretório com enable_async, para generate_async
+streaming_templates = LazyTemplates(enable_async=True)
+
+
+def compile_templates(directory: Optional[str] = None) -> int:
+    """
+    Pré-compila todos os templates no cache de bytecode (passo de build)
+
+    Args:
+        directory: Destino, relativo a app/ (padrão: settings.template_bytecode_dir)
+
+    Returns:
+        Quantidade de templates compilados por ambiente
+    """
+    directory = directory or settings.template_bytecode_dir or ".jinja_cache"
+    names = []
+    for enable_async in (False, True):
+        env = _create_templates(enable_async, directory).env
+        names = env.list_templates(extensions=["html"])
+        for name in names:
+            env.get_template(name)
+    return len(names)
+
+
+async def _stream_chunks(generator):
+    buffer = []
+    size = 0
+    async for chunk in generator:
+        if chunk == FLUSH_MARKER:
+            if buffer:
+                yield "".join(buffer)
+                buffer, size = [], 0
+            continue
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_template(
+    request: Request,
+    name: str,
+    context: dict,
+    deferred: Optional[Awaitable[dict]] = None,
+    db: Optional[AsyncSession] = None,
+) -> StreamingResponse:
+    """
+    Renderiza um template em streaming (generate_async)
+
+    O shell da página sai assim que o {% flush %} do layout é atingido;
+    só então `deferred` (ex.: as consultas da listagem) é aguardado e
+    seus valores entram no contexto antes do {% block content %}. A
+    saída vai em pedaços de até STREAM_CHUNK_SIZE, sem montar a página
+    inteira em memória.
+
+    O get_db encerra a sessão antes do corpo da resposta ser enviado:
+    `deferred` roda depois disso, na mesma sessão (reaberta sob
+    demanda), que é fechada de novo quando o streaming termina.
+
+    Uso:
+        return stream_template(request, "pages/marketplace.html",
+                               {"user": user}, deferred=load(), db=db)
+    """
+    values = {"request": request, **context}
+    if deferred is not None:
+        values["_deferred"] = deferred
+
+    template = streaming_templates.get_template(name)
+    return StreamingResponse(
+        _stream_chunks(template.generate_async(values)),
+        media_type="text/html",
+        background=BackgroundTask(db.close) if db is not None else None,
+    )
+
+
+# ===========================================
+# CACHE DE PÁGINA INTEIRA
+# ===========================================
+
+def render_static_page(request: Request, name: str, context: dict) -> HTMLResponse:
+    """
+    Renderiza uma página que só depende de haver usuário logado
+
+    Para visitantes o HTML é renderizado uma vez e servido pronto por
+    settings.static_page_cache_seconds; com usuário a página é
+    renderizada normalmente (header e sidebar mostram os dados dele).
+    """
+    user: Optional[Any] = context.get("user")
+    if user is not None or not settings.template_cache_enabled:
+        return templates.TemplateResponse(name, {"request": request, **context})
+
+    body = page_cache.get(name)
+    if body is None:
+        body = templates.get_template(name).render({"request": request, **context})
+        page_cache.set(name, body, settings.static_page_cache_seconds)
+    return HTMLResponse(body)
+
+
+def clear_template_caches() -> None:
+    page_cache.clear()
+
+
+if __name__ == "__main__":
+    # app.jinja_env importa app.templating: compila a partir do módulo
+    # importado, não de __main__ (seriam duas cópias de BASE_DIR etc.)
+    from app.templating import compile_templates
+
+    total = compile_templates(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"✅ {total} templates pré-compilados")
@@ -0,0 +1,121 @@
+"""
+Benchmark - Cold start: do import até a primeira resposta
+
+Cada medição roda num processo novo (como uma função serverless fria):
+importa app.main, executa o startup do lifespan e serve a primeira
+resposta, comparando o startup completo (versão do schema, aquecimento e
+workers) com FAST_START (sem tocar no banco) e com o bytecode dos
+templates pré-compilado.
+
+O cenário "fast (eager)" importa antes jinja2 e os dialetos do
+SQLAlchemy, como fazia o app antes de adiá-los para o primeiro uso: a
+diferença para "fast_start" é o que o import sob demanda economiza. Numa
+rota de API (/health) o jinja2 nunca chega a ser carregado; numa página
+(/termos) ele é carregado na primeira resposta.
+
+Uso (a partir de rifei-python/):
+    python -m benchmarks.bench_cold_start [--runs 10] [--path /health --path /termos]
+        [--url sqlite+aiosqlite:///...]
+
+Sem --url usa um SQLite temporário, migrado antes das medições.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Executado no processo filho; imprime os tempos em JSON
+CHILD = """
+import asyncio, json, os, sys, time
+from httpx import ASGITransport, AsyncClient
+started = time.perf_counter()
+if os.environ.get("BENCH_EAGER_IMPORTS"):
+    import fastapi.templating, jinja2, sqlalchemy.dialects.postgresql, sqlalchemy.dialects.sqlite
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(sys.argv[1])
+        assert response.status_code == 200, response.status_code
+        done = time.perf_counter()
+    print(json.dumps({
+        "import": imported - started,
+        "startup": ready - imported,
+        "first_response": done - ready,
+        "total": done - started,
+    }))
+
+asyncio.run(main())
+"""
+
+SCENARIOS = {
+    "completo": {"FAST_START": "false"},
+    "fast (eager)": {"FAST_START": "true", "DB_PROFILE": "serverless", "BENCH_EAGER_IMPORTS": "1"},
+    "fast_start": {"FAST_START": "true", "DB_PROFILE": "serverless"},
+    "fast+bytecode": {"FAST_START": "true", "DB_PROFILE": "serverless", "TEMPLATE_BYTECODE_DIR": "{bytecode}"},
+}
+
+
+def measure(env: dict, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if output.returncode:
+        raise RuntimeError(output.stderr)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int, paths: list, url: str) -> None:
+    workdir = Path(tempfile.mkdtemp(prefix="rifei-cold-"))
+    bytecode = workdir / "bytecode"
+    url = url or f"sqlite+aiosqlite:///{workdir / 'rifei.db'}"
+    base_env = {**os.environ, "DATABASE_URL": url, "APP_ENV": "production"}
+
+    try:
+        # Migrações aplicadas antes, como no deploy
+        measure({**base_env, "FAST_START": "false", "DB_MIGRATE_ON_STARTUP": "true"}, paths[0])
+        subprocess.run(
+            [sys.executable, "-m", "app.templating", str(bytecode)],
+            cwd=ROOT, env=base_env, capture_output=True, check=True,
+        )
+
+        for path in paths:
+            print(f"{runs} processos frios por cenário, GET {path}\n")
+            envs = {
+                label: {**base_env, **{k: v.format(bytecode=bytecode) for k, v in overrides.items()}}
+                for label, overrides in SCENARIOS.items()
+            }
+            # Cenários intercalados: ruído da máquina afeta todos por igual
+            samples = {label: [] for label in envs}
+            for _ in range(runs):
+                for label, env in envs.items():
+                    samples[label].append(measure(env, path))
+            for label, values in samples.items():
+                median = {key: statistics.median(s[key] for s in values) * 1000 for key in values[0]}
+                print(
+                    f"{label:<14} import={median['import']:7.1f} ms  startup={median['startup']:7.1f} ms  "
+                    f"1ª resposta={median['first_response']:7.1f} ms  total={median['total']:7.1f} ms"
+                )
+            print()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    main(args.runs, args.paths or ["/health", "/termos"], args.url)
@@ -0,0 +1,76 @@
+"""
+Benchmark - Saturação do pool de conexões por perfil de engine
+
+Dispara N "requisições" simultâneas que pegam uma conexão, executam uma
+consulta e a seguram por --hold-ms (simulando o trabalho da rota),
+medindo a espera pelo checkout, a vazão e quantas estouram pool_timeout.
+
+Uso (a partir de rifei-python/):
+    python -m benchmarks.bench_db_pool [--requests 200] [--hold-ms 20]
+        [--profiles web,worker,serverless] [--url postgresql+asyncpg://...]
+
+Sem --url usa settings.database_url. Os perfis só mudam o pool no
+Postgres (no SQLite o dialeto escolhe o pool), então rode contra ele.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import engine_options
+
+
+async def request(engine, hold: float, waits: list) -> bool:
+    started = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            waits.append(time.perf_counter() - started)
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(hold)
+    except PoolTimeoutError:
+        return False
+    return True
+
+
+async def run(profile: str, url: str, requests: int, hold: float) -> None:
+    config = settings.model_copy(update={"database_url": url})
+    options = engine_options(config, profile)
+    engine = create_async_engine(url, **options)
+
+    # Conexões já abertas, como num worker aquecido
+    await asyncio.gather(*(request(engine, 0, []) for _ in range(options.get("pool_size", 1))))
+
+    waits: list = []
+    started = time.perf_counter()
+    results = await asyncio.gather(*(request(engine, hold, waits) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    waits_ms = sorted(wait * 1000 for wait in waits) or [0.0]
+    p99 = waits_ms[min(len(waits_ms) - 1, int(len(waits_ms) * 0.99))]
+    print(
+        f"{profile:<11} pool={options.get('pool_size', '-')!s:>2}+{options.get('max_overflow', '-')!s:<2} "
+        f"req/s={requests / elapsed:8.1f}  espera p50={statistics.median(waits_ms):7.1f} ms  "
+        f"p99={p99:7.1f} ms  timeouts={results.count(False)}"
+    )
+
+
+async def main(url: str, profiles: list, requests: int, hold_ms: int) -> None:
+    print(f"{requests} requisições simultâneas, conexão presa por {hold_ms} ms\n")
+    for profile in profiles:
+        await run(profile, url, requests, hold_ms / 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--profiles", default="web,worker,serverless")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--hold-ms", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.profiles.split(","), args.requests, args.hold_ms))
@@ -0,0 +1,76 @@
+"""
+Benchmark - Latência do event loop durante logins simultâneos
+
+Compara bcrypt executado direto no event loop (como era) com o pool
+de services.passwords, medindo o atraso de um "ticker" que acorda a
+cada 10 ms enquanto 50 verificações de senha acontecem.
+
+Uso (a partir de rifei-python/):
+    python -m benchmarks.bench_password_hashing [--logins 50] [--workers 4]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.auth import hash_password, verify_password
+from app.services.passwords import PasswordHasher
+
+TICK = 0.010
+
+
+async def ticker(lags: list, stop: asyncio.Event) -> None:
+    """Registra o atraso de cada acordar em relação ao esperado"""
+    while not stop.is_set():
+        expected = time.monotonic() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, time.monotonic() - expected))
+
+
+async def run(label: str, login, logins: int) -> None:
+    lags: list = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(TICK * 3)
+
+    started = time.monotonic()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    await tick_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{label:<10} total={elapsed * 1000:8.1f} ms  "
+        f"lag p50={statistics.median(lags_ms):7.1f} ms  "
+        f"p99={p99:7.1f} ms  max={lags_ms[-1]:7.1f} ms  "
+        f"ticks={len(lags_ms)}"
+    )
+
+
+async def main(logins: int, workers: int) -> None:
+    hashed = hash_password("benchmark-password")
+
+    async def inline_login():
+        verify_password("benchmark-password", hashed)
+
+    hasher = PasswordHasher(workers=workers, max_queue=logins)
+
+    async def pooled_login():
+        await hasher.run(verify_password, "benchmark-password", hashed)
+
+    print(f"{logins} logins simultâneos, pool com {workers} workers\n")
+    await run("inline", inline_login, logins)
+    await run("pool", pooled_login, logins)
+    print("\nmétricas do pool:", hasher.metrics())
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers))
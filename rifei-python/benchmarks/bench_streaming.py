@@ -0,0 +1,116 @@
+"""
+Benchmark - Time-to-first-byte e memória da listagem em streaming
+
+Renderiza pages/marketplace.html com uma listagem grande e uma latência
+simulada de banco, comparando o render completo (como o TemplateResponse
+faz) com stream_template: tempo até o primeiro byte, tempo total e pico
+de memória (tracemalloc). O render assíncrono do Jinja custa mais CPU
+no total; o ganho está no primeiro byte e na memória por requisição.
+
+Uso (a partir de rifei-python/):
+    python -m benchmarks.bench_streaming [--rifas 2000] [--db-ms 50]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.main import MOCK_CATEGORIES
+from app.schemas.marketplace import RifaFilters
+from app.templating import _stream_chunks, streaming_templates, templates
+
+TEMPLATE = "pages/marketplace.html"
+
+
+def fake_rifas(count: int) -> list:
+    category = SimpleNamespace(id=1, name="Eletrônicos", icon="📱")
+    creator = SimpleNamespace(name="Criador", is_verified=True)
+    return [
+        SimpleNamespace(
+            title=f"Rifa {i}",
+            slug=f"rifa-{i}",
+            image_url=None,
+            price=Decimal("10.00"),
+            total_numbers=1000,
+            sold_count=i % 1000,
+            progress_percent=(i % 1000) / 10,
+            is_featured=i % 7 == 0,
+            is_verified=True,
+            category=category,
+            creator=creator,
+        )
+        for i in range(count)
+    ]
+
+
+async def load_page(rifas: list, db_ms: int) -> dict:
+    await asyncio.sleep(db_ms / 1000)
+    return {
+        "rifas": rifas,
+        "categories": MOCK_CATEGORIES,
+        "pagination": {
+            "total": len(rifas), "page": 1, "per_page": len(rifas),
+            "total_pages": 1, "has_prev": False, "has_next": False,
+        },
+    }
+
+
+async def full_render(context: dict, rifas: list, db_ms: int):
+    """Consultas e render inteiro antes do primeiro byte"""
+    started = time.perf_counter()
+    values = {**context, **await load_page(rifas, db_ms)}
+    body = templates.get_template(TEMPLATE).render(values)
+    first_byte = time.perf_counter() - started
+    return first_byte, time.perf_counter() - started, len(body.encode())
+
+
+async def streamed(context: dict, rifas: list, db_ms: int):
+    """Mesmo caminho de stream_template, sem a StreamingResponse"""
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    values = {**context, "_deferred": load_page(rifas, db_ms)}
+    generator = streaming_templates.get_template(TEMPLATE).generate_async(values)
+    async for chunk in _stream_chunks(generator):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk.encode())
+    return first_byte, time.perf_counter() - started, size
+
+
+async def measure(label: str, render, *args) -> None:
+    # Tempos sem tracemalloc (que deixa cada alocação bem mais lenta)
+    first_byte, total, size = await render(*args)
+
+    tracemalloc.start()
+    await render(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<10} ttfb={first_byte * 1000:8.1f} ms  total={total * 1000:8.1f} ms  "
+        f"pico={peak / 1024:9.1f} KB  html={size / 1024:8.1f} KB"
+    )
+
+
+async def main(count: int, db_ms: int) -> None:
+    rifas = fake_rifas(count)
+    context = {"request": None, "user": None, "filters": RifaFilters()}
+
+    # Aquece o carregamento e a compilação dos templates
+    await full_render(context, rifas[:1], 0)
+    await streamed(context, rifas[:1], 0)
+
+    print(f"{count} rifas na listagem, banco simulado com {db_ms} ms\n")
+    await measure("completo", full_render, context, rifas, db_ms)
+    await measure("streaming", streamed, context, rifas, db_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rifas", type=int, default=2000)
+    parser.add_argument("--db-ms", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rifas, args.db_ms))
@@ -0,0 +1,72 @@
+"""
+Benchmark - Tempo de renderização com cache de templates
+
+Renderiza páginas estáticas (termos, privacidade, como-funciona) para
+visitantes sem cache e servindo a página pronta do cache de página.
+
+Uso (a partir de rifei-python/):
+    python -m benchmarks.bench_template_cache [--renders 2000]
+"""
+import argparse
+import statistics
+import time
+
+from app.config import settings
+from app.main import MOCK_CATEGORIES
+from app.templating import clear_template_caches, page_cache, templates
+
+PAGES = ("pages/termos.html", "pages/privacidade.html", "pages/como-funciona.html")
+
+
+def measure(render, renders: int) -> list:
+    timings = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def report(label: str, timings: list) -> float:
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    median = statistics.median(timings)
+    print(f"  {label:<12} p50={median:8.1f} µs  p99={p99:8.1f} µs")
+    return median
+
+
+def render_page(name: str, context: dict):
+    """Mesmo caminho de render_static_page, sem o Request"""
+    def render():
+        if settings.template_cache_enabled:
+            body = page_cache.get(name)
+            if body is None:
+                body = templates.get_template(name).render(context)
+                page_cache.set(name, body, settings.static_page_cache_seconds)
+            return body
+        return templates.get_template(name).render(context)
+    return render
+
+
+def main(renders: int) -> None:
+    context = {"request": None, "user": None, "categories": MOCK_CATEGORIES}
+
+    print(f"{renders} renderizações por cenário (visitante)\n")
+    for name in PAGES:
+        print(name)
+        render = render_page(name, context)
+
+        settings.template_cache_enabled = False
+        baseline = report("sem cache", measure(render, renders))
+
+        settings.template_cache_enabled = True
+        clear_template_caches()
+        cached = report("página", measure(render, renders))
+        print(f"  redução: {(1 - cached / baseline) * 100:5.1f}%\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.renders)
@@ -15,7 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.config import Settings, get_settings
-from app.database import Base, get_db
+from app.database import Base, commit, get_db, get_read_db
 from app.main import app
 from app.models.models import User, Category, Rifa, UserRole, RifaStatus
 from app.services.auth import hash_password
@@ -117,9 +117,16 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """
     # Override da dependency de DB
     async def override_get_db():
+        # Como get_db: um commit ao fim da requisição (sem o rollback em
+        # caso de erro, que expiraria os objetos das fixtures)
+        yield db_session
+        await commit(db_session)
+
+    async def override_get_read_db():
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
 
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
@@ -127,6 +134,92 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def query_counter(db_engine) -> Generator:
+    """
+    Lista dos statements SQL executados durante o teste.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db_engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def round_trips(db_engine) -> Generator:
+    """
+    Idas ao banco durante o teste: statements SQL e BEGIN/COMMIT/ROLLBACK.
+    """
+    calls = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        calls.append(statement)
+
+    listeners = [
+        ("before_cursor_execute", record),
+        ("begin", lambda conn: calls.append("BEGIN")),
+        ("commit", lambda conn: calls.append("COMMIT")),
+        ("rollback", lambda conn: calls.append("ROLLBACK")),
+    ]
+    for name, listener in listeners:
+        event.listen(db_engine.sync_engine, name, listener)
+    yield calls
+    for name, listener in listeners:
+        event.remove(db_engine.sync_engine, name, listener)
+
+
+@pytest.fixture(autouse=True)
+def reset_in_memory_state():
+    """Limpa estado em memória da aplicação entre testes"""
+    from app.services.counters import view_counter
+    from app.services.marketplace import _count_cache, category_cache
+    from app.services.search import search_index
+    from app.services.suggest import index_generation, suggest_index
+    from app.services.stats import stats_cache
+    from app.services.principals import principal_cache, token_versions
+    from app.services.refresh_tokens import revoked_families
+    from app.ratelimit import local_limiter
+    from app.services.availability import user_filters
+    from app.response_cache import response_store, tag_versions
+    from app.templating import clear_template_caches
+
+    view_counter.clear()
+    _count_cache.clear()
+    search_index.clear()
+    suggest_index.clear()
+    index_generation.clear_local()
+    category_cache.clear_local()
+    stats_cache.clear_local()
+    principal_cache.clear()
+    token_versions.clear()
+    revoked_families.clear_local()
+    local_limiter.clear()
+    user_filters.clear()
+    response_store.clear_local()
+    tag_versions.clear_local()
+    clear_template_caches()
+    yield
+    view_counter.clear()
+    _count_cache.clear()
+    search_index.clear()
+    suggest_index.clear()
+    index_generation.clear_local()
+    category_cache.clear_local()
+    stats_cache.clear_local()
+    principal_cache.clear()
+    token_versions.clear()
+    revoked_families.clear_local()
+    local_limiter.clear()
+    user_filters.clear()
+    response_store.clear_local()
+    tag_versions.clear_local()
+    clear_template_caches()
+
+
 # ===========================================
 # FIXTURES DE DADOS
 # ===========================================
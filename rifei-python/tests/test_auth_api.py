@@ -7,6 +7,7 @@ from httpx import AsyncClient
 from fastapi import status
 
 from app.models.models import User
+from app.services.auth import verify_token
 
 
 # ===========================================
@@ -160,6 +161,21 @@ class TestLoginAPI:
         # Verificar cookie
         assert "session_token" in response.cookies
 
+    async def test_login_when_hasher_is_busy(self, client: AsyncClient, test_user: User, monkeypatch):
+        """Testa 503 com Retry-After quando o pool de hashing está cheio"""
+        from app.services.passwords import password_hasher
+
+        monkeypatch.setattr(password_hasher, "workers", 0)
+        monkeypatch.setattr(password_hasher, "max_queue", 0)
+
+        response = await client.post(
+            "/api/auth/login",
+            json={"email": test_user.email, "password": "password123"},
+        )
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "1"
+
     async def test_login_with_remember_me(self, client: AsyncClient, test_user: User):
         """Testa login com 'lembrar-me' ativado"""
         login_data = {
@@ -176,6 +192,11 @@ class TestLoginAPI:
         data = response.json()
         assert data["token"]["expires_in"] > 86400  # Mais de 1 dia
 
+        # Mesmas claims do token normal (versão para revogação, exibição)
+        claims = verify_token(data["token"]["access_token"])
+        assert claims["ver"] == test_user.token_version
+        assert {"name", "level", "xp"} <= set(claims)
+
     async def test_login_wrong_password(self, client: AsyncClient, test_user: User):
         """Testa login com senha incorreta"""
         login_data = {
@@ -2,6 +2,9 @@
 Testes unitários para o serviço de autenticação - Rifei
 Testa funções de hash, JWT, e operações de usuário
 """
+import asyncio
+import time
+
 import pytest
 from datetime import datetime, timedelta, timezone
 from jose import jwt
@@ -9,6 +12,8 @@ from jose import jwt
 from app.services.auth import (
     hash_password,
     verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     decode_token,
@@ -26,6 +31,7 @@ from app.services.auth import (
 from app.config import settings
 from app.schemas.auth import UserCreate
 from app.models.models import User
+from app.services.passwords import PasswordHasher, PasswordHasherBusyError
 
 
 # ===========================================
@@ -79,6 +85,51 @@ class TestPasswordHashing:
         assert verify_password("CASESENSITIVE", hashed) is False
 
 
+@pytest.mark.unit
+@pytest.mark.auth
+@pytest.mark.asyncio
+class TestPasswordHasherPool:
+    """Testes para o pool de hashing (PasswordHasher)"""
+
+    async def test_async_hash_and_verify(self):
+        """Testa hash e verificação pelo pool"""
+        hashed = await hash_password_async("senha123")
+
+        assert await verify_password_async("senha123", hashed) is True
+        assert await verify_password_async("outra", hashed) is False
+
+    async def test_rejects_when_queue_is_full(self):
+        """Testa backpressure com fila cheia"""
+        hasher = PasswordHasher(workers=1, max_queue=1)
+
+        tasks = [asyncio.create_task(hasher.run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher.run(time.sleep, 0)
+
+        await asyncio.gather(*tasks)
+        metrics = hasher.metrics()
+        assert metrics["completed"] == 2
+        assert metrics["rejected"] == 1
+        assert metrics["max_pending"] == 2
+        assert metrics["queue_depth"] == 0
+        assert metrics["avg_wait_ms"] > 0
+        hasher.shutdown()
+
+    async def test_event_loop_stays_responsive(self):
+        """Testa que o loop continua atendendo durante o hash"""
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        task = asyncio.create_task(hasher.run(time.sleep, 0.3))
+
+        started = time.monotonic()
+        await asyncio.sleep(0.01)
+
+        assert time.monotonic() - started < 0.2
+        await task
+        hasher.shutdown()
+
+
 # ===========================================
 # TESTES DE JWT
 # ===========================================
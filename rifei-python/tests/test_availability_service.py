@@ -0,0 +1,139 @@
+"""
+Testes para a disponibilidade de email/username - Rifei
+Testa o filtro de Bloom e as verificações usadas no cadastro
+"""
+import pytest
+from fastapi import status
+
+from app.config import settings
+from app.models.models import User
+from app.schemas.auth import UserCreate
+from app.services.auth import create_user, hash_password
+from app.services.availability import (
+    BloomFilter,
+    user_filters,
+    warm_up,
+    email_taken,
+    username_taken,
+)
+
+
+# ===========================================
+# TESTES DO FILTRO DE BLOOM
+# ===========================================
+
+@pytest.mark.unit
+class TestBloomFilter:
+    """Testes para BloomFilter"""
+
+    def test_no_false_negatives(self):
+        """Testa que todo item adicionado é encontrado"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"user{i}@test.com" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+        assert len(bloom) == 1000
+
+    def test_false_positive_rate(self):
+        """Testa que a taxa de falsos positivos fica perto da configurada"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"user{i}@test.com")
+
+        false_positives = sum(f"outro{i}@test.com" in bloom for i in range(5000))
+
+        assert false_positives / 5000 < 0.03
+
+    def test_sizing(self):
+        """Testa o dimensionamento (bits e funções de hash)"""
+        bloom = BloomFilter(capacity=100000, error_rate=0.01)
+
+        assert bloom.hashes == 7
+        assert 900_000 < bloom.size < 1_000_000
+
+
+# ===========================================
+# TESTES DAS VERIFICAÇÕES
+# ===========================================
+
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestAvailabilityChecks:
+    """Testes de email_taken/username_taken"""
+
+    async def test_existing_user(self, db_session, test_user):
+        """Testa que cadastrados são confirmados no banco"""
+        assert await email_taken(db_session, test_user.email.upper()) is True
+        assert await username_taken(db_session, test_user.username) is True
+
+    async def test_available_skips_database(self, db_session, test_user, query_counter):
+        """Testa que um email livre responde sem SELECT depois do warm-up"""
+        await warm_up(db_session)
+        queries = len(query_counter)
+
+        assert await email_taken(db_session, "livre@test.com") is False
+        assert await username_taken(db_session, "livre") is False
+        assert len(query_counter) == queries
+
+    async def test_create_user_updates_filter(self, db_session):
+        """Testa que create_user registra o usuário nos filtros"""
+        await warm_up(db_session)
+
+        await create_user(db_session, UserCreate(
+            email="nova@test.com",
+            username="novauser",
+            name="Nova",
+            password="senha123",
+        ))
+
+        assert await email_taken(db_session, "nova@test.com") is True
+        assert await username_taken(db_session, "novauser") is True
+
+    async def test_sync_picks_up_other_workers(self, db_session, monkeypatch):
+        """Testa que usuários inseridos por fora entram na sincronização"""
+        await warm_up(db_session)
+        db_session.add(User(
+            email="outro@test.com",
+            username="outro",
+            name="Outro",
+            password_hash=hash_password("senha123"),
+        ))
+        await db_session.commit()
+
+        monkeypatch.setattr(settings, "user_filter_sync_seconds", 0)
+
+        assert await email_taken(db_session, "outro@test.com") is True
+        assert user_filters.last_id > 0
+
+
+@pytest.mark.api
+@pytest.mark.auth
+@pytest.mark.asyncio
+class TestAvailabilityEndpoints:
+    """Testes de /api/auth/check-email e /api/auth/check-username"""
+
+    async def test_check_email(self, client, test_user):
+        """Testa email cadastrado e livre"""
+        taken = await client.post("/api/auth/check-email", params={"email": test_user.email})
+        free = await client.post("/api/auth/check-email", params={"email": "livre@test.com"})
+
+        assert taken.status_code == status.HTTP_200_OK
+        assert taken.json() == {"exists": True}
+        assert free.json() == {"exists": False}
+
+    async def test_check_username_after_register(self, client):
+        """Testa que o username fica indisponível logo após o cadastro"""
+        await client.post("/api/auth/check-username", params={"username": "recente"})
+
+        response = await client.post("/api/auth/register", json={
+            "email": "recente@test.com",
+            "username": "recente",
+            "name": "Recente",
+            "password": "senha123",
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = await client.post("/api/auth/check-username", params={"username": "recente"})
+        assert response.json() == {"exists": True}
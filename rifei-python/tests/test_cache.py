@@ -0,0 +1,120 @@
+"""
+Testes para o cache da aplicação - Rifei
+Testa o LRU local e o cache de categorias
+"""
+import time
+
+import pytest
+from sqlalchemy import update
+
+from app.cache import Cache, LocalCache
+from app.models.models import Category
+from app.services.marketplace import (
+    list_categories,
+    get_category_by_slug,
+    get_category_by_id,
+    invalidate_categories,
+)
+
+
+# ===========================================
+# TESTES DO CACHE LOCAL
+# ===========================================
+
+@pytest.mark.unit
+class TestLocalCache:
+    """Testes para LocalCache"""
+
+    def test_get_and_set(self):
+        """Testa leitura e escrita"""
+        cache = LocalCache()
+        cache.set("a", [1, 2], ttl=60)
+
+        assert cache.get("a") == [1, 2]
+        assert cache.get("b") is None
+
+    def test_expires(self, monkeypatch):
+        """Testa expiração por TTL"""
+        cache = LocalCache()
+        cache.set("a", 1, ttl=10)
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """Testa descarte do item menos usado"""
+        cache = LocalCache(maxsize=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCache:
+    """Testes para Cache sem Redis configurado"""
+
+    async def test_falls_back_to_local(self):
+        """Testa uso do LRU local quando não há Redis"""
+        cache = Cache("test")
+        await cache.set("key", {"a": 1}, ttl=60)
+
+        assert await cache.get("key") == {"a": 1}
+        assert cache.local.get("key") == {"a": 1}
+
+        await cache.delete("key")
+        assert await cache.get("key") is None
+
+
+# ===========================================
+# TESTES DO CACHE DE CATEGORIAS
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestCategoryCache:
+    """Testes para list_categories/get_category_* com cache"""
+
+    async def test_served_from_cache(self, db_session, test_category):
+        """Testa que alterações fora do ORM só aparecem após invalidar"""
+        categories = await list_categories(db_session)
+        assert [c.slug for c in categories] == [test_category.slug]
+
+        await db_session.execute(
+            update(Category.__table__)
+            .where(Category.__table__.c.id == test_category.id)
+            .values(name="Renomeada")
+        )
+        await db_session.commit()
+
+        assert (await get_category_by_slug(db_session, test_category.slug)).name == test_category.name
+
+        await invalidate_categories(db_session)
+        assert (await get_category_by_id(db_session, test_category.id)).name == "Renomeada"
+
+    async def test_orm_changes_invalidate(self, db_session, test_category):
+        """Testa invalidação automática no commit de alterações pelo ORM"""
+        await list_categories(db_session)
+
+        db_session.add(Category(name="Veículos", slug="veiculos", icon="🚗"))
+        await db_session.commit()
+
+        slugs = [c.slug for c in await list_categories(db_session)]
+        assert "veiculos" in slugs
+
+    async def test_active_only(self, db_session, test_category):
+        """Testa filtro de categorias inativas"""
+        test_category.is_active = False
+        await db_session.commit()
+
+        assert await list_categories(db_session) == []
+        assert len(await list_categories(db_session, active_only=False)) == 1
@@ -0,0 +1,235 @@
+"""
+Testes para o serviço de contadores - Rifei
+Testa contadores em memória, descarga em lote e reconciliação
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.database
+from app.config import settings
+from app.models.models import Rifa, Ticket
+from app.services import counters
+from app.services.counters import (
+    ShardedCounter,
+    VIEW_COUNTS_KEY,
+    view_counter,
+    get_view_count,
+    flush_view_counts,
+    reconcile_sold_counts,
+)
+from app.services.marketplace import get_rifa_by_id
+
+
+class FakePipeline:
+    """Pipeline mínimo: enfileira comandos e executa em ordem"""
+
+    def __init__(self, client: "FakeRedis"):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    """Subconjunto de comandos de hash do Redis usados pelos contadores"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field] = values.get(field, 0) + amount
+        return values[field]
+
+    async def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    async def delete(self, *keys):
+        return sum(self.hashes.pop(key, None) is not None for key in keys)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+async def stored_counts(db_session, rifa_id: int):
+    result = await db_session.execute(
+        select(Rifa.view_count, Rifa.sold_count).where(Rifa.id == rifa_id)
+    )
+    return result.one()
+
+
+# ===========================================
+# TESTES DO CONTADOR EM MEMÓRIA
+# ===========================================
+
+@pytest.mark.unit
+class TestShardedCounter:
+    """Testes para ShardedCounter"""
+
+    def test_increment_and_pending(self):
+        """Testa incremento e leitura do pendente"""
+        counter = ShardedCounter(shards=4)
+        counter.increment(1)
+        counter.increment(1, 4)
+        counter.increment(2)
+
+        assert counter.pending(1) == 5
+        assert counter.pending(3) == 0
+
+    def test_drain_resets(self):
+        """Testa que drain retira todos os deltas"""
+        counter = ShardedCounter(shards=4)
+        for key in range(1, 10):
+            counter.increment(key, key)
+
+        drained = counter.drain()
+
+        assert drained == {k: k for k in range(1, 10)}
+        assert counter.drain() == {}
+
+    def test_restore(self):
+        """Testa devolução de deltas"""
+        counter = ShardedCounter()
+        counter.increment("a", 2)
+        counter.restore({"a": 3})
+
+        assert counter.pending("a") == 5
+
+    def test_size_and_age(self):
+        """Testa tamanho e idade do buffer (zerados pelo drain)"""
+        counter = ShardedCounter(shards=4)
+        assert len(counter) == 0
+        assert counter.age() == 0
+
+        counter.increment(1)
+        counter.increment(1)
+        counter.increment(2)
+
+        assert len(counter) == 2
+        assert counter.age() >= 0
+
+        counter.drain()
+
+        assert len(counter) == 0
+        assert counter.age() == 0
+
+
+# ===========================================
+# TESTES DE DESCARGA E RECONCILIAÇÃO
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestCounterFlush:
+    """Testes para flush_view_counts e reconcile_sold_counts"""
+
+    async def test_views_are_buffered(self, db_session, test_rifa):
+        """Testa que a visualização não grava no banco durante a leitura"""
+        rifa_id = test_rifa.id
+
+        for _ in range(3):
+            rifa = await get_rifa_by_id(db_session, rifa_id, increment_view=True)
+
+        assert get_view_count(rifa) == 3
+        view_count, _ = await stored_counts(db_session, rifa_id)
+        assert view_count == 0
+
+        updated = await flush_view_counts(db_session)
+
+        assert updated == 1
+        view_count, _ = await stored_counts(db_session, rifa_id)
+        assert view_count == 3
+        assert view_counter.pending(rifa_id) == 0
+
+    async def test_flush_without_pending(self, db_session):
+        """Testa descarga sem visualizações pendentes"""
+        assert await flush_view_counts(db_session) == 0
+
+    async def test_reconcile_sold_counts(self, db_session, test_rifa, test_user):
+        """Testa recálculo de sold_count a partir dos tickets"""
+        rifa_id = test_rifa.id
+        db_session.add_all([
+            Ticket(number=n, rifa_id=rifa_id, user_id=test_user.id)
+            for n in (1, 2, 3)
+        ])
+        await db_session.commit()
+
+        fixed = await reconcile_sold_counts(db_session)
+
+        assert fixed == 1
+        _, sold_count = await stored_counts(db_session, rifa_id)
+        assert sold_count == 3
+
+        assert await reconcile_sold_counts(db_session) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestServerlessViews:
+    """Testes para a descarga por requisição (fast_start) e o buffer no Redis"""
+
+    @pytest.fixture
+    def primary_sessions(self, db_engine, monkeypatch):
+        """async_session do app apontando para o banco de teste"""
+        sessions = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(app.database, "async_session", sessions)
+        return sessions
+
+    async def test_fast_start_flushes_on_size(self, db_session, test_rifa, primary_sessions, monkeypatch):
+        """Testa que a requisição grava o buffer ao atingir o tamanho máximo"""
+        monkeypatch.setattr(settings, "fast_start", True)
+        monkeypatch.setattr(settings, "view_count_flush_max_pending", 1)
+
+        await get_rifa_by_id(db_session, test_rifa.id, increment_view=True)
+
+        assert view_counter.pending(test_rifa.id) == 0
+        view_count, _ = await stored_counts(db_session, test_rifa.id)
+        assert view_count == 1
+
+    async def test_fast_start_flushes_on_age(self, db_session, test_rifa, primary_sessions, monkeypatch):
+        """Testa que a requisição grava o buffer quando a visualização mais antiga expira"""
+        monkeypatch.setattr(settings, "fast_start", True)
+        monkeypatch.setattr(settings, "view_count_flush_max_age_seconds", 60)
+
+        await get_rifa_by_id(db_session, test_rifa.id, increment_view=True)
+        assert view_counter.pending(test_rifa.id) == 1
+
+        monkeypatch.setattr(settings, "view_count_flush_max_age_seconds", 0)
+        await get_rifa_by_id(db_session, test_rifa.id, increment_view=True)
+
+        assert view_counter.pending(test_rifa.id) == 0
+        view_count, _ = await stored_counts(db_session, test_rifa.id)
+        assert view_count == 2
+
+    async def test_buffered_without_fast_start(self, db_session, test_rifa, primary_sessions, monkeypatch):
+        """Testa que fora do serverless o buffer fica para o worker"""
+        monkeypatch.setattr(settings, "view_count_flush_max_pending", 1)
+
+        await get_rifa_by_id(db_session, test_rifa.id, increment_view=True)
+
+        assert view_counter.pending(test_rifa.id) == 1
+
+    async def test_redis_buffer(self, db_session, test_rifa, monkeypatch):
+        """Testa que com Redis a visualização vai para o hash e é descarregada dele"""
+        fake = FakeRedis()
+        monkeypatch.setattr(counters, "get_redis", lambda: fake)
+
+        for _ in range(3):
+            await get_rifa_by_id(db_session, test_rifa.id, increment_view=True)
+
+        assert view_counter.pending(test_rifa.id) == 0
+        assert fake.hashes[VIEW_COUNTS_KEY] == {str(test_rifa.id): 3}
+
+        updated = await flush_view_counts(db_session)
+
+        assert updated == 1
+        assert VIEW_COUNTS_KEY not in fake.hashes
+        view_count, _ = await stored_counts(db_session, test_rifa.id)
+        assert view_count == 3
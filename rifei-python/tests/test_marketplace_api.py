@@ -0,0 +1,448 @@
+"""
+Testes de API para o Marketplace - Rifei
+Testa endpoints de rifas, números e categorias
+"""
+import base64
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from app.config import settings
+from app.models.models import Rifa, RifaStatus
+from app.services.numbers import NumberBitmap, create_tickets
+
+
+async def create_rifas(db_session, creator, prices):
+    """Cria rifas ativas com os preços informados"""
+    rifas = [
+        Rifa(
+            title=f"Rifa {i}",
+            slug=f"rifa-{i}",
+            description=f"Descrição da rifa {i}",
+            price=Decimal(price),
+            total_numbers=100,
+            status=RifaStatus.ACTIVE,
+            start_date=datetime.utcnow(),
+            end_date=datetime.utcnow() + timedelta(days=30),
+            creator_id=creator.id,
+        )
+        for i, price in enumerate(prices)
+    ]
+    db_session.add_all(rifas)
+    await db_session.commit()
+    return [rifa.id for rifa in rifas]
+
+
+# ===========================================
+# TESTES DE LISTAGEM
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestListRifasCursor:
+    """Testes para paginação por cursor em GET /marketplace/api/rifas"""
+
+    async def test_cursor_walks_all_pages(self, client: AsyncClient, db_session, test_creator):
+        """Testa que os cursores percorrem tudo sem repetir (com empates)"""
+        ids = await create_rifas(db_session, test_creator, ["5", "5", "5", "10", "1"])
+
+        seen = []
+        params = {"sort_by": "price", "sort_order": "asc", "per_page": 2}
+        while True:
+            data = (await client.get("/marketplace/api/rifas", params=params)).json()
+            seen.extend(item["id"] for item in data["items"])
+            if not data["next_cursor"]:
+                break
+            params["cursor"] = data["next_cursor"]
+
+        assert sorted(seen) == sorted(ids)
+        assert len(seen) == len(set(seen))
+        assert data["has_next"] is False
+
+    async def test_prev_cursor_returns_previous_page(self, client: AsyncClient, db_session, test_creator):
+        """Testa navegação para trás com prev_cursor"""
+        await create_rifas(db_session, test_creator, ["1", "2", "3", "4", "5"])
+        params = {"sort_by": "price", "sort_order": "desc", "per_page": 2}
+
+        first = (await client.get("/marketplace/api/rifas", params=params)).json()
+        assert first["prev_cursor"] is None
+
+        second = (await client.get(
+            "/marketplace/api/rifas",
+            params={**params, "cursor": first["next_cursor"]},
+        )).json()
+        assert second["has_prev"] is True
+
+        back = (await client.get(
+            "/marketplace/api/rifas",
+            params={**params, "cursor": second["prev_cursor"]},
+        )).json()
+        assert [i["id"] for i in back["items"]] == [i["id"] for i in first["items"]]
+
+    async def test_count_modes(self, client: AsyncClient, db_session, test_creator):
+        """Testa total aproximado (em cache) e sem contagem"""
+        await create_rifas(db_session, test_creator, ["1", "2"])
+
+        data = (await client.get(
+            "/marketplace/api/rifas", params={"count_mode": "approximate"}
+        )).json()
+        assert data["total"] == 2
+        assert data["total_is_estimate"] is True
+
+        data = (await client.get(
+            "/marketplace/api/rifas", params={"count_mode": "none"}
+        )).json()
+        assert data["total"] is None
+        assert data["total_pages"] is None
+        assert len(data["items"]) == 2
+
+    async def test_cursor_from_other_sort_is_rejected(self, client: AsyncClient, db_session, test_creator):
+        """Testa cursor reutilizado com outra ordenação"""
+        await create_rifas(db_session, test_creator, ["1", "2", "3"])
+        data = (await client.get(
+            "/marketplace/api/rifas", params={"sort_by": "price", "per_page": 1}
+        )).json()
+
+        response = await client.get(
+            "/marketplace/api/rifas",
+            params={"sort_by": "created_at", "cursor": data["next_cursor"]},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ===========================================
+# TESTES DE SUGESTÕES
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestSuggestEndpoint:
+    """Testes para GET /marketplace/api/rifas/suggest"""
+
+    async def test_suggest(self, client: AsyncClient, test_rifa):
+        """Testa sugestões por prefixo"""
+        response = await client.get("/marketplace/api/rifas/suggest", params={"q": "iphone 15"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{
+            "type": "rifa",
+            "label": test_rifa.title,
+            "value": test_rifa.slug,
+            "url": f"/rifa/{test_rifa.slug}",
+        }]
+
+    async def test_suggest_requires_query(self, client: AsyncClient):
+        """Testa que q é obrigatório"""
+        response = await client.get("/marketplace/api/rifas/suggest")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+# ===========================================
+# TESTES DE DETALHE DA RIFA
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestRifaDetailEndpoints:
+    """Testes para GET /marketplace/api/rifas/{id}, /slug/{slug} e /stats"""
+
+    async def test_detail_single_query(
+        self, client: AsyncClient, db_session, test_rifa, test_user, query_counter
+    ):
+        """Testa detalhe completo com uma única query"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [1, 2])
+        query_counter.clear()
+
+        response = await client.get(f"/marketplace/api/rifas/{test_rifa.id}")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["creator_username"] == "testcreator"
+        assert data["category_name"] == "Eletrônicos"
+        assert data["unique_buyers"] == 1
+        assert data["last_purchase"] is not None
+        assert data["available_count"] == 998
+        assert data["available_numbers"][:3] == [3, 4, 5]
+        assert len(query_counter) == 1
+
+    async def test_detail_by_slug(self, client: AsyncClient, test_rifa):
+        """Testa detalhe por slug"""
+        response = await client.get(f"/marketplace/api/rifas/slug/{test_rifa.slug}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == test_rifa.id
+        assert response.json()["unique_buyers"] == 0
+
+    async def test_detail_not_found(self, client: AsyncClient):
+        """Testa rifa inexistente"""
+        response = await client.get("/marketplace/api/rifas/slug/nao-existe")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_rifa_stats(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa estatísticas da rifa"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [7])
+
+        response = await client.get(f"/marketplace/api/rifas/{test_rifa.id}/stats")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["unique_buyers"] == 1
+        assert data["days_remaining"] >= 29
+
+
+# ===========================================
+# TESTES DE NÚMEROS DA RIFA
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestRifaNumbersEndpoint:
+    """Testes para GET /marketplace/api/rifas/{id}/numbers"""
+
+    async def test_numbers_as_ranges(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa disponibilidade em faixas"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [41, 42, 43])
+
+        response = await client.get(
+            f"/marketplace/api/rifas/{test_rifa.id}/numbers",
+            params={"limit": 100},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["encoding"] == "ranges"
+        assert data["ranges"] == [[1, 40], [44, 100]]
+        assert data["start"] == 1
+        assert data["end"] == 100
+        assert data["sold_count"] == 3
+        assert data["available_count"] == 997
+        assert data["next_cursor"] is not None
+
+    async def test_numbers_cursor_pagination(self, client: AsyncClient, test_rifa):
+        """Testa navegação pelas janelas via next_cursor"""
+        url = f"/marketplace/api/rifas/{test_rifa.id}/numbers"
+
+        windows = []
+        cursor = None
+        while True:
+            params = {"limit": 400}
+            if cursor:
+                params["cursor"] = cursor
+            data = (await client.get(url, params=params)).json()
+            windows.append((data["start"], data["end"]))
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert windows == [(1, 400), (401, 800), (801, 1000)]
+
+    async def test_numbers_as_bitmap(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa codificação em bitmap base64"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [1, 10, 20])
+
+        response = await client.get(
+            f"/marketplace/api/rifas/{test_rifa.id}/numbers",
+            params={"encoding": "bitmap", "limit": 16},
+        )
+
+        data = response.json()
+        window = NumberBitmap(16, base64.b64decode(data["bitmap"]))
+        assert window.is_sold(1)
+        assert window.is_sold(10)
+        assert window.sold_count == 2
+
+    async def test_numbers_as_list(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa status individual dos números"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [2])
+
+        response = await client.get(
+            f"/marketplace/api/rifas/{test_rifa.id}/numbers",
+            params={"encoding": "list", "limit": 3},
+        )
+
+        numbers = response.json()["numbers"]
+        assert [n["status"] for n in numbers] == ["disponivel", "pago", "disponivel"]
+        assert numbers[1]["user_id"] == test_user.id
+
+    async def test_numbers_window_by_start(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa a janela pedida por número inicial (grade da página)"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [505])
+
+        response = await client.get(
+            f"/marketplace/api/rifas/{test_rifa.id}/numbers",
+            params={"start": 501, "limit": 500},
+        )
+
+        data = response.json()
+        assert data["start"] == 501
+        assert data["end"] == 1000
+        assert data["ranges"] == [[501, 504], [506, 1000]]
+
+    async def test_numbers_invalid_cursor(self, client: AsyncClient, test_rifa):
+        """Testa cursor inválido"""
+        response = await client.get(
+            f"/marketplace/api/rifas/{test_rifa.id}/numbers",
+            params={"cursor": "not-a-cursor"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_numbers_rifa_not_found(self, client: AsyncClient):
+        """Testa rifa inexistente"""
+        response = await client.get("/marketplace/api/rifas/9999/numbers")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ===========================================
+# TESTES DE PÁGINAS
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestRifaDetailPage:
+    """Testes para a página /rifa/{slug}"""
+
+    async def test_detail_page_ships_first_window(
+        self, client: AsyncClient, db_session, test_rifa, test_user, monkeypatch
+    ):
+        """Testa que a página envia só as faixas da primeira janela"""
+        monkeypatch.setattr(settings, "number_grid_window_size", 500)
+        await create_tickets(db_session, test_rifa.id, test_user.id, [3])
+
+        response = await client.get(f"/rifa/{test_rifa.slug}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert '"ranges": [[1, 2], [4, 500]]' in response.text
+        assert '"totalNumbers": 1000' in response.text
+
+    async def test_detail_page_size_is_constant(self, client: AsyncClient, db_session, test_creator):
+        """Testa que o HTML não cresce com total_numbers"""
+        sizes = []
+        for total in (1000, 100000):
+            rifa = Rifa(
+                title=f"Rifa {total}",
+                slug=f"rifa-{total}",
+                description="Rifa grande",
+                price=Decimal("1.00"),
+                total_numbers=total,
+                creator_id=test_creator.id,
+                status=RifaStatus.ACTIVE,
+                end_date=datetime.utcnow() + timedelta(days=30),
+                numbers_bitmap=NumberBitmap(total).to_bytes(),
+            )
+            db_session.add(rifa)
+            await db_session.commit()
+
+            response = await client.get(f"/rifa/rifa-{total}")
+            sizes.append(len(response.content))
+
+        assert abs(sizes[1] - sizes[0]) < 100
+
+
+# ===========================================
+# TESTES DE RESERVA
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestReserveEndpoint:
+    """Testes para POST/DELETE /marketplace/api/rifas/{id}/reserve"""
+
+    async def test_reserve_requires_auth(self, client: AsyncClient, test_rifa):
+        """Testa reserva sem autenticação"""
+        response = await client.post(
+            f"/marketplace/api/rifas/{test_rifa.id}/reserve",
+            json={"numbers": [1]},
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_reserve_and_conflict(
+        self, client: AsyncClient, test_rifa, auth_headers, admin_auth_headers
+    ):
+        """Testa reserva e conflito entre compradores"""
+        rifa_id = test_rifa.id
+        url = f"/marketplace/api/rifas/{rifa_id}/reserve"
+
+        response = await client.post(url, json={"numbers": [1, 2]}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [n["number"] for n in data["numbers"]] == [1, 2]
+        assert all(n["status"] == "reservado" for n in data["numbers"])
+
+        response = await client.post(url, json={"numbers": [2, 3]}, headers=admin_auth_headers)
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+        numbers = await client.get(
+            f"/marketplace/api/rifas/{rifa_id}/numbers",
+            params={"encoding": "list", "limit": 3},
+        )
+        statuses = [n["status"] for n in numbers.json()["numbers"]]
+        assert statuses == ["reservado", "reservado", "disponivel"]
+
+    async def test_release_reservation(self, client: AsyncClient, test_rifa, auth_headers):
+        """Testa liberação das reservas"""
+        url = f"/marketplace/api/rifas/{test_rifa.id}/reserve"
+        await client.post(url, json={"numbers": [5, 6]}, headers=auth_headers)
+
+        response = await client.delete(url, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["data"]["released"] == 2
+
+    async def test_reserve_rifa_not_found(self, client: AsyncClient, auth_headers):
+        """Testa reserva em rifa inexistente"""
+        response = await client.post(
+            "/marketplace/api/rifas/9999/reserve",
+            json={"numbers": [1]},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ===========================================
+# TESTES DE ESTATÍSTICAS
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestStatsEndpoint:
+    """Testes para GET /marketplace/api/stats"""
+
+    async def test_stats_snapshot(self, client: AsyncClient, db_session, test_rifa, test_creator):
+        """Testa que o snapshot é reaproveitado até ser recalculado"""
+        first = (await client.get("/marketplace/api/stats")).json()
+        assert first["active_rifas"] == 1
+        assert first["stale_after"] > first["generated_at"]
+
+        await create_rifas(db_session, test_creator, ["1"])
+
+        second = (await client.get("/marketplace/api/stats")).json()
+        assert second == first
+
+    async def test_fresh_only_for_admin(
+        self, client: AsyncClient, db_session, test_rifa, test_creator,
+        auth_headers, admin_auth_headers
+    ):
+        """Testa que fresh=1 só recalcula para administradores"""
+        await client.get("/marketplace/api/stats")
+        await create_rifas(db_session, test_creator, ["1"])
+
+        data = (await client.get(
+            "/marketplace/api/stats", params={"fresh": 1}, headers=auth_headers
+        )).json()
+        assert data["active_rifas"] == 1
+
+        data = (await client.get(
+            "/marketplace/api/stats", params={"fresh": 1}, headers=admin_auth_headers
+        )).json()
+        assert data["active_rifas"] == 2
+        assert data["total_rifas"] == 2
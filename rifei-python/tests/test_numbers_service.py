@@ -0,0 +1,154 @@
+"""
+Testes para o serviço de números - Rifei
+Testa o bitmap de números vendidos e a escrita de tickets
+"""
+import pytest
+from sqlalchemy import select
+
+from app.models.models import Rifa, Ticket
+from app.services.numbers import (
+    NumberBitmap,
+    NumbersUnavailableError,
+    load_bitmap,
+    create_tickets,
+)
+from app.services.marketplace import get_available_numbers, get_available_ranges
+
+
+# ===========================================
+# TESTES DO BITMAP
+# ===========================================
+
+@pytest.mark.unit
+class TestNumberBitmap:
+    """Testes para NumberBitmap"""
+
+    def test_empty_bitmap(self):
+        """Testa bitmap sem vendas"""
+        bitmap = NumberBitmap(100)
+
+        assert bitmap.sold_count == 0
+        assert bitmap.available_count == 100
+        assert bitmap.available_ranges() == [(1, 100)]
+        assert len(bitmap.to_bytes()) == 13
+
+    def test_mark_sold_and_available(self):
+        """Testa marcação de números vendidos e liberação"""
+        bitmap = NumberBitmap(20)
+        bitmap.mark_sold([1, 8, 9, 20])
+
+        assert bitmap.is_sold(8)
+        assert bitmap.is_available(10)
+        assert bitmap.sold_count == 4
+
+        bitmap.mark_available([8])
+        assert bitmap.is_available(8)
+        assert bitmap.sold_count == 3
+
+    def test_out_of_range_number(self):
+        """Testa número fora da rifa"""
+        bitmap = NumberBitmap(10)
+
+        with pytest.raises(ValueError):
+            bitmap.mark_sold([11])
+
+        with pytest.raises(ValueError):
+            bitmap.is_sold(0)
+
+    def test_available_ranges(self):
+        """Testa faixas de números disponíveis"""
+        bitmap = NumberBitmap.from_numbers(100, [41, 42, 43])
+
+        assert bitmap.available_ranges() == [(1, 40), (44, 100)]
+        assert bitmap.available_ranges(start=30, end=50) == [(30, 40), (44, 50)]
+
+    def test_available_ranges_full(self):
+        """Testa rifa esgotada"""
+        bitmap = NumberBitmap.from_numbers(17, range(1, 18))
+
+        assert bitmap.available_ranges() == []
+        assert bitmap.available_count == 0
+
+    def test_available_numbers_pagination(self):
+        """Testa paginação de números disponíveis"""
+        bitmap = NumberBitmap.from_numbers(30, [2, 3, 10])
+
+        assert bitmap.available_numbers(limit=3) == [1, 4, 5]
+        assert bitmap.available_numbers(offset=3, limit=4) == [6, 7, 8, 9]
+        assert bitmap.available_numbers(offset=25) == [29, 30]
+
+    def test_bitmap_matches_set_difference(self):
+        """Testa que o bitmap equivale ao cálculo com sets"""
+        sold = set(range(1, 100_001, 7)) | set(range(500, 9000))
+        bitmap = NumberBitmap.from_numbers(100_000, sold)
+
+        expected = sorted(set(range(1, 100_001)) - sold)
+        assert bitmap.available_numbers() == expected
+        assert bitmap.available_count == len(expected)
+
+    def test_restore_from_bytes_with_different_total(self):
+        """Testa reconstrução a partir de bytes persistidos"""
+        data = NumberBitmap.from_numbers(16, [1, 16]).to_bytes()
+        bitmap = NumberBitmap(10, data)
+
+        assert bitmap.is_sold(1)
+        assert bitmap.sold_count == 1
+
+
+# ===========================================
+# TESTES DE PERSISTÊNCIA
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestBitmapPersistence:
+    """Testes do bitmap persistido junto da rifa"""
+
+    async def test_load_bitmap_rebuilds_from_tickets(self, db_session, test_rifa, test_user):
+        """Testa reconstrução do bitmap de rifas sem bitmap"""
+        db_session.add_all([
+            Ticket(number=n, rifa_id=test_rifa.id, user_id=test_user.id)
+            for n in (1, 2, 500)
+        ])
+        await db_session.commit()
+
+        bitmap = await load_bitmap(db_session, test_rifa.id)
+
+        assert bitmap.sold_count == 3
+        assert bitmap.available_ranges(end=10) == [(3, 10)]
+
+        stored = await db_session.execute(
+            select(Rifa.numbers_bitmap).where(Rifa.id == test_rifa.id)
+        )
+        assert stored.scalar_one() == bitmap.to_bytes()
+
+    async def test_load_bitmap_missing_rifa(self, db_session):
+        """Testa rifa inexistente"""
+        assert await load_bitmap(db_session, 9999) is None
+
+    async def test_create_tickets_updates_bitmap_and_sold_count(
+        self, db_session, test_rifa, test_user
+    ):
+        """Testa que a escrita de tickets atualiza bitmap e sold_count"""
+        tickets = await create_tickets(db_session, test_rifa.id, test_user.id, [5, 6, 7])
+
+        assert [t.number for t in tickets] == [5, 6, 7]
+
+        await db_session.refresh(test_rifa)
+        assert test_rifa.sold_count == 3
+
+        available = await get_available_numbers(db_session, test_rifa.id, limit=6)
+        assert available == [1, 2, 3, 4, 8, 9]
+
+        ranges = await get_available_ranges(db_session, test_rifa.id)
+        assert ranges == [(1, 4), (8, 1000)]
+
+    async def test_create_tickets_rejects_sold_numbers(self, db_session, test_rifa, test_user):
+        """Testa rejeição de números já vendidos ou fora da rifa"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [10])
+
+        with pytest.raises(NumbersUnavailableError) as exc_info:
+            await create_tickets(db_session, test_rifa.id, test_user.id, [10, 11, 1001])
+
+        assert exc_info.value.numbers == [10, 1001]
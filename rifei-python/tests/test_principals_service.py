@@ -0,0 +1,322 @@
+"""
+Testes para o cache de principais - Rifei
+Testa o cache de tokens verificados, o principal por claims e a revogação
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.database import commit
+from app.models.models import User, UserRole
+from app.services.auth import (
+    create_access_token,
+    create_refresh_token,
+    generate_tokens_for_user,
+)
+from app.services.principals import (
+    ClaimsPrincipal,
+    PrincipalCache,
+    principal_cache,
+    resolve_principal,
+    resolve_claims_principal,
+    revoke_user_tokens,
+    invalidate_user,
+    hash_token,
+)
+
+
+def _token_for(user: User, **kwargs) -> str:
+    return create_access_token({"sub": str(user.id), "ver": user.token_version}, **kwargs)
+
+
+# ===========================================
+# TESTES DO CACHE
+# ===========================================
+
+@pytest.mark.unit
+class TestPrincipalCache:
+    """Testes para PrincipalCache"""
+
+    def test_get_and_set(self):
+        """Testa leitura e escrita por hash do token"""
+        cache = PrincipalCache()
+        cache.set("h", {"sub": "1"}, {"id": 1}, ttl=60)
+
+        entry = cache.get("h")
+        assert entry.claims == {"sub": "1"}
+        assert entry.user == {"id": 1}
+        assert cache.get("outro") is None
+
+    def test_does_not_store_expired(self):
+        """Testa que TTL não positivo (token vencido) não é guardado"""
+        cache = PrincipalCache()
+        cache.set("h", {}, {"id": 1}, ttl=0)
+
+        assert cache.get("h") is None
+
+    def test_invalidate_user_drops_all_tokens(self):
+        """Testa que invalidar um usuário descarta todos os tokens dele"""
+        cache = PrincipalCache()
+        cache.set("a", {}, {"id": 1}, ttl=60)
+        cache.set("b", {}, {"id": 1}, ttl=60)
+        cache.set("c", {}, {"id": 2}, ttl=60)
+
+        cache.invalidate_user(1)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+        # Tokens cacheados depois da invalidação voltam a valer
+        cache.set("a", {}, {"id": 1}, ttl=60)
+        assert cache.get("a") is not None
+
+
+# ===========================================
+# TESTES DE resolve_principal
+# ===========================================
+
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestResolvePrincipal:
+    """Testes para resolve_principal"""
+
+    async def test_second_lookup_skips_database(self, db_session, test_user, query_counter):
+        """Testa que o token já visto não consulta o banco"""
+        token = _token_for(test_user)
+
+        first = await resolve_principal(db_session, token)
+        queries = len(query_counter)
+        second = await resolve_principal(db_session, token)
+
+        assert queries == 1
+        assert len(query_counter) == queries
+        assert second.user.id == test_user.id
+        assert second.user.username == test_user.username
+        assert second.user.role == UserRole.USER
+        # Uma instância nova por requisição
+        assert second.user is not first.user
+
+    async def test_user_is_slim_projection(self, db_session, test_user):
+        """Testa que o usuário em cache não carrega password_hash"""
+        principal = await resolve_principal(db_session, _token_for(test_user))
+
+        assert "password_hash" not in principal.user.__dict__
+
+    async def test_invalid_tokens(self, db_session, test_user):
+        """Testa tokens inválidos, de refresh e sem usuário"""
+        assert await resolve_principal(db_session, "nao-e-um-jwt") is None
+        assert await resolve_principal(
+            db_session, create_refresh_token({"sub": str(test_user.id)})
+        ) is None
+
+        malformed = await resolve_principal(db_session, create_access_token({"sub": "abc"}))
+        assert malformed.user_id is None
+
+        missing = await resolve_principal(db_session, create_access_token({"sub": "9999"}))
+        assert missing.user_id == 9999
+        assert missing.user is None
+        assert len(principal_cache) == 0
+
+    async def test_missing_version_is_revoked(self, db_session, test_user):
+        """Testa que token sem a claim "ver" não é aceito"""
+        token = create_access_token({"sub": str(test_user.id)})
+
+        assert await resolve_principal(db_session, token) is None
+
+    async def test_ttl_bounded_by_token_expiry(self, db_session, test_user):
+        """Testa que tokens prestes a vencer não ficam em cache"""
+        token = _token_for(test_user, expires_delta=timedelta(milliseconds=1))
+
+        await resolve_principal(db_session, token)
+
+        assert principal_cache.get(hash_token(token)) is None
+
+    async def test_deactivation_invalidates_on_commit(self, db_session, test_user):
+        """Testa que desativar o usuário pelo ORM invalida o cache"""
+        token = _token_for(test_user)
+        await resolve_principal(db_session, token)
+
+        test_user.is_active = False
+        await db_session.commit()
+
+        principal = await resolve_principal(db_session, token)
+        assert principal.user.is_active is False
+
+    async def test_role_change_invalidates_on_commit(self, db_session, test_user):
+        """Testa que trocar a role pelo ORM invalida o cache"""
+        token = _token_for(test_user)
+        await resolve_principal(db_session, token)
+
+        test_user.role = UserRole.ADMIN
+        await db_session.commit()
+
+        # A troca de role revoga o token antigo; o novo já vê a role nova
+        assert await resolve_principal(db_session, token) is None
+        principal = await resolve_principal(db_session, _token_for(test_user))
+        assert principal.user.role == UserRole.ADMIN
+
+    async def test_invalidate_user_after_direct_update(self, db_session, test_user):
+        """Testa invalidação manual após UPDATE direto"""
+        token = _token_for(test_user)
+        await resolve_principal(db_session, token)
+
+        await db_session.execute(
+            update(User).where(User.id == test_user.id).values(is_active=False)
+        )
+        await db_session.commit()
+
+        cached = await resolve_principal(db_session, token)
+        assert cached.user.is_active is True
+
+        invalidate_user(test_user.id)
+
+        principal = await resolve_principal(db_session, token)
+        assert principal.user.is_active is False
+
+
+# ===========================================
+# TESTES DO PRINCIPAL POR CLAIMS
+# ===========================================
+
+def _full_token(user: User) -> str:
+    return generate_tokens_for_user(user)["access_token"]
+
+
+@pytest.mark.unit
+class TestClaimsPrincipal:
+    """Testes para ClaimsPrincipal"""
+
+    def test_from_claims(self):
+        """Testa montagem a partir das claims de generate_tokens_for_user"""
+        principal = ClaimsPrincipal.from_claims({
+            "sub": "7", "email": "a@b.com", "username": "ana", "name": "Ana",
+            "role": "creator", "level": 3, "xp": 250, "ver": 2,
+        })
+
+        assert principal.id == 7
+        assert principal.role == UserRole.CREATOR
+        assert principal.version == 2
+        assert principal.is_active is True
+        assert not hasattr(principal, "__dict__")
+
+    def test_missing_claims(self):
+        """Testa que tokens sem as claims novas não geram principal"""
+        assert ClaimsPrincipal.from_claims({"sub": "7", "email": "a@b.com"}) is None
+
+
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestResolveClaimsPrincipal:
+    """Testes para resolve_claims_principal"""
+
+    async def test_skips_user_lookup(self, db_session, test_user, query_counter):
+        """Testa que só a versão é consultada, uma vez"""
+        token = _full_token(test_user)
+
+        first = await resolve_claims_principal(db_session, token)
+        second = await resolve_claims_principal(db_session, token)
+
+        assert len(query_counter) == 1
+        assert "password_hash" not in query_counter[0]
+        assert isinstance(second, ClaimsPrincipal)
+        assert first.name == test_user.name
+        assert second.xp == test_user.xp
+
+    async def test_deactivated_user_is_rejected(self, db_session, test_user):
+        """Testa que desativar o usuário rejeita o token sem novo lookup"""
+        token = _full_token(test_user)
+        assert await resolve_claims_principal(db_session, token) is not None
+
+        test_user.is_active = False
+        await db_session.commit()
+
+        assert await resolve_claims_principal(db_session, token) is None
+
+    async def test_role_change_revokes_tokens(self, db_session, test_user):
+        """Testa que trocar a role incrementa token_version e revoga o token"""
+        token = _full_token(test_user)
+
+        test_user.role = UserRole.CREATOR
+        await db_session.commit()
+
+        assert test_user.token_version == 1
+        assert await resolve_claims_principal(db_session, token) is None
+        assert await resolve_principal(db_session, token) is None
+
+        fresh = await resolve_claims_principal(db_session, _full_token(test_user))
+        assert fresh.role == UserRole.CREATOR
+
+    async def test_profile_edit_keeps_tokens(self, db_session, test_user):
+        """Testa que editar o perfil não revoga tokens"""
+        token = _full_token(test_user)
+
+        test_user.bio = "Nova bio"
+        await db_session.commit()
+
+        assert test_user.token_version == 0
+        assert await resolve_claims_principal(db_session, token) is not None
+
+    async def test_revoke_user_tokens(self, db_session, test_user):
+        """Testa revogação explícita de todos os tokens"""
+        token = _full_token(test_user)
+        assert await resolve_claims_principal(db_session, token) is not None
+
+        await revoke_user_tokens(db_session, test_user.id)
+        await commit(db_session)
+
+        assert await resolve_claims_principal(db_session, token) is None
+        assert await resolve_principal(db_session, token) is None
+
+    async def test_old_token_falls_back_to_database(self, db_session, test_user):
+        """Testa que token sem as claims novas usa o usuário do banco"""
+        user = await resolve_claims_principal(db_session, _token_for(test_user))
+
+        assert isinstance(user, User)
+        assert user.id == test_user.id
+
+
+# ===========================================
+# TESTES DAS DEPENDENCIES
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.auth
+@pytest.mark.asyncio
+class TestPrincipalDependencies:
+    """Testes das dependencies de auth com o cache"""
+
+    async def test_me_twice_queries_once(self, client, auth_headers, query_counter):
+        """Testa que a segunda requisição autenticada não consulta o banco"""
+        first = await client.get("/api/auth/me", headers=auth_headers)
+        queries = len(query_counter)
+        second = await client.get("/api/auth/me", headers=auth_headers)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert len(query_counter) == queries
+
+    async def test_deactivated_user_is_rejected(
+        self, client, db_session, test_user, auth_headers
+    ):
+        """Testa que usuário desativado perde acesso mesmo com token em cache"""
+        response = await client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+
+        test_user.is_active = False
+        await db_session.commit()
+
+        response = await client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 403
+
+    async def test_public_page_uses_claims(self, client, test_user, auth_headers, query_counter):
+        """Testa que página pública mostra o usuário sem carregar users"""
+        await client.get("/termos", headers=auth_headers)
+        queries = len(query_counter)
+        response = await client.get("/termos", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert test_user.name in response.text
+        assert len(query_counter) == queries
@@ -0,0 +1,204 @@
+"""
+Testes para o rate limit - Rifei
+Testa a janela deslizante em memória e os limites das rotas de autenticação
+"""
+import pytest
+from fastapi import status
+from starlette.requests import Request
+
+from app.config import settings
+from app.ratelimit import LocalRateLimiter, client_ip
+
+
+def make_request(peer: str, forwarded: str = "") -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+# ===========================================
+# TESTES DA JANELA DESLIZANTE
+# ===========================================
+
+@pytest.mark.unit
+class TestLocalRateLimiter:
+    """Testes para LocalRateLimiter"""
+
+    def test_allows_up_to_limit(self):
+        """Testa que o limite é respeitado dentro da janela"""
+        limiter = LocalRateLimiter()
+
+        results = [limiter.hit("k", limit=3, window=60, now=1000) for _ in range(4)]
+
+        assert results[:3] == [0, 0, 0]
+        assert results[3] > 0
+
+    def test_keys_are_independent(self):
+        """Testa que cada chave tem o próprio contador"""
+        limiter = LocalRateLimiter()
+        limiter.hit("a", limit=1, window=60, now=1000)
+
+        assert limiter.hit("b", limit=1, window=60, now=1000) == 0
+        assert limiter.hit("a", limit=1, window=60, now=1000) > 0
+
+    def test_previous_window_weighs_in(self):
+        """Testa que a janela anterior conta proporcionalmente"""
+        limiter = LocalRateLimiter()
+        for _ in range(10):
+            limiter.hit("k", limit=10, window=60, now=60 * 100 + 59)
+
+        # Início da janela seguinte: quase toda a anterior ainda conta
+        assert limiter.hit("k", limit=10, window=60, now=60 * 101 + 1) > 0
+        # Perto do fim dela, a anterior quase não pesa
+        assert limiter.hit("k", limit=10, window=60, now=60 * 101 + 55) == 0
+
+    def test_resets_after_two_windows(self):
+        """Testa que contadores antigos são descartados"""
+        limiter = LocalRateLimiter()
+        for _ in range(3):
+            limiter.hit("k", limit=3, window=60, now=1000)
+
+        assert limiter.hit("k", limit=3, window=60, now=1000 + 180) == 0
+
+    def test_retry_after_is_enough(self):
+        """Testa que esperar Retry-After libera uma nova requisição"""
+        limiter = LocalRateLimiter()
+        for _ in range(5):
+            limiter.hit("k", limit=5, window=60, now=1010)
+
+        retry_after = limiter.hit("k", limit=5, window=60, now=1010)
+
+        assert 0 < retry_after <= 120
+        assert limiter.hit("k", limit=5, window=60, now=1010 + retry_after) == 0
+
+    def test_memory_is_bounded(self):
+        """Testa o descarte das chaves menos usadas"""
+        limiter = LocalRateLimiter(maxsize=2)
+        for key in ("a", "b", "c"):
+            limiter.hit(key, limit=5, window=60, now=1000)
+
+        assert len(limiter) == 2
+
+
+# ===========================================
+# TESTES DO IP DO CLIENTE
+# ===========================================
+
+@pytest.mark.unit
+class TestClientIp:
+    """Testes para client_ip atrás de proxies"""
+
+    def test_ignores_header_without_trusted_proxies(self, monkeypatch):
+        """Testa que X-Forwarded-For é ignorado sem proxies configurados"""
+        monkeypatch.setattr(settings, "trusted_proxies", "")
+
+        assert client_ip(make_request("10.0.0.1", "203.0.113.9")) == "10.0.0.1"
+
+    def test_trusted_proxy_chain(self, monkeypatch):
+        """Testa o primeiro endereço não confiável da direita para a esquerda"""
+        monkeypatch.setattr(settings, "trusted_proxies", "10.0.0.0/8, 192.168.1.1")
+
+        # O cliente forjou o primeiro valor; o proxy anexou o IP real
+        request = make_request("10.0.0.1", "1.2.3.4, 203.0.113.9, 192.168.1.1")
+        assert client_ip(request) == "203.0.113.9"
+
+        # Conexão direta (não é proxy): header não vale
+        assert client_ip(make_request("198.51.100.7", "1.2.3.4")) == "198.51.100.7"
+
+    def test_trust_all(self, monkeypatch):
+        """Testa "*" (borda que reescreve o header, como na Vercel)"""
+        monkeypatch.setattr(settings, "trusted_proxies", "*")
+
+        assert client_ip(make_request("10.0.0.1", "203.0.113.9")) == "203.0.113.9"
+        assert client_ip(make_request("10.0.0.1")) == "10.0.0.1"
+
+
+# ===========================================
+# TESTES DAS ROTAS
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.auth
+@pytest.mark.asyncio
+class TestAuthRateLimits:
+    """Testes dos limites em login, cadastro e verificações"""
+
+    async def test_login_per_account(self, client, test_user, monkeypatch):
+        """Testa o limite por conta com Retry-After"""
+        monkeypatch.setattr(settings, "rate_limit_login_per_account", 2)
+        login_data = {"email": test_user.email, "password": "errada", "remember": False}
+
+        for _ in range(2):
+            response = await client.post("/api/auth/login", json=login_data)
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await client.post("/api/auth/login", json=login_data)
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["retry-after"]) >= 1
+
+        # Outra conta, mesmo IP: ainda permitido
+        other = {"email": "outra@test.com", "password": "errada", "remember": False}
+        response = await client.post("/api/auth/login", json=other)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_form_login_shares_limit(self, client, test_user, monkeypatch):
+        """Testa que o formulário e a API usam o mesmo contador por conta"""
+        monkeypatch.setattr(settings, "rate_limit_login_per_account", 1)
+        await client.post("/api/auth/login", json={
+            "email": test_user.email, "password": "errada", "remember": False,
+        })
+
+        response = await client.post(
+            "/auth/login",
+            data={"email": test_user.email, "password": "errada"},
+        )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    async def test_login_per_ip(self, client, monkeypatch):
+        """Testa o limite por IP"""
+        monkeypatch.setattr(settings, "rate_limit_login_per_ip", 3)
+
+        codes = []
+        for i in range(4):
+            response = await client.post("/api/auth/login", json={
+                "email": f"user{i}@test.com", "password": "x", "remember": False,
+            })
+            codes.append(response.status_code)
+
+        assert codes[:3] == [status.HTTP_401_UNAUTHORIZED] * 3
+        assert codes[3] == status.HTTP_429_TOO_MANY_REQUESTS
+
+    async def test_check_endpoints(self, client, monkeypatch):
+        """Testa o limite das verificações de email/username"""
+        monkeypatch.setattr(settings, "rate_limit_check_per_ip", 2)
+
+        await client.post("/api/auth/check-email", params={"email": "a@test.com"})
+        await client.post("/api/auth/check-username", params={"username": "alguem"})
+        response = await client.post("/api/auth/check-email", params={"email": "b@test.com"})
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    async def test_disabled(self, client, monkeypatch):
+        """Testa que o rate limit pode ser desligado"""
+        monkeypatch.setattr(settings, "rate_limit_enabled", False)
+        monkeypatch.setattr(settings, "rate_limit_check_per_ip", 1)
+
+        for _ in range(3):
+            response = await client.post("/api/auth/check-email", params={"email": "a@test.com"})
+            assert response.status_code == status.HTTP_200_OK
+
+    async def test_per_ip_behind_proxy(self, client, monkeypatch):
+        """Testa que clientes atrás do mesmo proxy têm contadores separados"""
+        monkeypatch.setattr(settings, "trusted_proxies", "127.0.0.1")
+        monkeypatch.setattr(settings, "rate_limit_check_per_ip", 1)
+
+        async def check(ip: str):
+            return await client.post(
+                "/api/auth/check-email", params={"email": "a@test.com"},
+                headers={"X-Forwarded-For": ip},
+            )
+
+        assert (await check("203.0.113.1")).status_code == status.HTTP_200_OK
+        assert (await check("203.0.113.2")).status_code == status.HTTP_200_OK
+        assert (await check("203.0.113.1")).status_code == status.HTTP_429_TOO_MANY_REQUESTS
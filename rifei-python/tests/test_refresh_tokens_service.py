@@ -0,0 +1,253 @@
+"""
+Testes para refresh tokens - Rifei
+Testa emissão, rotação, revogação por família, limpeza em lote e /api/auth/refresh
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select, update
+
+from app.database import commit
+from app.models.models import RefreshToken
+from app.services.auth import create_refresh_token, verify_token
+from app.services.principals import revoke_user_tokens
+from app.services.refresh_tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_token,
+    purge_expired_refresh_tokens,
+)
+
+
+async def _count_tokens(db_session) -> int:
+    result = await db_session.execute(select(func.count(RefreshToken.id)))
+    return result.scalar_one()
+
+
+# ===========================================
+# TESTES DO SERVICE
+# ===========================================
+
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestRefreshTokenRotation:
+    """Testes de emissão e rotação"""
+
+    async def test_issue_registers_token(self, db_session, test_user):
+        """Testa que o token emitido fica registrado com jti e família"""
+        token = await issue_refresh_token(db_session, test_user.id)
+        claims = verify_token(token, token_type="refresh")
+
+        result = await db_session.execute(
+            select(RefreshToken).where(RefreshToken.jti == claims["jti"])
+        )
+        record = result.scalar_one()
+        assert record.family_id == claims["fam"]
+        assert record.user_id == test_user.id
+        assert record.used_at is None
+
+    async def test_rotate_keeps_family(self, db_session, test_user):
+        """Testa que a rotação devolve um token novo da mesma família"""
+        token = await issue_refresh_token(db_session, test_user.id)
+
+        user, new_token = await rotate_refresh_token(db_session, token)
+
+        old_claims = verify_token(token, token_type="refresh")
+        new_claims = verify_token(new_token, token_type="refresh")
+        assert user.id == test_user.id
+        assert new_claims["fam"] == old_claims["fam"]
+        assert new_claims["jti"] != old_claims["jti"]
+        assert await _count_tokens(db_session) == 2
+
+    async def test_reuse_revokes_family(self, db_session, test_user):
+        """Testa que reapresentar um token usado revoga a família toda"""
+        token = await issue_refresh_token(db_session, test_user.id)
+        _, new_token = await rotate_refresh_token(db_session, token)
+        await commit(db_session)
+
+        with pytest.raises(RefreshTokenError) as exc:
+            await rotate_refresh_token(db_session, token)
+        assert exc.value.reason == "reutilizado"
+
+        # A revogação sobrevive ao rollback da requisição que respondeu 401
+        await db_session.rollback()
+
+        # O token legítimo mais recente também deixa de valer
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, new_token)
+
+    async def test_other_families_survive_reuse(self, db_session, test_user):
+        """Testa que a revogação não afeta outros logins do usuário"""
+        stolen = await issue_refresh_token(db_session, test_user.id)
+        other = await issue_refresh_token(db_session, test_user.id)
+        await rotate_refresh_token(db_session, stolen)
+        await commit(db_session)
+
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, stolen)
+
+        user, _ = await rotate_refresh_token(db_session, other)
+        assert user.id == test_user.id
+
+    async def test_rejects_unregistered_and_expired(self, db_session, test_user):
+        """Testa tokens sem registro e vencidos"""
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(
+                db_session, create_refresh_token({"sub": str(test_user.id)})
+            )
+
+        token = await issue_refresh_token(db_session, test_user.id)
+        await db_session.execute(
+            update(RefreshToken).values(
+                expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)
+            )
+        )
+        await db_session.commit()
+
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, token)
+
+    async def test_inactive_user(self, db_session, test_user):
+        """Testa que usuário desativado não renova"""
+        token = await issue_refresh_token(db_session, test_user.id)
+        test_user.is_active = False
+        await db_session.commit()
+
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, token)
+
+    async def test_revoke_token_and_user(self, db_session, test_user):
+        """Testa logout (revoke_token) e revogação de todos os tokens"""
+        token = await issue_refresh_token(db_session, test_user.id)
+        await revoke_token(db_session, token)
+        await commit(db_session)
+
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, token)
+
+        token = await issue_refresh_token(db_session, test_user.id)
+        await revoke_user_tokens(db_session, test_user.id)
+        await commit(db_session)
+
+        with pytest.raises(RefreshTokenError):
+            await rotate_refresh_token(db_session, token)
+
+    async def test_revoke_user_is_atomic(self, db_session, test_user):
+        """Testa que versão e refresh tokens são revogados no mesmo commit"""
+        token = await issue_refresh_token(db_session, test_user.id)
+        await commit(db_session)
+
+        await revoke_user_tokens(db_session, test_user.id)
+        await db_session.rollback()
+
+        await db_session.refresh(test_user)
+        assert test_user.token_version == 0
+        user, _ = await rotate_refresh_token(db_session, token)
+        assert user.id == test_user.id
+
+
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestPurgeExpiredRefreshTokens:
+    """Testes de purge_expired_refresh_tokens"""
+
+    async def test_purges_in_batches(self, db_session, test_user):
+        """Testa remoção em lotes apenas dos tokens vencidos"""
+        for _ in range(5):
+            await issue_refresh_token(db_session, test_user.id)
+        await db_session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id <= 4)
+            .values(expires_at=datetime.now(timezone.utc) - timedelta(days=1))
+        )
+        await db_session.commit()
+
+        purged = await purge_expired_refresh_tokens(db_session, batch_size=3)
+
+        assert purged == 4
+        assert await _count_tokens(db_session) == 1
+
+
+# ===========================================
+# TESTES DA API
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.auth
+@pytest.mark.asyncio
+class TestRefreshEndpoint:
+    """Testes de /api/auth/refresh"""
+
+    async def _login(self, client, test_user):
+        response = await client.post("/api/auth/login", json={
+            "email": test_user.email,
+            "password": "password123",
+            "remember": False,
+        })
+        assert response.status_code == status.HTTP_200_OK
+        return response
+
+    async def test_login_returns_refresh_token(self, client, test_user):
+        """Testa que o login devolve refresh token no corpo e em cookie"""
+        response = await self._login(client, test_user)
+
+        assert response.json()["token"]["refresh_token"]
+        assert "refresh_token" in response.cookies
+
+    async def test_refresh_with_body(self, client, test_user):
+        """Testa renovação enviando o token no corpo"""
+        login = await self._login(client, test_user)
+        client.cookies.clear()
+        token = login.json()["token"]["refresh_token"]
+
+        response = await client.post("/api/auth/refresh", json={"refresh_token": token})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["access_token"]
+        assert data["refresh_token"] != token
+
+        me = await client.get(
+            "/api/auth/me",
+            headers={"Authorization": f"Bearer {data['access_token']}"},
+        )
+        assert me.status_code == status.HTTP_200_OK
+
+    async def test_refresh_with_cookie(self, client, test_user):
+        """Testa renovação usando o cookie do login"""
+        await self._login(client, test_user)
+
+        first = await client.post("/api/auth/refresh")
+        second = await client.post("/api/auth/refresh")
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.status_code == status.HTTP_200_OK
+
+    async def test_reused_token_is_rejected(self, client, test_user):
+        """Testa que o mesmo refresh token não vale duas vezes"""
+        login = await self._login(client, test_user)
+        client.cookies.clear()
+        token = login.json()["token"]["refresh_token"]
+
+        await client.post("/api/auth/refresh", json={"refresh_token": token})
+        response = await client.post("/api/auth/refresh", json={"refresh_token": token})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_missing_token(self, client):
+        """Testa renovação sem token"""
+        response = await client.post("/api/auth/refresh")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_logout_revokes_refresh_token(self, client, test_user):
+        """Testa que o logout revoga o refresh token"""
+        login = await self._login(client, test_user)
+        token = login.json()["token"]["refresh_token"]
+
+        await client.post("/api/auth/logout")
+        response = await client.post("/api/auth/refresh", json={"refresh_token": token})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
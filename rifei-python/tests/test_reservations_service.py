@@ -0,0 +1,166 @@
+"""
+Testes para o serviço de reservas - Rifei
+Testa holds com TTL, confirmação e expiração em lote
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func
+
+from app.database import commit
+from app.models.models import NumberReservation, RifaStatus
+from app.services.numbers import NumbersUnavailableError, create_tickets
+from app.services.marketplace import check_numbers_available
+from app.services.reservations import (
+    RifaClosedError,
+    ReservationLimitError,
+    reserve_numbers,
+    release_numbers,
+    confirm_reservation,
+    expire_reservations,
+)
+
+
+async def count_reservations(db_session) -> int:
+    result = await db_session.execute(
+        select(func.count()).select_from(NumberReservation)
+    )
+    return result.scalar()
+
+
+# ===========================================
+# TESTES DE RESERVA
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestReserveNumbers:
+    """Testes para reserve_numbers"""
+
+    async def test_reserve_numbers(self, db_session, test_rifa, test_user):
+        """Testa reserva simples"""
+        numbers, reserved_until = await reserve_numbers(
+            db_session, test_rifa.id, test_user.id, [3, 1, 2]
+        )
+
+        assert numbers == [1, 2, 3]
+        assert reserved_until > datetime.now(timezone.utc)
+        assert await count_reservations(db_session) == 3
+
+        all_available, unavailable = await check_numbers_available(
+            db_session, test_rifa.id, [1, 4]
+        )
+        assert all_available is False
+        assert unavailable == [1]
+
+    async def test_reserve_conflict_is_all_or_nothing(
+        self, db_session, test_rifa, test_user, test_admin
+    ):
+        """Testa que conflito não deixa reservas parciais"""
+        await reserve_numbers(db_session, test_rifa.id, test_user.id, [10, 11])
+        await commit(db_session)
+
+        with pytest.raises(NumbersUnavailableError) as exc_info:
+            await reserve_numbers(db_session, test_rifa.id, test_admin.id, [9, 10, 12])
+
+        assert exc_info.value.numbers == [10]
+        assert await count_reservations(db_session) == 2
+
+    async def test_same_user_renews_hold(self, db_session, test_rifa, test_user):
+        """Testa que o próprio usuário pode renovar o hold"""
+        _, first_until = await reserve_numbers(
+            db_session, test_rifa.id, test_user.id, [5], ttl=timedelta(minutes=1)
+        )
+        _, second_until = await reserve_numbers(
+            db_session, test_rifa.id, test_user.id, [5], ttl=timedelta(minutes=20)
+        )
+
+        assert second_until > first_until
+        assert await count_reservations(db_session) == 1
+
+    async def test_expired_hold_can_be_taken(self, db_session, test_rifa, test_user, test_admin):
+        """Testa que hold expirado não bloqueia outro comprador"""
+        await reserve_numbers(
+            db_session, test_rifa.id, test_user.id, [7], ttl=timedelta(seconds=-1)
+        )
+
+        numbers, _ = await reserve_numbers(db_session, test_rifa.id, test_admin.id, [7])
+
+        assert numbers == [7]
+
+    async def test_reserve_sold_number(self, db_session, test_rifa, test_user, test_admin):
+        """Testa reserva de número já vendido"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [20])
+
+        with pytest.raises(NumbersUnavailableError):
+            await reserve_numbers(db_session, test_rifa.id, test_admin.id, [20])
+
+    async def test_reserve_respects_max_numbers_per_user(self, db_session, test_rifa, test_user):
+        """Testa limite de números por usuário"""
+        await reserve_numbers(db_session, test_rifa.id, test_user.id, list(range(1, 41)))
+
+        with pytest.raises(ReservationLimitError):
+            await reserve_numbers(db_session, test_rifa.id, test_user.id, list(range(41, 52)))
+
+    async def test_reserve_inactive_rifa(self, db_session, test_rifa, test_user):
+        """Testa reserva em rifa que não está ativa"""
+        test_rifa.status = RifaStatus.DRAFT
+        await db_session.commit()
+
+        with pytest.raises(RifaClosedError):
+            await reserve_numbers(db_session, test_rifa.id, test_user.id, [1])
+
+    async def test_release_numbers(self, db_session, test_rifa, test_user):
+        """Testa liberação de holds"""
+        await reserve_numbers(db_session, test_rifa.id, test_user.id, [1, 2, 3])
+
+        released = await release_numbers(db_session, test_rifa.id, test_user.id, [2])
+
+        assert released == 1
+        assert await count_reservations(db_session) == 2
+
+
+# ===========================================
+# TESTES DE CONFIRMAÇÃO E EXPIRAÇÃO
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestConfirmAndExpire:
+    """Testes para confirm_reservation e expire_reservations"""
+
+    async def test_confirm_converts_holds_into_tickets(self, db_session, test_rifa, test_user):
+        """Testa conversão de holds em tickets"""
+        await reserve_numbers(db_session, test_rifa.id, test_user.id, [1, 2])
+
+        tickets = await confirm_reservation(db_session, test_rifa.id, test_user.id, [1, 2])
+
+        assert sorted(t.number for t in tickets) == [1, 2]
+        assert await count_reservations(db_session) == 0
+
+        await db_session.refresh(test_rifa)
+        assert test_rifa.sold_count == 2
+
+    async def test_confirm_requires_own_hold(self, db_session, test_rifa, test_user, test_admin):
+        """Testa que não é possível confirmar hold de outro usuário"""
+        await reserve_numbers(db_session, test_rifa.id, test_user.id, [1])
+        await commit(db_session)
+
+        with pytest.raises(NumbersUnavailableError):
+            await confirm_reservation(db_session, test_rifa.id, test_admin.id, [1])
+
+        assert await count_reservations(db_session) == 1
+
+    async def test_expire_reservations_in_batches(self, db_session, test_rifa, test_user, test_admin):
+        """Testa expiração em lotes preservando holds válidos"""
+        await reserve_numbers(
+            db_session, test_rifa.id, test_user.id, list(range(1, 8)),
+            ttl=timedelta(seconds=-1)
+        )
+        await reserve_numbers(db_session, test_rifa.id, test_admin.id, [100])
+
+        expired = await expire_reservations(db_session, batch_size=3)
+
+        assert expired == 7
+        assert await count_reservations(db_session) == 1
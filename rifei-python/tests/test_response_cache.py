@@ -0,0 +1,205 @@
+"""
+Testes para o cache de respostas - Rifei
+Testa ETag/304, chave normalizada e invalidação por tags das APIs públicas
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.config import settings
+from app.database import PRIMARY_PIN_COOKIE, commit
+from app.models.models import Category
+from app.response_cache import ResponseCacheMiddleware, _cache_key, _etag_matches, cache_response
+from app.schemas.marketplace import RifaCreate, RifaUpdate
+from app.services import marketplace as marketplace_service
+from app.services.numbers import create_tickets
+from starlette.datastructures import QueryParams
+
+
+# ===========================================
+# TESTES DOS AUXILIARES
+# ===========================================
+
+@pytest.mark.unit
+class TestResponseCacheHelpers:
+    """Testes da chave e do If-None-Match"""
+
+    def test_key_ignores_param_order(self):
+        """Testa que a ordem dos parâmetros não muda a chave"""
+        first = _cache_key("/api/rifas", QueryParams("page=2&sort_by=price"))
+        second = _cache_key("/api/rifas", QueryParams("sort_by=price&page=2&search="))
+
+        assert first == second
+
+    def test_etag_matching(self):
+        """Testa lista, curinga e ETag fraco no If-None-Match"""
+        assert _etag_matches('"a", "b"', '"b"')
+        assert _etag_matches("*", '"b"')
+        assert _etag_matches('W/"b"', '"b"')
+        assert not _etag_matches('"a"', '"b"')
+        assert not _etag_matches(None, '"b"')
+
+
+# ===========================================
+# TESTES DO MIDDLEWARE
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestResponseCacheMiddleware:
+    """Testes do cache nas rotas públicas do marketplace"""
+
+    async def test_hit_and_headers(self, client: AsyncClient, test_rifa, query_counter):
+        """Testa que a segunda requisição não consulta o banco"""
+        first = await client.get("/marketplace/api/rifas", params={"per_page": 5})
+        queries = len(query_counter)
+        second = await client.get("/marketplace/api/rifas", params={"per_page": 5})
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+        assert "stale-while-revalidate=" in second.headers["cache-control"]
+        assert len(query_counter) == queries
+
+    async def test_if_none_match(self, client: AsyncClient, test_rifa):
+        """Testa 304 sem corpo quando o ETag bate"""
+        first = await client.get("/marketplace/api/rifas/featured")
+
+        response = await client.get(
+            "/marketplace/api/rifas/featured",
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == first.headers["etag"]
+
+    async def test_uncached_routes(self, client: AsyncClient, test_rifa):
+        """Testa que rotas sem @cache_response e erros não passam pelo cache"""
+        detail = await client.get(f"/marketplace/api/rifas/{test_rifa.id}")
+        invalid = await client.get("/marketplace/api/rifas", params={"cursor": "x"})
+
+        assert "x-cache" not in detail.headers
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+        assert "x-cache" not in invalid.headers
+
+    async def test_pinned_client_bypasses(self, client: AsyncClient, test_rifa):
+        """Testa que o cliente fixado no primário não recebe resposta do cache"""
+        await client.get("/marketplace/api/rifas/featured")
+
+        response = await client.get(
+            "/marketplace/api/rifas/featured",
+            headers={"Cookie": f"{PRIMARY_PIN_COOKIE}=1"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "x-cache" not in response.headers
+
+    async def test_disabled(self, client: AsyncClient, monkeypatch):
+        """Testa que o cache pode ser desligado"""
+        monkeypatch.setattr(settings, "response_cache_enabled", False)
+
+        response = await client.get("/marketplace/api/categories")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "etag" not in response.headers
+
+    async def test_route_headers_are_kept(self):
+        """Testa que headers da rota sobrevivem ao cache e Set-Cookie não é guardado"""
+        @cache_response()
+        async def listing(request):
+            return JSONResponse({"ok": True}, headers={"Vary": "Accept-Language", "X-Total": "3"})
+
+        @cache_response()
+        async def with_cookie(request):
+            response = JSONResponse({"ok": True})
+            response.set_cookie("visita", "1")
+            return response
+
+        app = Starlette(
+            routes=[Route("/lista", listing), Route("/cookie", with_cookie)],
+            middleware=[Middleware(ResponseCacheMiddleware)],
+        )
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            miss = await client.get("/lista")
+            hit = await client.get("/lista")
+            cookie_first = await client.get("/cookie")
+            cookie_second = await client.get("/cookie")
+
+        for response in (miss, hit):
+            assert response.headers["vary"] == "Accept-Language"
+            assert response.headers["x-total"] == "3"
+        assert hit.headers["x-cache"] == "HIT"
+        assert "visita" in cookie_first.cookies and "visita" in cookie_second.cookies
+        assert "x-cache" not in cookie_second.headers
+
+
+@pytest.mark.api
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestResponseCacheInvalidation:
+    """Testes da invalidação por tags"""
+
+    async def test_create_rifa_invalidates(self, client: AsyncClient, db_session, test_creator):
+        """Testa que create_rifa invalida as listagens"""
+        before = await client.get("/marketplace/api/rifas", params={"status": "draft"})
+
+        await marketplace_service.create_rifa(db_session, RifaCreate(
+            title="Nova Rifa Cacheada",
+            slug="nova-rifa-cacheada",
+            description="Descrição da rifa de teste",
+            price=5,
+            total_numbers=50,
+            end_date=datetime.now(timezone.utc) + timedelta(days=7),
+        ), test_creator.id)
+        await commit(db_session)
+
+        after = await client.get("/marketplace/api/rifas", params={"status": "draft"})
+
+        assert after.headers["x-cache"] == "MISS"
+        assert after.json()["total"] == before.json()["total"] + 1
+        assert after.headers["etag"] != before.headers["etag"]
+
+    async def test_update_rifa_invalidates(self, client: AsyncClient, db_session, test_rifa):
+        """Testa que update_rifa invalida as listagens"""
+        await client.get("/marketplace/api/rifas")
+
+        await marketplace_service.update_rifa(db_session, test_rifa, RifaUpdate(title="Título Novo"))
+        await commit(db_session)
+
+        response = await client.get("/marketplace/api/rifas")
+        titles = [item["title"] for item in response.json()["items"]]
+        assert "Título Novo" in titles
+
+    async def test_ticket_sale_invalidates(self, client: AsyncClient, db_session, test_rifa, test_user):
+        """Testa que a venda de números invalida as listagens (sold_count)"""
+        await client.get("/marketplace/api/rifas")
+
+        await create_tickets(db_session, test_rifa.id, test_user.id, [1, 2, 3])
+        await commit(db_session)
+        # A próxima requisição teria sessão nova (UPDATE direto não atualiza a instância)
+        db_session.expire(test_rifa)
+
+        response = await client.get("/marketplace/api/rifas")
+        assert response.headers["x-cache"] == "MISS"
+        assert response.json()["items"][0]["sold_count"] == 3
+
+    async def test_category_commit_invalidates(self, client: AsyncClient, db_session):
+        """Testa que alterar categorias invalida /api/categories"""
+        await client.get("/marketplace/api/categories")
+
+        db_session.add(Category(name="Nova Categoria", slug="nova-categoria", is_active=True))
+        await db_session.commit()
+        await asyncio.gather(*marketplace_service._invalidation_tasks)
+
+        response = await client.get("/marketplace/api/categories")
+        assert response.headers["x-cache"] == "MISS"
+        assert "Nova Categoria" in [category["name"] for category in response.json()]
@@ -0,0 +1,126 @@
+"""
+Testes para o serviço de busca - Rifei
+Testa tokenização e o índice invertido usado fora do PostgreSQL
+"""
+import pytest
+
+from app.database import commit
+from app.models.models import RifaStatus
+from app.schemas.marketplace import RifaFilters, RifaCreate, RifaUpdate
+from app.services.marketplace import create_rifa, paginate_rifas, update_rifa
+from app.services.search import SearchIndex, tokenize, search_index
+
+
+# ===========================================
+# TESTES DE TOKENIZAÇÃO
+# ===========================================
+
+@pytest.mark.unit
+class TestTokenize:
+    """Testes para tokenize"""
+
+    def test_removes_accents_and_case(self):
+        """Testa normalização de acentos e maiúsculas"""
+        assert tokenize("Cartão FÍSICO") == ["cartao", "fisico"]
+
+    def test_reduces_plurals(self):
+        """Testa redução de plural"""
+        assert tokenize("celulares cartões anéis carros") == ["celular", "cartao", "anel", "carro"]
+
+    def test_skips_stopwords(self):
+        """Testa remoção de stopwords"""
+        assert tokenize("rifa de um carro") == ["rifa", "carro"]
+
+
+@pytest.mark.unit
+class TestSearchIndex:
+    """Testes para SearchIndex"""
+
+    def test_all_terms_must_match(self):
+        """Testa que a busca exige todos os termos"""
+        index = SearchIndex()
+        index.rebuild([
+            (1, "iPhone 15 Pro", "Celular novo"),
+            (2, "iPhone 13", "Usado"),
+        ])
+
+        assert set(index.search("iphone celular")) == {1}
+        assert set(index.search("iphone")) == {1, 2}
+        assert index.search("notebook") == {}
+
+    def test_title_ranks_above_description(self):
+        """Testa peso maior para o título"""
+        index = SearchIndex()
+        index.rebuild([
+            (1, "Moto 0km", "Acompanha capacete"),
+            (2, "Capacete", "Capacete fechado"),
+        ])
+
+        scores = index.search("capacete")
+        assert scores[2] > scores[1]
+
+    def test_reindex_replaces_terms(self):
+        """Testa que reindexar remove os termos antigos"""
+        index = SearchIndex()
+        index.rebuild([(1, "Bicicleta", "")])
+        index.add(1, "Patinete", "")
+
+        assert index.search("bicicleta") == {}
+        assert set(index.search("patinete")) == {1}
+
+
+# ===========================================
+# TESTES DE BUSCA NA LISTAGEM
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestSearchRifas:
+    """Testes de filters.search em paginate_rifas"""
+
+    async def test_search_matches_without_accents(self, db_session, test_rifa):
+        """Testa busca sem acento encontrando texto acentuado"""
+        page = await paginate_rifas(db_session, RifaFilters(search="titanio"))
+
+        assert [rifa.id for rifa in page.items] == [test_rifa.id]
+
+    async def test_relevance_sort(self, db_session, test_rifa, test_creator):
+        """Testa ordenação por relevância"""
+        other = await create_rifa(db_session, RifaCreate(
+            title="Capinha para iPhone",
+            slug="capinha-para-iphone",
+            description="Capinha de silicone compatível com diversos modelos",
+            price=5,
+            total_numbers=100,
+            end_date=test_rifa.end_date,
+        ), test_creator.id)
+        await update_rifa(db_session, other, RifaUpdate(status=RifaStatus.ACTIVE))
+
+        page = await paginate_rifas(
+            db_session, RifaFilters(search="iphone 15", sort_by="relevance")
+        )
+        assert [rifa.id for rifa in page.items] == [test_rifa.id]
+
+        page = await paginate_rifas(
+            db_session, RifaFilters(search="iphone", sort_by="relevance", per_page=1)
+        )
+        assert page.items[0].id == test_rifa.id
+        assert page.next_cursor is not None
+
+        page = await paginate_rifas(db_session, RifaFilters(
+            search="iphone", sort_by="relevance", per_page=1, cursor=page.next_cursor
+        ))
+        assert page.items[0].id == other.id
+
+    async def test_index_follows_updates(self, db_session, test_rifa):
+        """Testa que editar o título atualiza o índice"""
+        await paginate_rifas(db_session, RifaFilters(search="iphone"))
+        assert search_index.built
+
+        await update_rifa(db_session, test_rifa, RifaUpdate(title="Samsung Galaxy S24"))
+        await commit(db_session)
+
+        page = await paginate_rifas(db_session, RifaFilters(search="galaxy"))
+        assert [rifa.id for rifa in page.items] == [test_rifa.id]
+
@@ -0,0 +1,46 @@
+"""
+Testes para o serviço de estatísticas - Rifei
+Testa o snapshot das estatísticas do marketplace
+"""
+from decimal import Decimal
+
+import pytest
+
+from app.database import commit
+from app.models.models import RifaStatus
+from app.schemas.marketplace import RifaUpdate
+from app.services.marketplace import update_rifa
+from app.services.numbers import create_tickets
+from app.services.stats import compute_marketplace_stats, get_marketplace_stats
+
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestMarketplaceStats:
+    """Testes para compute/get_marketplace_stats"""
+
+    async def test_compute(self, db_session, test_rifa, test_user):
+        """Testa agregados calculados em uma varredura"""
+        await create_tickets(db_session, test_rifa.id, test_user.id, [1, 2, 3])
+
+        stats = await compute_marketplace_stats(db_session)
+
+        assert stats["total_rifas"] == 1
+        assert stats["active_rifas"] == 1
+        assert stats["completed_rifas"] == 0
+        assert stats["total_users"] >= 2
+        assert stats["total_revenue"] == Decimal("30.00")
+        assert stats["popular_categories"] == [{"name": "Eletrônicos", "count": 1}]
+
+    async def test_status_transition_refreshes_snapshot(self, db_session, test_rifa):
+        """Testa recálculo do snapshot quando o status de uma rifa muda"""
+        before = await get_marketplace_stats(db_session)
+        assert before["active_rifas"] == 1
+
+        await update_rifa(db_session, test_rifa, RifaUpdate(status=RifaStatus.COMPLETED))
+        await commit(db_session)
+
+        after = await get_marketplace_stats(db_session)
+        assert after["active_rifas"] == 0
+        assert after["completed_rifas"] == 1
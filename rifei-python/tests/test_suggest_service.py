@@ -0,0 +1,155 @@
+"""
+Testes para o serviço de sugestões - Rifei
+Testa o índice de prefixos do autocomplete
+"""
+import pytest
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import commit
+from app.models.models import Rifa, RifaStatus
+from app.schemas.marketplace import RifaUpdate
+from app.services.marketplace import update_rifa
+from app.services.suggest import PrefixIndex, index_generation, suggest, suggest_index
+
+
+# ===========================================
+# TESTES DO ÍNDICE
+# ===========================================
+
+@pytest.mark.unit
+class TestPrefixIndex:
+    """Testes para PrefixIndex"""
+
+    def build(self) -> PrefixIndex:
+        index = PrefixIndex()
+        index.rebuild(
+            [
+                (1, "iPhone 15 Pro", "iphone-15-pro", "maria"),
+                (2, "Moto Honda", "moto-honda", "maria"),
+                (3, "Prêmio em dinheiro", "premio-em-dinheiro", "joao"),
+            ],
+            [("Eletrônicos", "eletronicos")],
+        )
+        return index
+
+    def test_prefix_of_any_word(self):
+        """Testa casamento no início de qualquer palavra"""
+        labels = [s.label for s in self.build().suggest("pro")]
+
+        assert labels == ["iPhone 15 Pro"]
+
+    def test_label_start_ranks_first(self):
+        """Testa que rótulos iniciados pelo texto vêm primeiro"""
+        index = self.build()
+        index.add_rifa(4, "Pro Controller", "pro-controller", "joao")
+
+        labels = [s.label for s in index.suggest("pr")]
+
+        assert labels[:2] == ["Pro Controller", "Prêmio em dinheiro"]
+        assert labels[2] == "iPhone 15 Pro"
+
+    def test_accents_are_ignored(self):
+        """Testa busca sem acento"""
+        index = self.build()
+
+        assert [s.value for s in index.suggest("eletro")] == ["eletronicos"]
+        assert index.suggest("eletro")[0].url == "/categoria/eletronicos"
+
+    def test_creator_kept_while_has_rifas(self):
+        """Testa que o criador sai do índice junto com a última rifa"""
+        index = self.build()
+
+        index.remove_rifa(1)
+        assert [s.type for s in index.suggest("maria")] == ["criador"]
+
+        index.remove_rifa(2)
+        assert index.suggest("maria") == []
+
+    def test_reindex_with_new_title(self):
+        """Testa reindexação após mudança de título"""
+        index = self.build()
+        index.add_rifa(2, "Carro Fiat", "carro-fiat", "maria")
+
+        assert index.suggest("honda") == []
+        assert [s.value for s in index.suggest("fiat")] == ["carro-fiat"]
+
+
+# ===========================================
+# TESTES DO SERVICE
+# ===========================================
+
+@pytest.mark.unit
+@pytest.mark.database
+@pytest.mark.asyncio
+class TestSuggestService:
+    """Testes para suggest e atualização incremental"""
+
+    async def test_suggest_builds_from_database(self, db_session, test_rifa, test_category, test_creator):
+        """Testa montagem do índice a partir do banco"""
+        suggestions = await suggest(db_session, "iph")
+
+        assert [s.value for s in suggestions] == [test_rifa.slug]
+        assert suggest_index.built
+
+        creators = await suggest(db_session, test_creator.username[:4])
+        assert any(s.type == "criador" for s in creators)
+
+    async def test_update_rifa_refreshes_index(self, db_session, test_rifa):
+        """Testa que update_rifa mantém o índice atualizado"""
+        await suggest(db_session, "iph")
+
+        await update_rifa(db_session, test_rifa, RifaUpdate(status=RifaStatus.CANCELLED))
+        await commit(db_session)
+
+        assert await suggest(db_session, "iph") == []
+
+    async def test_other_worker_change_rebuilds(self, db_session, test_rifa):
+        """Testa que uma nova geração compartilhada remonta o índice"""
+        await suggest(db_session, "iph")
+
+        # Outro worker editou a rifa e trocou a geração no cache compartilhado
+        await db_session.execute(update(Rifa).values(title="Galaxy S24"))
+        await db_session.commit()
+        assert await suggest(db_session, "gal") == []
+
+        await index_generation.set("generation", "outro-worker", 60)
+        # Dentro do intervalo a geração não é relida
+        assert await suggest(db_session, "gal") == []
+
+        suggest_index.checked_at -= settings.suggest_generation_check_seconds
+
+        assert [s.value for s in await suggest(db_session, "gal")] == [test_rifa.slug]
+
+    async def test_generation_read_at_most_once_per_interval(self, db_session, test_rifa, monkeypatch):
+        """Testa que digitar não faz uma leitura da geração compartilhada por tecla"""
+        await suggest(db_session, "i")
+
+        reads = []
+        original_get = index_generation.get
+
+        async def counting_get(key):
+            reads.append(key)
+            return await original_get(key)
+
+        monkeypatch.setattr(index_generation, "get", counting_get)
+        for text in ("ip", "iph", "ipho", "iphon", "iphone"):
+            await suggest(db_session, text)
+
+        assert reads == []
+
+        suggest_index.checked_at -= settings.suggest_generation_check_seconds
+        await suggest(db_session, "iphone 1")
+
+        assert reads == ["generation"]
+
+    async def test_max_age_rebuilds(self, db_session, test_rifa, monkeypatch):
+        """Testa a remontagem periódica (rifas esgotadas sem update_rifa)"""
+        await suggest(db_session, "iph")
+
+        await db_session.execute(update(Rifa).values(sold_count=Rifa.total_numbers))
+        await db_session.commit()
+        monkeypatch.setattr(settings, "suggest_index_max_age_seconds", 0)
+
+        assert await suggest(db_session, "iph") == []
+
@@ -0,0 +1,171 @@
+"""
+Testes para o cache de templates - Rifei
+Testa o streaming ({% flush %}), os componentes, o cache de páginas
+estáticas e o bytecode pré-compilado
+"""
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from jinja2 import DictLoader, Environment
+
+from app.jinja_env import BytecodeCache, StreamingExtension
+from app.templating import (
+    FLUSH_MARKER,
+    _create_templates,
+    _stream_chunks,
+    compile_templates,
+    page_cache,
+)
+
+
+def make_env(source: str, enable_async: bool = False) -> Environment:
+    return Environment(
+        loader=DictLoader({"page.html": source}),
+        extensions=[StreamingExtension],
+        enable_async=enable_async,
+    )
+
+
+# ===========================================
+# TESTES DOS COMPONENTES
+# ===========================================
+
+@pytest.mark.unit
+class TestComponents:
+    """Testes dos componentes compartilhados (header e sidebar)"""
+
+    def test_sidebar_active_page(self):
+        """Testa que o menu marca a página atual e as categorias vêm do contexto"""
+        template = _create_templates(False, None).env.get_template("components/sidebar.html")
+        active = 'bg-emerald-500/10 text-emerald-600 dark:text-emerald-400 transition'
+
+        feed = template.render(active_page="feed", categories=[
+            {"slug": "carros", "icon": "🚗", "name": "Carros", "count": 3},
+        ])
+        marketplace = template.render(active_page="marketplace", categories=[
+            {"slug": "carros", "icon": "🚗", "name": "Veículos", "count": 4},
+        ])
+
+        assert 'href="/feed" class="flex items-center gap-3 px-4 py-3 rounded-xl ' + active in feed
+        assert 'href="/marketplace" class="flex items-center gap-3 px-4 py-3 rounded-xl ' + active in marketplace
+        assert "Veículos" in marketplace and "Carros" not in marketplace
+
+
+# ===========================================
+# TESTES DO STREAMING
+# ===========================================
+
+SHELL = "<head>shell</head>{% flush %}{% block content %}{% for i in rows %}{{ i }}{% endfor %}{% endblock %}"
+
+
+@pytest.mark.unit
+class TestStreaming:
+    """Testes da tag {% flush %} e do envio em pedaços"""
+
+    @pytest.mark.asyncio
+    async def test_shell_before_deferred(self):
+        """Testa que o shell sai antes dos dados adiados serem carregados"""
+        events = []
+
+        async def load():
+            events.append("load")
+            return {"rows": [1, 2, 3]}
+
+        template = make_env(SHELL, enable_async=True).get_template("page.html")
+        chunks = []
+        async for chunk in _stream_chunks(template.generate_async({"_deferred": load()})):
+            events.append("chunk")
+            chunks.append(chunk)
+
+        assert chunks[0] == "<head>shell</head>"
+        assert events[:2] == ["chunk", "load"]
+        assert "".join(chunks) == "<head>shell</head>123"
+
+    def test_flush_is_noop_when_not_streaming(self):
+        """Testa que o render síncrono ignora a tag"""
+        template = make_env(SHELL).get_template("page.html")
+
+        assert template.render(rows=[1]) == "<head>shell</head>1"
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestStreamingPages:
+    """Testes das páginas renderizadas em streaming"""
+
+    async def test_marketplace_page(self, client: AsyncClient, test_rifa):
+        """Testa a listagem com os dados adiados"""
+        response = await client.get("/marketplace")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/html")
+        assert test_rifa.title in response.text
+        assert FLUSH_MARKER not in response.text
+
+    async def test_rifa_detail_page(self, client: AsyncClient, test_rifa, test_category):
+        """Testa a página da rifa com a sidebar adiada"""
+        response = await client.get(f"/rifa/{test_rifa.slug}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert test_category.name in response.text
+
+
+# ===========================================
+# TESTES DAS PÁGINAS ESTÁTICAS
+# ===========================================
+
+@pytest.mark.api
+@pytest.mark.asyncio
+class TestStaticPageCache:
+    """Testes do cache de página inteira"""
+
+    async def test_anonymous_page_is_cached(self, client: AsyncClient):
+        """Testa que a página de visitante é guardada e servida igual"""
+        first = await client.get("/termos")
+        second = await client.get("/termos")
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.text == first.text
+        assert page_cache.get("pages/termos.html") == first.text
+
+    async def test_logged_user_is_not_cached(self, client: AsyncClient, test_user, auth_headers):
+        """Testa que o usuário logado vê o próprio header e não polui o cache"""
+        await client.get("/termos")
+
+        response = await client.get("/termos", headers=auth_headers)
+
+        assert test_user.name in response.text
+        assert test_user.name not in page_cache.get("pages/termos.html")
+
+
+# ===========================================
+# TESTES DO BYTECODE PRÉ-COMPILADO
+# ===========================================
+
+@pytest.mark.unit
+class TestBytecodeCache:
+    """Testes do cache de bytecode dos templates"""
+
+    def test_compile_templates(self, tmp_path):
+        """Testa que o passo de build gera as variantes síncrona e assíncrona"""
+        total = compile_templates(str(tmp_path))
+
+        assert total > 0
+        assert len(list(tmp_path.glob("*.sync.cache"))) == total
+        assert len(list(tmp_path.glob("*.async.cache"))) == total
+
+    def test_render_from_precompiled(self, tmp_path):
+        """Testa que o ambiente lê o bytecode gerado no build"""
+        compile_templates(str(tmp_path))
+        env = _create_templates(False, str(tmp_path)).env
+
+        html = env.get_template("pages/termos.html").render(request=None, user=None)
+
+        assert "<html" in html
+
+    def test_read_only_directory(self, tmp_path):
+        """Testa que falha ao gravar o bytecode não quebra o render"""
+        env = make_env("{{ value }}")
+        env.bytecode_cache = BytecodeCache(str(tmp_path / "nao-existe"))
+
+        assert env.get_template("page.html").render(value="ok") == "ok"